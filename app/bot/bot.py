@@ -1,36 +1,146 @@
 #!/usr/bin/env python3
 
-import logging.config
-from app.logger.logging_settings import logging_config
-
-logging.config.dictConfig(logging_config)
-
+import asyncio
 import psycopg_pool
 import logging
+from contextlib import suppress
+from functools import partial
 from redis.asyncio import Redis
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.redis import RedisStorage
 
+from app.bot.broadcast import Broadcaster
+from app.bot.dispatcher import ShardedDispatcher, export_shard_stats
+from app.bot.fsm import setup_buffered_fsm
 from app.bot.handlers import admin_router, others_router, settings_router, user_router
 from app.bot.i18n.translator import get_translations
-from app.infrastructure.database.connection import get_pg_pool
+from app.bot.keyboards.keyboards import LangSettingsKeyboards
+from app.bot.keyboards.menu_button import MainMenu
+from app.bot.outbound import OutboundScheduler
+from app.bot.streams import (
+    IngestDispatcher,
+    UpdateStreamProducer,
+    UpdateStreamWorker,
+)
+from app.bot.webhook import run_webhook
+from app.infrastructure.database.activity import ActivityBuffer
+from app.infrastructure.database.banned import BannedUsers
+from app.infrastructure.database.cache import user_cache
+from app.infrastructure.database.partitions import ActivityPartitions
+from app.infrastructure.database.connection import (
+    build_pg_conninfo,
+    check_schema_version,
+    export_pool_stats,
+    get_pg_pool,
+)
+from app.infrastructure.metrics.collectors import (
+    collect_activity_stats,
+    collect_cache_stats,
+    collect_pool_stats,
+)
+from app.infrastructure.metrics.registry import registry
+from app.infrastructure.metrics.server import start_metrics_server
 from app.bot.middlewares import (
+    BotApiMetricsMiddleware,
+    HandlerMetricsMiddleware,
+    OutboundPriorityMiddleware,
+    UpdateMetricsMiddleware,
+    UpdateDedupMiddleware,
     DataBaseMiddleware,
     TranslatorMiddlware,
     LangSettingsMiddlware,
     ShadowBanMiddleware,
     ActivityCounterMiddleware,
+    UserProfileMiddleware,
 )
 
 from config.config import Config
+from migrations.versions import SCHEMA_VERSION
 
 
 logger = logging.getLogger(__name__)
 
 
+def build_dispatcher(config: Config, storage: BaseStorage) -> Dispatcher:
+    if config.dispatch.shards > 0:
+        dp = ShardedDispatcher(
+            storage=storage, disable_fsm=True, shards=config.dispatch.shards
+        )
+    else:
+        dp = Dispatcher(storage=storage, disable_fsm=True)
+    if config.metrics.enabled:
+        dp.update.outer_middleware(UpdateMetricsMiddleware())
+    if config.dedup.enabled and isinstance(storage, RedisStorage):
+        # Ahead of the FSM load and the database: a duplicate costs one round trip.
+        dp.update.outer_middleware(
+            UpdateDedupMiddleware(
+                storage.redis, ttl=config.dedup.ttl, lease=config.dedup.lease
+            )
+        )
+    setup_buffered_fsm(dp)
+
+    logger.info("Registering routers ...")
+    dp.include_routers(settings_router, admin_router, user_router, others_router)
+
+    logger.info("Registering custom middlewares ...")
+    dp.update.middleware(DataBaseMiddleware())
+    dp.update.middleware(ShadowBanMiddleware())
+    dp.update.middleware(UserProfileMiddleware())
+    dp.update.middleware(OutboundPriorityMiddleware())
+    dp.update.middleware(ActivityCounterMiddleware())
+    dp.update.middleware(LangSettingsMiddlware())
+    dp.update.middleware(TranslatorMiddlware())
+
+    if config.metrics.enabled:
+        # Inner middlewares of the dispatcher also wrap handlers of nested routers.
+        for event_type, observer in dp.observers.items():
+            if event_type not in ("update", "error"):
+                observer.middleware(HandlerMetricsMiddleware(event_type))
+    return dp
+
+
+async def run_ingest(config: Config, bot: Bot, storage: RedisStorage) -> None:
+    producer = UpdateStreamProducer(
+        storage.redis,
+        prefix=config.stream.prefix,
+        partitions=config.stream.partitions,
+        maxlen=config.stream.maxlen,
+    )
+    # Ask Telegram only for the update types the workers handle.
+    allowed_updates = build_dispatcher(
+        config=config, storage=storage
+    ).resolve_used_update_types()
+    dp = IngestDispatcher(
+        producer=producer, allowed_updates=allowed_updates, disable_fsm=True
+    )
+
+    metrics_runner = None
+    if config.metrics.enabled:
+        bot.session.middleware(BotApiMetricsMiddleware())
+        metrics_runner = await start_metrics_server(
+            host=config.metrics.host, port=config.metrics.port
+        )
+
+    try:
+        if config.bot.mode == "webhook":
+            await run_webhook(dp, bot, config.webhook)
+        else:
+            await bot.delete_webhook()
+            # One update at a time keeps the order of updates within a partition.
+            await dp.start_polling(bot, handle_as_tasks=False)
+    except Exception as err:
+        logger.error(err)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await storage.close()
+        logger.info("Ingest stopped")
+
+
 async def main(config: Config) -> None:
     logger.info("Starting bot ....")
 
@@ -46,32 +156,157 @@ async def main(config: Config) -> None:
     bot = Bot(
         token=config.bot.token, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher(storage=storage)
+    if config.bot.process == "ingest":
+        await run_ingest(config=config, bot=bot, storage=storage)
+        return
+    # Singleton jobs run in one process only: the first worker of a fleet.
+    primary = config.bot.process == "all" or config.stream.worker_index == 0
+    outbound = None
+    if config.outbound.enabled:
+        outbound = OutboundScheduler(
+            global_rate=config.outbound.global_rate,
+            chat_rate=config.outbound.chat_rate,
+            chat_burst=config.outbound.chat_burst,
+            group_rate=config.outbound.group_rate,
+            max_retries=config.outbound.max_retries,
+        )
+        bot.session.middleware(outbound)
+    if config.metrics.enabled:
+        bot.session.middleware(BotApiMetricsMiddleware())
+    dp = build_dispatcher(config=config, storage=storage)
 
     db_pool: psycopg_pool.AsyncConnectionPool = await get_pg_pool(config=config)
-    translations = get_translations()
-    locales = list(translations.keys())
+    try:
+        await check_schema_version(db_pool, SCHEMA_VERSION)
+    except RuntimeError:
+        await db_pool.close()
+        raise
+    user_cache.configure(maxsize=config.cache.size, ttl=config.cache.ttl)
+    activity_buffer = ActivityBuffer(
+        db_pool,
+        flush_interval=config.activity.flush_interval,
+        max_pending=config.activity.flush_size,
+        max_backlog=config.activity.max_backlog,
+    )
+    await activity_buffer.start()
+    activity_partitions = ActivityPartitions(
+        build_pg_conninfo(config),
+        months_ahead=config.activity.partitions_ahead,
+        retention_months=config.activity.retention_months,
+        retention_mode=config.activity.retention_mode,
+        interval=config.activity.maintenance_interval,
+    )
+    if primary:
+        await activity_partitions.start()
+    banned_users = BannedUsers(
+        build_pg_conninfo(config),
+        db_pool,
+        resync_interval=config.ban.resync_interval,
+    )
+    await banned_users.start()
+    translations = get_translations(
+        config.i18n.path,
+        config.i18n.default_locale,
+        reload_interval=config.i18n.reload_interval,
+    )
+    await translations.start()
+    # A live view: locales added to LOCALES_PATH are picked up without a restart.
+    locales = translations.keys()
+    main_menu = MainMenu(translations, redis=storage.redis)
+    lang_keyboards = LangSettingsKeyboards(translations)
+    broadcaster = Broadcaster(
+        bot,
+        db_pool,
+        build_pg_conninfo(config),
+        translations,
+        workers=config.broadcast.workers,
+        batch_size=config.broadcast.batch_size,
+    )
 
-    logger.info("Registering routers ...")
-    dp.include_routers(settings_router, admin_router, user_router, others_router)
+    dp.workflow_data.update(
+        db_pool=db_pool,
+        activity_buffer=activity_buffer,
+        banned_users=banned_users,
+        translations=translations,
+        locales=locales,
+        main_menu=main_menu,
+        lang_keyboards=lang_keyboards,
+        broadcaster=broadcaster,
+        admin_ids=config.bot.admin_ids,
+    )
 
-    logger.info("Registering custom middlewares ...")
-    dp.update.middleware(DataBaseMiddleware())
-    dp.update.middleware(ShadowBanMiddleware())
-    dp.update.middleware(ActivityCounterMiddleware())
-    dp.update.middleware(LangSettingsMiddlware())
-    dp.update.middleware(TranslatorMiddlware())
+    background_tasks = [
+        asyncio.create_task(
+            export_pool_stats(db_pool, interval=config.pool.stats_interval)
+        )
+    ]
+    if isinstance(dp, ShardedDispatcher):
+        background_tasks.append(
+            asyncio.create_task(
+                export_shard_stats(dp, interval=config.dispatch.stats_interval)
+            )
+        )
 
-    try:
-        await dp.start_polling(
-            bot,
-            db_pool=db_pool,
-            translations=translations,
-            locales=locales,
-            admin_ids=config.bot.admin_ids,
+    metrics_runner = None
+    if config.metrics.enabled:
+        registry.add_collector(partial(collect_pool_stats, db_pool))
+        registry.add_collector(partial(collect_cache_stats, user_cache))
+        registry.add_collector(partial(collect_activity_stats, activity_buffer))
+        metrics_port = config.metrics.port
+        if config.bot.process == "worker":
+            # Next to the ingest process on the same host.
+            metrics_port += 1 + config.stream.worker_index
+        metrics_runner = await start_metrics_server(
+            host=config.metrics.host, port=metrics_port
         )
+
+    # In every process: a broadcast may have been started on any worker, and
+    # its advisory lock keeps it to one of them.
+    await broadcaster.resume()
+
+    try:
+        if config.bot.process == "worker":
+            worker = UpdateStreamWorker(
+                dp,
+                bot,
+                storage.redis,
+                prefix=config.stream.prefix,
+                partitions=config.stream.partitions,
+                group=config.stream.group,
+                consumer=config.stream.consumer,
+                workers=config.stream.workers,
+                index=config.stream.worker_index,
+                batch_size=config.stream.batch_size,
+                block=config.stream.block,
+                max_in_flight=config.dispatch.max_in_flight,
+                claim_idle=config.stream.claim_idle,
+                claim_interval=config.stream.claim_interval,
+                max_retries=config.stream.max_retries,
+            )
+            await worker.run()
+        elif config.bot.mode == "webhook":
+            await run_webhook(dp, bot, config.webhook)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(
+                bot, tasks_concurrency_limit=config.dispatch.max_in_flight
+            )
     except Exception as err:
         logger.error(err)
     finally:
+        for task in background_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await broadcaster.close()
+        await translations.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        if outbound is not None:
+            await outbound.close()
+        await banned_users.close()
+        await activity_buffer.close()
+        await activity_partitions.close()
+        logger.info("User cache stats: %s", user_cache.stats())
         await db_pool.close()
         logger.info("Connection to Postgres closed")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+from contextlib import suppress
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from psycopg import AsyncConnection, Error
+from psycopg_pool import AsyncConnectionPool
+
+from app.bot.i18n.catalog import LocaleCatalog
+from app.bot.outbound import OutboundPriority, outbound_priority
+from app.infrastructure.database.db import (
+    create_broadcast,
+    finish_broadcast,
+    get_running_broadcasts,
+    lock_broadcast,
+    mark_users_not_alive,
+    stream_alive_users,
+    update_broadcast_progress,
+)
+from app.infrastructure.database.models import Broadcast
+
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        bot: Bot,
+        db_pool: AsyncConnectionPool,
+        conninfo: str,
+        translations: LocaleCatalog,
+        *,
+        workers: int = 16,
+        batch_size: int = 500,
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self._bot = bot
+        self._db_pool = db_pool
+        self._conninfo = conninfo
+        self._translations = translations
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(
+        self,
+        *,
+        admin_id: int,
+        locale: str,
+        from_chat_id: int | None = None,
+        message_id: int | None = None,
+        text: str | None = None,
+    ) -> Broadcast | None:
+        if self.running:
+            return None
+        async with self._db_pool.connection() as conn:
+            broadcast = await create_broadcast(
+                conn=conn,
+                admin_id=admin_id,
+                locale=locale,
+                from_chat_id=from_chat_id,
+                message_id=message_id,
+                text=text,
+            )
+        self._task = asyncio.create_task(self._run([broadcast]))
+        return broadcast
+
+    async def resume(self) -> None:
+        if self.running:
+            return
+        async with self._db_pool.connection() as conn:
+            broadcasts = await get_running_broadcasts(conn=conn)
+        if broadcasts:
+            self._task = asyncio.create_task(self._run(broadcasts))
+
+    async def close(self) -> None:
+        # Unfinished broadcasts stay `running` and are resumed on the next start.
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self, broadcasts: list[Broadcast]) -> None:
+        for broadcast in broadcasts:
+            logger.info(
+                "Broadcast %s started after the user %s",
+                broadcast.id,
+                broadcast.last_user_id,
+            )
+            try:
+                if not await self._send_all(broadcast):
+                    logger.info("Broadcast %s is run by another process", broadcast.id)
+                    continue
+            except Error as err:
+                logger.error("Broadcast %s interrupted: %s", broadcast.id, err)
+                continue
+            logger.info(
+                "Broadcast %s done: sent=%d, blocked=%d, failed=%d",
+                broadcast.id,
+                broadcast.sent,
+                broadcast.blocked,
+                broadcast.failed,
+            )
+            await self._notify_admin(broadcast)
+
+    async def _send_all(self, broadcast: Broadcast) -> bool:
+        # Unbounded: a batch is in memory anyway, and senders re-queue into it.
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        blocked: list[int] = []
+        workers = [
+            asyncio.create_task(self._work(broadcast, queue, blocked))
+            for _ in range(self.workers)
+        ]
+        try:
+            conn = await AsyncConnection.connect(self._conninfo, autocommit=True)
+            async with conn:
+                if not await lock_broadcast(conn, broadcast=broadcast):
+                    return False
+                async for user_ids in stream_alive_users(
+                    conn, after=broadcast.last_user_id, batch_size=self.batch_size
+                ):
+                    for user_id in user_ids:
+                        await queue.put(user_id)
+                    await queue.join()
+                    broadcast.last_user_id = user_ids[-1]
+                    async with self._db_pool.connection() as pool_conn:
+                        if blocked:
+                            await mark_users_not_alive(conn=pool_conn, user_ids=blocked)
+                            blocked.clear()
+                        await update_broadcast_progress(
+                            conn=pool_conn, broadcast=broadcast
+                        )
+                # Still under the lock, so no other process picks it up again.
+                async with self._db_pool.connection() as pool_conn:
+                    await finish_broadcast(conn=pool_conn, broadcast_id=broadcast.id)
+            return True
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _work(
+        self, broadcast: Broadcast, queue: asyncio.Queue[int], blocked: list[int]
+    ) -> None:
+        outbound_priority.set(OutboundPriority.LOW)
+        while True:
+            user_id = await queue.get()
+            try:
+                await self._send(broadcast, user_id)
+                broadcast.sent += 1
+            except TelegramForbiddenError:
+                blocked.append(user_id)
+                broadcast.blocked += 1
+            except TelegramRetryAfter as err:
+                # Flood control, not a failure: the user is sent to again, and
+                # the batch is not done before that.
+                logger.warning(
+                    "Broadcast %s is rate limited for %ss",
+                    broadcast.id,
+                    err.retry_after,
+                )
+                await asyncio.sleep(err.retry_after)
+                queue.put_nowait(user_id)
+            except TelegramAPIError as err:
+                broadcast.failed += 1
+                logger.warning(
+                    "Broadcast %s to the user %s failed: %s", broadcast.id, user_id, err
+                )
+            except Exception:
+                # A dead sender would leave the queue without a consumer.
+                broadcast.failed += 1
+                logger.exception(
+                    "Broadcast %s to the user %s failed", broadcast.id, user_id
+                )
+            finally:
+                queue.task_done()
+
+    async def _send(self, broadcast: Broadcast, user_id: int) -> None:
+        if broadcast.message_id is not None:
+            await self._bot.copy_message(
+                chat_id=user_id,
+                from_chat_id=broadcast.from_chat_id,
+                message_id=broadcast.message_id,
+            )
+        else:
+            await self._bot.send_message(chat_id=user_id, text=broadcast.text)
+
+    async def _notify_admin(self, broadcast: Broadcast) -> None:
+        i18n = self._translations.get(broadcast.locale) or self._translations.get(
+            self._translations["default"]
+        )
+        try:
+            await self._bot.send_message(
+                chat_id=broadcast.admin_id,
+                text=i18n.get("broadcast_done").format(
+                    broadcast.sent, broadcast.blocked, broadcast.failed
+                ),
+            )
+        except TelegramAPIError as err:
+            logger.error(
+                "Failed to notify the admin %s about the broadcast %s: %s",
+                broadcast.admin_id,
+                broadcast.id,
+                err,
+            )
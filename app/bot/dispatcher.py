@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+from contextlib import suppress
+from time import monotonic
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_update_key(update: Update) -> int:
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.user is not None:
+        return context.user.id
+    if context.chat is not None:
+        return context.chat.id
+    return update.update_id
+
+
+class ShardStats:
+    __slots__ = ("processed", "wait_seconds", "run_seconds", "max_run_seconds")
+
+    def __init__(self) -> None:
+        self.processed = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+
+class ShardedDispatcher(Dispatcher):
+    def __init__(self, *, shards: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if shards < 1:
+            logger.error("`%s` needs at least one shard", self.__class__.__name__)
+            raise ValueError
+        self.shards = shards
+        self._queues: list[asyncio.Queue] = []
+        self._workers: list[asyncio.Task] = []
+        self._stats: list[ShardStats] = []
+        self.shutdown.register(self._stop_shards)
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        if not self._workers:
+            self._start_shards()
+        future = asyncio.get_running_loop().create_future()
+        shard = self._resolve_shard(update)
+        self._queues[shard].put_nowait((monotonic(), bot, update, kwargs, future))
+        return await future
+
+    def queue_depths(self) -> list[int]:
+        return [queue.qsize() for queue in self._queues]
+
+    def pop_stats(self) -> list[ShardStats]:
+        stats, self._stats = self._stats, [ShardStats() for _ in self._stats]
+        return stats
+
+    def _resolve_shard(self, update: Update) -> int:
+        return get_update_key(update) % self.shards
+
+    def _start_shards(self) -> None:
+        self._queues = [asyncio.Queue() for _ in range(self.shards)]
+        self._stats = [ShardStats() for _ in range(self.shards)]
+        self._workers = [
+            asyncio.create_task(self._run_shard(shard), name=f"update-shard-{shard}")
+            for shard in range(self.shards)
+        ]
+        logger.info("Started %d update shards", self.shards)
+
+    async def _stop_shards(self) -> None:
+        if not self._workers:
+            return
+        for queue in self._queues:
+            await queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            with suppress(asyncio.CancelledError):
+                await worker
+        self._workers = []
+        logger.info("Stopped %d update shards", self.shards)
+
+    async def _run_shard(self, shard: int) -> None:
+        queue = self._queues[shard]
+        while True:
+            enqueued_at, bot, update, kwargs, future = await queue.get()
+            started_at = monotonic()
+            try:
+                result = await super().feed_update(bot, update, **kwargs)
+            except Exception as err:
+                if not future.done():
+                    future.set_exception(err)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                finished_at = monotonic()
+                stats = self._stats[shard]
+                stats.processed += 1
+                stats.wait_seconds += started_at - enqueued_at
+                stats.run_seconds += finished_at - started_at
+                stats.max_run_seconds = max(
+                    stats.max_run_seconds, finished_at - started_at
+                )
+                queue.task_done()
+
+
+async def export_shard_stats(dp: ShardedDispatcher, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        depths = dp.queue_depths()
+        for shard, stats in enumerate(dp.pop_stats()):
+            processed = stats.processed or 1
+            logger.info(
+                (
+                    "Update shard %d stats: depth=%d, processed=%d, "
+                    "avg_wait_ms=%.1f, avg_run_ms=%.1f, max_run_ms=%.1f"
+                ),
+                shard,
+                depths[shard],
+                stats.processed,
+                1000 * stats.wait_seconds / processed,
+                1000 * stats.run_seconds / processed,
+                1000 * stats.max_run_seconds,
+            )
@@ -4,10 +4,9 @@
 import logging
 from aiogram.types import CallbackQuery, Message
 from aiogram.filters import BaseFilter
-from psycopg import AsyncConnection
 
 from app.bot.enums.roles import UserRole
-from app.infrastructure.database.db import get_user_role
+from app.infrastructure.database.models import UserProfile
 from typing import TypeAlias
 
 logger = logging.getLogger(__name__)
@@ -29,14 +28,10 @@ class UserRoleFilter(BaseFilter):
         if not self.roles:
             logger.error("No valid roles provided to `%s`", self.__class__.__name__)
 
-    async def __call__(self, event: Event, conn: AsyncConnection) -> bool:
-        user = event.from_user
-        if not user:
+    async def __call__(self, event: Event, user_profile: UserProfile | None) -> bool:
+        if user_profile is None:
             return False
-        role = await get_user_role(conn=conn, user_id=user.id)
-        if role is None:
-            return False
-        return role in self.roles
+        return user_profile.role in self.roles
 
 
 class LocaleFilter(BaseFilter):
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+
+import logging
+from time import perf_counter
+from typing import Any, Mapping
+
+from aiogram import Dispatcher
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.types import TelegramObject
+
+from app.infrastructure.metrics.registry import registry
+from .middlewares.database import Data, Handler
+
+
+logger = logging.getLogger(__name__)
+
+FSM_STORAGE_SECONDS = registry.histogram(
+    "bot_fsm_storage_seconds", "Latency of FSM storage round trips", ("operation",)
+)
+_load_seconds = FSM_STORAGE_SECONDS.labels("load")
+_flush_seconds = FSM_STORAGE_SECONDS.labels("flush")
+
+
+class BufferedFSMContext(FSMContext):
+    def __init__(self, storage: Any, key: StorageKey) -> None:
+        super().__init__(storage=storage, key=key)
+        self._loaded = False
+        self._state: str | None = None
+        self._data: dict[str, Any] = {}
+        self._state_changed = False
+        self._data_changed = False
+
+    @property
+    def changed(self) -> bool:
+        return self._state_changed or self._data_changed
+
+    async def load(self) -> None:
+        started = perf_counter()
+        if isinstance(self.storage, RedisStorage):
+            state, data = await self.storage.redis.mget(
+                self.storage.key_builder.build(self.key, "state"),
+                self.storage.key_builder.build(self.key, "data"),
+            )
+            if isinstance(state, bytes):
+                state = state.decode("utf-8")
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            self._state = state
+            self._data = self.storage.json_loads(data) if data is not None else {}
+        else:
+            self._state = await self.storage.get_state(key=self.key)
+            self._data = await self.storage.get_data(key=self.key)
+        self._loaded = True
+        _load_seconds.observe(perf_counter() - started)
+
+    async def flush(self) -> None:
+        if not self.changed:
+            return
+        started = perf_counter()
+        if isinstance(self.storage, RedisStorage):
+            async with self.storage.redis.pipeline(transaction=False) as pipe:
+                if self._state_changed:
+                    state_key = self.storage.key_builder.build(self.key, "state")
+                    if self._state is None:
+                        pipe.delete(state_key)
+                    else:
+                        pipe.set(state_key, self._state, ex=self.storage.state_ttl)
+                if self._data_changed:
+                    data_key = self.storage.key_builder.build(self.key, "data")
+                    if not self._data:
+                        pipe.delete(data_key)
+                    else:
+                        pipe.set(
+                            data_key,
+                            self.storage.json_dumps(self._data),
+                            ex=self.storage.data_ttl,
+                        )
+                await pipe.execute()
+        else:
+            if self._state_changed:
+                await self.storage.set_state(key=self.key, state=self._state)
+            if self._data_changed:
+                await self.storage.set_data(key=self.key, data=self._data)
+        self._state_changed = self._data_changed = False
+        _flush_seconds.observe(perf_counter() - started)
+
+    async def set_state(self, state: StateType = None) -> None:
+        if not self._loaded:
+            await self.load()
+        self._state = state.state if isinstance(state, State) else state
+        self._state_changed = True
+
+    async def get_state(self) -> str | None:
+        if not self._loaded:
+            await self.load()
+        return self._state
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        if not self._loaded:
+            await self.load()
+        self._data = data.copy()
+        self._data_changed = True
+
+    async def get_data(self) -> dict[str, Any]:
+        if not self._loaded:
+            await self.load()
+        return self._data.copy()
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        if not self._loaded:
+            await self.load()
+        return self._data.get(key, default)
+
+    async def update_data(
+        self, data: Mapping[str, Any] | None = None, **kwargs: Any
+    ) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        if not self._loaded:
+            await self.load()
+        self._data.update(kwargs)
+        self._data_changed = True
+        return self._data.copy()
+
+
+class BufferedFSMContextMiddleware(FSMContextMiddleware):
+    async def __call__(
+        self, handler: Handler, event: TelegramObject, data: Data
+    ) -> Any:
+        data["fsm_storage"] = self.storage
+        if (resolved := self.resolve_event_context(data["bot"], data)) is None:
+            return await handler(event, data)
+        context = BufferedFSMContext(storage=self.storage, key=resolved.key)
+        async with self.events_isolation.lock(key=context.key):
+            await context.load()
+            data.update({"state": context, "raw_state": await context.get_state()})
+            try:
+                result = await handler(event, data)
+            except Exception:
+                # Changes made before the error are kept, as with the stock
+                # context, but the handler's error is the one that propagates.
+                try:
+                    await context.flush()
+                except Exception:
+                    logger.exception("Failed to save the FSM context %s", context.key)
+                raise
+            await context.flush()
+            return result
+
+
+def setup_buffered_fsm(dp: Dispatcher) -> None:
+    dp.fsm = BufferedFSMContextMiddleware(
+        storage=dp.fsm.storage,
+        events_isolation=dp.fsm.events_isolation,
+        strategy=dp.fsm.strategy,
+    )
+    dp.update.outer_middleware(dp.fsm)
+    logger.info("Buffered FSM context enabled")
@@ -2,24 +2,27 @@
 
 
 import logging
-from psycopg import AsyncConnection
+import re
+from html import escape
 
-from aiogram import Router
+from aiogram import Bot, Router
 from aiogram.filters import Command, CommandObject
-from aiogram.types import Message
+from aiogram.types import Document, Message
+from app.bot.broadcast import Broadcaster
 from app.bot.enums.roles import UserRole
 from app.bot.filters.filters import UserRoleFilter
-from app.infrastructure.database.db import (
-    update_user_banned_status_by_id,
-    update_user_banned_status_by_username,
-    get_statistics,
-    get_user_banned_status_by_id,
-    get_user_banned_status_by_username,
-)
+from app.infrastructure.database.connection import LazyConnection
+from app.infrastructure.database.db import get_statistics, update_users_banned_status
 
 
 logger = logging.getLogger(__name__)
-admin_router = Router()
+admin_router = Router(name="admin")
+
+STATISTICS_PERIODS = ("day", "week", "month", "all")
+BAN_BATCH_SIZE = 500
+BAN_FILE_MAX_SIZE = 1024 * 1024
+BAN_REPORT_MAX_ITEMS = 25
+USERNAME_PATTERN = re.compile(r"@([A-Za-z0-9_]{1,32})")
 admin_router.message.filter(UserRoleFilter(UserRole.ADMIN))
 
 
@@ -30,95 +33,181 @@ async def process_help_command(message: Message, i18n: dict[str, str]) -> None:
 
 @admin_router.message(Command("statistics"))
 async def process_statistics_command(
-    message: Message, conn: AsyncConnection, i18n: dict[str, str]
+    message: Message,
+    command: CommandObject,
+    conn: LazyConnection,
+    i18n: dict[str, str],
 ) -> None:
-    stats = await get_statistics(conn=conn)
+    period = command.args.split()[0].lower() if command.args else "all"
+    if period not in STATISTICS_PERIODS:
+        await message.reply(text=i18n.get("incorrect_statistics_arg"))
+        return
+
+    stats = await get_statistics(conn=conn, period=period)
+    if not stats:
+        await message.answer(text=i18n.get("no_statistics"))
+        return
     await message.answer(
         text=i18n.get("statistics").format(
+            i18n.get(f"statistics_{period}"),
             "\n".join(
                 f"{i} <b>{stat[0]}</b>: {stat[1]}" for i, stat in enumerate(stats, 1)
-            )
+            ),
         )
     )
 
 
-@admin_router.message(Command("ban"))
-async def process_ban_command(
+def parse_ban_targets(text: str) -> tuple[list[int], list[str], list[str]]:
+    user_ids: dict[int, None] = {}
+    usernames: dict[str, None] = {}
+    incorrect: dict[str, None] = {}
+    for token in re.split(r"[\s,;]+", text):
+        token = token.strip("\"'")
+        if not token:
+            continue
+        if token.isdigit():
+            user_ids[int(token)] = None
+        elif match := USERNAME_PATTERN.fullmatch(token):
+            usernames[match.group(1).lower()] = None
+        else:
+            incorrect[token] = None
+    return list(user_ids), list(usernames), list(incorrect)
+
+
+def format_ban_items(items: list) -> str:
+    if not items:
+        return "—"
+    shown = ", ".join(
+        f"<code>{escape(str(item))}</code>" for item in items[:BAN_REPORT_MAX_ITEMS]
+    )
+    hidden = len(items) - BAN_REPORT_MAX_ITEMS
+    return f"{shown} (+{hidden})" if hidden > 0 else shown
+
+
+async def read_ban_document(bot: Bot, document: Document) -> str | None:
+    if document.file_size and document.file_size > BAN_FILE_MAX_SIZE:
+        return None
+    data = await bot.download(document)
+    return data.read().decode("utf-8", errors="replace")
+
+
+async def process_ban_targets(
     message: Message,
     command: CommandObject,
-    conn: AsyncConnection,
+    bot: Bot,
+    conn: LazyConnection,
     i18n: dict[str, str],
+    *,
+    banned: bool,
 ) -> None:
-    args = command.args
-    if not args:
-        await message.reply(text=i18n.get("empty_ban_answer"))
+    prefix = "" if banned else "un"
+    text = command.args or ""
+    document = message.document or (
+        message.reply_to_message and message.reply_to_message.document
+    )
+    if document:
+        content = await read_ban_document(bot, document)
+        if content is None:
+            await message.reply(text=i18n.get("ban_file_too_large"))
+            return
+        text = f"{text}\n{content}"
+
+    user_ids, usernames, incorrect = parse_ban_targets(text)
+    if not (user_ids or usernames or incorrect):
+        await message.reply(text=i18n.get(f"empty_{prefix}ban_answer"))
         return
-
-    arg_user = args.split()[0].strip()
-    if arg_user.isdigit():
-        banned_status = await get_user_banned_status_by_id(
-            conn=conn, user_id=int(arg_user)
-        )
-    elif arg_user.startswith("@"):
-        banned_status = await get_user_banned_status_by_username(
-            conn=conn, username=arg_user[1:]
-        )
-    else:
-        await message.reply(text=i18n.get("incorrect_ban_arg"))
+    if not (user_ids or usernames):
+        await message.reply(text=i18n.get(f"incorrect_{prefix}ban_arg"))
         return
 
-    if banned_status is None:
-        await message.reply(text=i18n.get("no_user"))
-    elif banned_status:
-        await message.reply(text=i18n.get("already_banned"))
-    else:
-        if arg_user.isdigit():
-            await update_user_banned_status_by_id(
-                conn=conn, banned=True, user_id=int(arg_user)
+    changed: list = []
+    unchanged: list = []
+    found: set = set()
+    # All batches or none: a failed batch leaves no half-applied list behind.
+    async with conn.transaction():
+        for start in range(0, max(len(user_ids), len(usernames)), BAN_BATCH_SIZE):
+            rows = await update_users_banned_status(
+                conn=conn,
+                banned=banned,
+                user_ids=user_ids[start : start + BAN_BATCH_SIZE],
+                usernames=usernames[start : start + BAN_BATCH_SIZE],
             )
-        else:
-            await update_user_banned_status_by_username(
-                conn=conn, banned=True, username=arg_user[1:]
+            for user_id, username, updated in rows:
+                found.update((user_id, username.lower() if username else None))
+                (changed if updated else unchanged).append(user_id)
+    unknown = [user_id for user_id in user_ids if user_id not in found]
+    unknown += [f"@{username}" for username in usernames if username not in found]
+
+    if len(user_ids) + len(usernames) == 1 and not incorrect:
+        if changed:
+            await message.reply(text=i18n.get(f"successfully_{prefix}banned"))
+        elif unchanged:
+            await message.reply(
+                text=i18n.get("already_banned" if banned else "not_banned")
             )
-        await message.reply(text=i18n.get("successfully_banned"))
+        else:
+            await message.reply(text=i18n.get("no_user"))
+        return
+    await message.reply(
+        text=i18n.get(f"{prefix}ban_report").format(
+            len(changed),
+            format_ban_items(changed),
+            len(unchanged),
+            format_ban_items(unchanged),
+            len(unknown),
+            format_ban_items(unknown),
+            len(incorrect),
+            format_ban_items(incorrect),
+        )
+    )
+
+
+@admin_router.message(Command("ban"))
+async def process_ban_command(
+    message: Message,
+    command: CommandObject,
+    bot: Bot,
+    conn: LazyConnection,
+    i18n: dict[str, str],
+) -> None:
+    await process_ban_targets(message, command, bot, conn, i18n, banned=True)
 
 
 @admin_router.message(Command("unban"))
 async def process_unban_command(
     message: Message,
     command: CommandObject,
-    conn: AsyncConnection,
+    bot: Bot,
+    conn: LazyConnection,
     i18n: dict[str, str],
 ) -> None:
-    args = command.args
-    if not args:
-        await message.reply(text=i18n.get("empty_unban_answer"))
-        return
+    await process_ban_targets(message, command, bot, conn, i18n, banned=False)
 
-    arg_user = args.split()[0].strip()
-    if arg_user.isdigit():
-        banned_status = await get_user_banned_status_by_id(
-            conn=conn, user_id=int(arg_user)
-        )
-    elif arg_user.startswith("@"):
-        banned_status = await get_user_banned_status_by_username(
-            conn=conn, username=arg_user[1:]
+
+@admin_router.message(Command("broadcast"))
+async def process_broadcast_command(
+    message: Message,
+    command: CommandObject,
+    broadcaster: Broadcaster,
+    locale: str,
+    i18n: dict[str, str],
+) -> None:
+    source = message.reply_to_message
+    if source is None and not command.args:
+        await message.reply(text=i18n.get("broadcast_usage"))
+        return
+    if source is not None:
+        broadcast = await broadcaster.start(
+            admin_id=message.from_user.id,
+            locale=locale,
+            from_chat_id=source.chat.id,
+            message_id=source.message_id,
         )
     else:
-        await message.reply(text=i18n.get("incorrect_unban_arg"))
+        broadcast = await broadcaster.start(
+            admin_id=message.from_user.id, locale=locale, text=command.args
+        )
+    if broadcast is None:
+        await message.reply(text=i18n.get("broadcast_busy"))
         return
-
-    if banned_status is None:
-        await message.reply(text=i18n.get("no_user"))
-    elif banned_status:
-        if arg_user.isdigit():
-            await update_user_banned_status_by_id(
-                conn=conn, banned=False, user_id=int(arg_user)
-            )
-        else:
-            await update_user_banned_status_by_username(
-                conn=conn, banned=False, username=arg_user[1:]
-            )
-        await message.reply(text=i18n.get("successfully_unbanned"))
-    else:
-        await message.reply(text=i18n.get("not_banned"))
+    await message.reply(text=i18n.get("broadcast_started").format(broadcast.id))
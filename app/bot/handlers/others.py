@@ -2,15 +2,18 @@
 
 
 from aiogram import Router
+from aiogram.methods import TelegramMethod
 from aiogram.types import Message
 
 
-others_router = Router()
+others_router = Router(name="others")
 
 
 @others_router.message()
-async def send_echo(message: Message, i18n: dict[str, str]) -> None:
+async def send_echo(message: Message, i18n: dict[str, str]) -> TelegramMethod:
+    # The method is returned instead of awaited, so it can be sent back
+    # in the webhook response instead of a separate Bot API request.
     try:
-        await message.send_copy(chat_id=message.from_user.id)
+        return message.send_copy(chat_id=message.from_user.id)
     except TypeError:
-        await message.answer(text=i18n.get("no_echo"))
+        return message.answer(text=i18n.get("no_echo"))
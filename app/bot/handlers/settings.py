@@ -5,45 +5,41 @@ import logging
 from typing import Any
 from contextlib import suppress
 
-from psycopg import AsyncConnection
 from aiogram import Bot, F, Router
-from aiogram.enums import BotCommandScopeType
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, CallbackQuery, BotCommandScopeChat
+from aiogram.types import Message, CallbackQuery
 
+from app.bot.enums.roles import UserRole
 from app.bot.filters.filters import LocaleFilter
-from app.bot.keyboards.keyboards import get_lang_settings_kb
-from app.bot.keyboards.menu_button import get_main_menu_commands
+from app.bot.keyboards.keyboards import LangSettingsKeyboards
+from app.bot.keyboards.menu_button import MainMenu
 from app.bot.states.states import LangSG
-from app.infrastructure.database.db import (
-    get_user_lang,
-    get_user_role,
-    update_user_lang,
-)
+from app.infrastructure.database.connection import LazyConnection
+from app.infrastructure.database.db import update_user_lang
+from app.infrastructure.database.models import UserProfile
 
 
 logger = logging.getLogger(__name__)
 
-settings_router = Router()
+settings_router = Router(name="settings")
 
 
 @settings_router.message(Command(commands=["lang"]))
 async def process_lang_command(
     message: Message,
-    conn: AsyncConnection,
     i18n: dict[str, str],
+    locale: str,
     state: FSMContext,
-    locales: list[str],
+    lang_keyboards: LangSettingsKeyboards,
+    user_profile: UserProfile | None,
 ) -> Any:
     await state.set_state(LangSG.lang)
-    user_lang = await get_user_lang(conn=conn, user_id=message.from_user.id)
+    user_lang = user_profile.language if user_profile else None
     msg = await message.answer(
         text=i18n.get("/lang"),
-        reply_markup=get_lang_settings_kb(
-            i18n=i18n, locales=locales, checked=user_lang
-        ),
+        reply_markup=lang_keyboards.get(locale, user_lang),
     )
     await state.update_data(lang_settings_msg_id=msg.message_id, user_lang=user_lang)
 
@@ -53,8 +49,9 @@ async def process_any_message_when_lang(
     message: Message,
     bot: Bot,
     i18n: dict[str, str],
+    locale: str,
     state: FSMContext,
-    locales: list[str],
+    lang_keyboards: LangSettingsKeyboards,
 ) -> Any:
     user_id = message.from_user.id
     data = await state.get_data()
@@ -67,9 +64,7 @@ async def process_any_message_when_lang(
 
     msg = await message.answer(
         text=i18n.get("/lang"),
-        reply_markup=get_lang_settings_kb(
-            i18n=i18n, locales=locales, checked=user_lang
-        ),
+        reply_markup=lang_keyboards.get(locale, user_lang),
     )
 
     await state.update_data(lang_settings_msg_id=msg.message_id)
@@ -79,21 +74,21 @@ async def process_any_message_when_lang(
 async def process_save_click(
     callback: CallbackQuery,
     bot: Bot,
-    conn: AsyncConnection,
+    conn: LazyConnection,
     i18n: dict[str, str],
+    locale: str,
     state: FSMContext,
+    main_menu: MainMenu,
+    user_profile: UserProfile | None,
 ) -> Any:
     data = await state.get_data()
     await update_user_lang(
         conn=conn, language=data.get("user_lang"), user_id=callback.from_user.id
     )
     await callback.message.edit_text(text=i18n.get("lang_saved"))
-    user_role = await get_user_role(conn=conn, user_id=callback.from_user.id)
-    await bot.set_my_commands(
-        commands=get_main_menu_commands(i18n=i18n, role=user_role),
-        scope=BotCommandScopeChat(
-            type=BotCommandScopeType.CHAT, chat_id=callback.from_user.id
-        ),
+    user_role = user_profile.role if user_profile else UserRole.USER
+    await main_menu.update(
+        bot, chat_id=callback.from_user.id, locale=locale, role=user_role
     )
     await state.update_data(lang_settings_msg_id=None, user_lang=None)
     await state.set_state()
@@ -102,11 +97,11 @@ async def process_save_click(
 @settings_router.callback_query(F.data == "cancel_lang_button_data")
 async def process_cancel_click(
     callback: CallbackQuery,
-    conn: AsyncConnection,
     i18n: dict[str, str],
     state: FSMContext,
+    user_profile: UserProfile | None,
 ) -> Any:
-    user_lang = await get_user_lang(conn=conn, user_id=callback.from_user.id)
+    user_lang = user_profile.language if user_profile else None
     await callback.message.edit_text(
         text=i18n.get("lang_cancelled").format(i18n.get(user_lang))
     )
@@ -116,14 +111,15 @@ async def process_cancel_click(
 
 @settings_router.callback_query(LocaleFilter())
 async def process_lang_click(
-    callback: CallbackQuery, i18n: dict[str, str], locales: list[str]
+    callback: CallbackQuery,
+    i18n: dict[str, str],
+    locale: str,
+    lang_keyboards: LangSettingsKeyboards,
 ) -> Any:
     try:
         await callback.message.edit_text(
             text=i18n.get("/lang"),
-            reply_markup=get_lang_settings_kb(
-                i18n=i18n, locales=locales, checked=callback.data
-            ),
+            reply_markup=lang_keyboards.get(locale, callback.data),
         )
     except TelegramBadRequest:
         await callback.answer()
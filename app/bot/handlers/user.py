@@ -3,48 +3,44 @@
 
 import logging
 from contextlib import suppress
-from psycopg import AsyncConnection
 
 from aiogram import Bot, Router
-from aiogram.enums import BotCommandScopeType
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import KICKED, ChatMemberUpdatedFilter, Command, CommandStart
 from aiogram.fsm.context import FSMContext
-from aiogram.types import (
-    BotCommandScopeChat,
-    ChatMemberUpdated,
-    Message,
-    User,
-)
+from aiogram.types import ChatMemberUpdated, Message, User
 
 from app.bot.enums.roles import UserRole
-from app.bot.keyboards.menu_button import get_main_menu_commands
+from app.bot.keyboards.menu_button import MainMenu
 from app.bot.states.states import LangSG
+from app.infrastructure.database.connection import LazyConnection
 from app.infrastructure.database.db import (
     add_user,
+    revive_user,
     update_user_alive_status,
-    get_user,
-    get_user_lang,
 )
+from app.infrastructure.database.models import UserProfile
 
 
 logger = logging.getLogger(__name__)
-user_router = Router()
+user_router = Router(name="user")
 
 
 @user_router.message(CommandStart())
 async def process_start_command(
     message: Message,
-    conn: AsyncConnection,
+    conn: LazyConnection,
     bot: Bot,
     i18n: dict[str, str],
+    locale: str,
     state: FSMContext,
     admin_ids: list[int],
     translations: dict[str, str],
+    main_menu: MainMenu,
+    user_profile: UserProfile | None,
 ) -> None:
     user: User | None = message.from_user
-    user_row = await get_user(conn=conn, user_id=user.id)
-    if user_row is None:
+    if user_profile is None:
         user_role = UserRole.ADMIN if user.id in admin_ids else UserRole.USER
         await add_user(
             conn=conn,
@@ -54,8 +50,10 @@ async def process_start_command(
             role=user_role,
         )
     else:
-        user_role = UserRole(user_row[4])
-        await update_user_alive_status(conn=conn, is_alive=True, user_id=user.id)
+        user_role = user_profile.role
+        # A no-op for alive users; not guarded by the cached profile, which may
+        # miss a `mark_users_not_alive` run by another process.
+        await revive_user(conn=conn, user_id=user.id)
 
     if await state.get_state() == LangSG.lang:
         data = await state.get_data()
@@ -63,13 +61,11 @@ async def process_start_command(
             msg_id = data.get("lang_settings_msg_id")
             if msg_id:
                 await bot.edit_message_reply_markup(chat_id=user.id, message_id=msg_id)
-        user_lang = await get_user_lang(conn=conn, user_id=user.id)
-        i18n = translations.get(user_lang)
+        user_lang = user_profile.language if user_profile else user.language_code
+        if user_lang in translations:
+            locale, i18n = user_lang, translations[user_lang]
 
-    await bot.set_my_commands(
-        commands=get_main_menu_commands(i18n=i18n, role=user_role),
-        scope=BotCommandScopeChat(type=BotCommandScopeType.CHAT, chat_id=user.id),
-    )
+    await main_menu.update(bot, chat_id=user.id, locale=locale, role=user_role)
     await message.answer(text=i18n.get("/start"))
     await state.clear()
 
@@ -81,7 +77,7 @@ async def process_help_command(message: Message, i18n: dict[str, str]) -> None:
 
 @user_router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=KICKED))
 async def process_user_blocked_bot(
-    event: ChatMemberUpdated, conn: AsyncConnection
+    event: ChatMemberUpdated, conn: LazyConnection
 ) -> None:
     logger.info("User `%d` blocked the bot", event.from_user.id)
     await update_user_alive_status(
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import json
+import logging
+import sys
+from collections.abc import Iterator, Mapping
+from contextlib import suppress
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "messages.json"
+
+
+def read_catalog(path: Path) -> dict[str, str]:
+    with path.open(encoding="utf-8") as file:
+        raw = json.load(file)
+    if not isinstance(raw, dict) or not all(
+        isinstance(key, str) and isinstance(value, str) for key, value in raw.items()
+    ):
+        logger.error("Locale catalog `%s` must be an object of strings", path)
+        raise ValueError
+    # Keys repeat in every catalog and many values repeat across them.
+    return {sys.intern(key): sys.intern(value) for key, value in raw.items()}
+
+
+class LocaleCatalog(Mapping):
+    def __init__(
+        self,
+        path: str | Path,
+        default: str,
+        *,
+        reload_interval: float = 0.0,
+    ) -> None:
+        self.path = Path(path)
+        self.default = default
+        self.reload_interval = reload_interval
+        self._files: dict[str, Path] = {}
+        self._mtimes: dict[str, float] = {}
+        self._catalogs: dict[str, dict[str, str]] = {}
+        # Broken files are not read again on every update, only once changed.
+        self._failed: set[str] = set()
+        self._locales: tuple[str, ...] = ()
+        self._task: asyncio.Task | None = None
+        self.scan()
+        if default not in self._files:
+            logger.error("No catalog for the default locale `%s` in %s", default, path)
+            raise ValueError
+        self._load(default)
+
+    @property
+    def locales(self) -> tuple[str, ...]:
+        # A new tuple whenever the set of locales changes.
+        return self._locales
+
+    def __getitem__(self, locale: str) -> dict[str, str] | str:
+        catalog = self.get(locale)
+        if catalog is None:
+            raise KeyError(locale)
+        return catalog
+
+    def get(self, locale: str, default=None):
+        catalog = self._catalogs.get(locale)
+        if catalog is not None:
+            return catalog
+        if locale == "default":
+            return self.default
+        if locale not in self._files or locale in self._failed:
+            return default
+        try:
+            return self._load(locale)
+        except (OSError, ValueError) as err:
+            logger.error("Failed to load the locale `%s`: %s", locale, err)
+            self._failed.add(locale)
+            return default
+
+    def __contains__(self, locale: object) -> bool:
+        if locale == "default":
+            return True
+        return locale in self._files and locale not in self._failed
+
+    def __iter__(self) -> Iterator[str]:
+        yield "default"
+        yield from self._locales
+
+    def __len__(self) -> int:
+        return len(self._locales) + 1
+
+    def scan(self) -> None:
+        files = {
+            file.parent.name: file
+            for file in self.path.glob(f"*/{CATALOG_FILENAME}")
+            if file.is_file()
+        }
+        if files.keys() != self._files.keys():
+            self._locales = tuple(sorted(files))
+            logger.info("Locales available: %s", ", ".join(self._locales))
+        self._files = files
+
+    def reload(self) -> list[str]:
+        self.scan()
+        reloaded = []
+        for locale in [*self._catalogs, *self._failed]:
+            file = self._files.get(locale)
+            if file is None:
+                continue
+            with suppress(OSError):
+                if file.stat().st_mtime == self._mtimes.get(locale):
+                    continue
+            try:
+                self._load(locale)
+            except (OSError, ValueError) as err:
+                logger.error("Failed to reload the locale `%s`: %s", locale, err)
+                continue
+            self._failed.discard(locale)
+            reloaded.append(locale)
+        if reloaded:
+            logger.info("Locales reloaded: %s", ", ".join(reloaded))
+        return reloaded
+
+    async def start(self) -> None:
+        if self._task is None and self.reload_interval > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def _load(self, locale: str) -> dict[str, str]:
+        file = self._files[locale]
+        self._mtimes[locale] = file.stat().st_mtime
+        catalog = read_catalog(file)
+        # Swapped as a whole: readers holding the old dict keep a consistent one.
+        self._catalogs[locale] = catalog
+        logger.info("Locale `%s` loaded: %d messages", locale, len(catalog))
+        return catalog
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            self.reload()
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 
 
-from locales.en.txt import EN
-from locales.ru.txt import RU
+from pathlib import Path
 
+from app.bot.i18n.catalog import LocaleCatalog
 
-def get_translations() -> dict[str, str | dict[str, str]]:
-    return {"default": "ru", "en": EN, "ru": RU}
+
+LOCALES_DIR = Path(__file__).resolve().parents[3] / "locales"
+
+
+def get_translations(
+    path: str | Path = LOCALES_DIR,
+    default: str = "ru",
+    *,
+    reload_interval: float = 0.0,
+) -> LocaleCatalog:
+    return LocaleCatalog(path, default, reload_interval=reload_interval)
@@ -3,6 +3,8 @@
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from app.bot.i18n.catalog import LocaleCatalog
+
 
 def get_lang_settings_kb(
     i18n: dict, locales: list[str], checked: str
@@ -41,3 +43,30 @@ def get_lang_settings_kb(
         ]
     )
     return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+class LangSettingsKeyboards:
+    def __init__(self, translations: LocaleCatalog) -> None:
+        self._translations = translations
+        self._keyboards: dict[
+            tuple[str, str | None],
+            tuple[dict[str, str], tuple[str, ...], InlineKeyboardMarkup],
+        ] = {}
+
+    def get(self, locale: str, checked: str | None) -> InlineKeyboardMarkup:
+        i18n = self._translations.get(locale)
+        if i18n is None or locale == "default":
+            locale = self._translations.default
+            i18n = self._translations[locale]
+        locales = self._translations.locales
+        if checked not in locales:
+            # No known locale is checked, so nothing is highlighted.
+            checked = None
+        # Built on first use and shared between updates, must not be modified.
+        # A reloaded catalog or a new locale replaces the dict or the tuple.
+        cached = self._keyboards.get((locale, checked))
+        if cached is not None and cached[0] is i18n and cached[1] is locales:
+            return cached[2]
+        keyboard = get_lang_settings_kb(i18n=i18n, locales=locales, checked=checked)
+        self._keyboards[(locale, checked)] = (i18n, locales, keyboard)
+        return keyboard
@@ -1,16 +1,133 @@
 #!/usr/bin/env python3
 
 
-from aiogram.types import BotCommand
+import logging
+from collections import OrderedDict
+from hashlib import blake2b
+
+from aiogram import Bot
+from aiogram.enums import BotCommandScopeType
+from aiogram.types import BotCommand, BotCommandScopeChat
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
 from app.bot.enums.roles import UserRole
+from app.bot.i18n.catalog import LocaleCatalog
+
+
+logger = logging.getLogger(__name__)
+
+
+MAIN_MENU_COMMANDS = (
+    "start",
+    "lang",
+    "help",
+    "ban",
+    "unban",
+    "statistics",
+    "broadcast",
+)
+USER_MENU_SIZE = 3
 
 
 def get_main_menu_commands(i18n: dict[str, str], role: UserRole):
-    commands = "start lang help ban unban statistics".split()
     buttons = [
         BotCommand(
             command=f"/{command}", description=i18n.get(f"/{command}_description")
         )
-        for command in commands
+        for command in MAIN_MENU_COMMANDS
     ]
-    return buttons if role == UserRole.ADMIN else buttons[:3]
+    return buttons if role == UserRole.ADMIN else buttons[:USER_MENU_SIZE]
+
+
+def get_menu_fingerprint(commands: list[BotCommand]) -> str:
+    digest = blake2b(digest_size=8)
+    for command in commands:
+        digest.update(f"{command.command}\0{command.description}\0".encode())
+    return digest.hexdigest()
+
+
+class MainMenu:
+    def __init__(
+        self,
+        translations: LocaleCatalog,
+        redis: Redis | None = None,
+        *,
+        ttl: int = 30 * 24 * 3600,
+        maxsize: int = 100_000,
+    ) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._redis = redis
+        self._sent: OrderedDict[tuple[int, int], str] = OrderedDict()
+        self._translations = translations
+        self._menus: dict[
+            tuple[str, UserRole], tuple[dict[str, str], list[BotCommand], str]
+        ] = {}
+
+    def get(self, locale: str, role: UserRole) -> tuple[list[BotCommand], str]:
+        i18n = self._translations.get(locale)
+        if i18n is None or locale == "default":
+            locale = self._translations.default
+            i18n = self._translations[locale]
+        # Built on first use and shared between updates, must not be modified.
+        menu = self._menus.get((locale, role))
+        if menu is None or menu[0] is not i18n:
+            commands = get_main_menu_commands(i18n=i18n, role=role)
+            menu = self._menus[(locale, role)] = (
+                i18n,
+                commands,
+                get_menu_fingerprint(commands),
+            )
+        return menu[1], menu[2]
+
+    async def update(
+        self, bot: Bot, *, chat_id: int, locale: str, role: UserRole
+    ) -> bool:
+        commands, fingerprint = self.get(locale, role)
+        key = (bot.id, chat_id)
+        if await self._get_sent(key) == fingerprint:
+            return False
+        await bot.set_my_commands(
+            commands=commands,
+            scope=BotCommandScopeChat(type=BotCommandScopeType.CHAT, chat_id=chat_id),
+        )
+        await self._set_sent(key, fingerprint)
+        logger.info(
+            "Main menu `%s` (%s, %s) sent to the chat %s",
+            fingerprint,
+            locale,
+            role,
+            chat_id,
+        )
+        return True
+
+    async def _get_sent(self, key: tuple[int, int]) -> str | None:
+        if self._redis is not None:
+            try:
+                value = await self._redis.get(self._redis_key(key))
+            except RedisError as err:
+                # Sending the menu again is better than not sending it at all.
+                logger.error("Failed to read the sent main menu: %s", err)
+                return None
+            return value.decode() if isinstance(value, bytes) else value
+        fingerprint = self._sent.get(key)
+        if fingerprint is not None:
+            self._sent.move_to_end(key)
+        return fingerprint
+
+    async def _set_sent(self, key: tuple[int, int], fingerprint: str) -> None:
+        if self._redis is not None:
+            try:
+                await self._redis.set(self._redis_key(key), fingerprint, ex=self.ttl)
+            except RedisError as err:
+                logger.error("Failed to store the sent main menu: %s", err)
+            return
+        self._sent[key] = fingerprint
+        self._sent.move_to_end(key)
+        while len(self._sent) > self.maxsize:
+            self._sent.popitem(last=False)
+
+    @staticmethod
+    def _redis_key(key: tuple[int, int]) -> str:
+        return f"main_menu:{key[0]}:{key[1]}"
@@ -2,7 +2,15 @@
 
 
 from .database import DataBaseMiddleware
+from .dedup import UpdateDedupMiddleware, UpdateInProgress
 from .i18n import TranslatorMiddlware
 from .lang_settings import LangSettingsMiddlware
+from .metrics import (
+    BotApiMetricsMiddleware,
+    HandlerMetricsMiddleware,
+    UpdateMetricsMiddleware,
+)
+from .outbound_priority import OutboundPriorityMiddleware
 from .shadow_ban import ShadowBanMiddleware
 from .statistics import ActivityCounterMiddleware
+from .user_profile import UserProfileMiddleware
@@ -7,6 +7,7 @@ from typing import Any, Callable, Awaitable, TypeAlias
 from aiogram import BaseMiddleware
 from aiogram.types import Update
 from psycopg_pool import AsyncConnectionPool
+from app.infrastructure.database.connection import LazyConnection
 
 
 logger = logging.getLogger(__name__)
@@ -20,12 +21,9 @@ class DataBaseMiddleware(BaseMiddleware):
         if db_pool is None:
             logger.error("Database pool is not provided in middleware data.")
             raise RuntimeError
-        async with db_pool.connection() as connection:
-            try:
-                async with connection.transaction():
-                    data["conn"] = connection
-                    result = await handler(event, data)
-            except Exception as err:
-                logger.error("Transaction rolled back due to error: %s", err)
-                raise
-        return result
+        data["conn"] = LazyConnection(db_pool)
+        try:
+            return await handler(event, data)
+        except Exception as err:
+            logger.error("Update processing failed with error: %s", err)
+            raise
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+
+import logging
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import Update
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.infrastructure.metrics.registry import registry
+from .database import Data, Handler
+
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_UPDATES = registry.counter(
+    "bot_duplicate_updates_total", "Updates dropped as already processed"
+)
+_duplicates = DUPLICATE_UPDATES.labels()
+
+DEDUP_PREFIX = "dedup"
+# Update ids grow one by one, so a bucket is a dense bitmap of 8 KB.
+DEDUP_BUCKET_BITS = 1 << 16
+
+
+class UpdateInProgress(Exception):
+    # Another process holds the lease: the update is neither new nor done.
+    pass
+
+
+class UpdateDedupMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        ttl: float = 86400.0,
+        lease: float = 60.0,
+        prefix: str = DEDUP_PREFIX,
+    ) -> None:
+        self.ttl = int(ttl)
+        self.lease = max(1, int(lease))
+        self.prefix = prefix
+        self._redis = redis
+
+    def _locate(self, bot: Bot, update_id: int) -> tuple[str, int]:
+        bucket, offset = divmod(update_id, DEDUP_BUCKET_BITS)
+        return f"{self.prefix}:{bot.id}:{bucket}", offset
+
+    def _lease_key(self, bot: Bot, update_id: int) -> str:
+        return f"{self.prefix}:{bot.id}:lease:{update_id}"
+
+    async def __call__(self, handler: Handler, event: Update, data: Data) -> Any:
+        key, offset = self._locate(data["bot"], event.update_id)
+        lease_key = self._lease_key(data["bot"], event.update_id)
+        # One round trip: the bit is only set once an update is processed, the
+        # lease covers the processing itself and expires if the process dies.
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.getbit(key, offset)
+                pipe.set(lease_key, 1, nx=True, ex=self.lease)
+                seen, leased = await pipe.execute()
+        except RedisError as err:
+            # Processing twice is better than not processing at all.
+            logger.error("Update dedup check failed: %s", err)
+            return await handler(event, data)
+        if seen:
+            if leased:
+                # Taken in the same round trip, nothing is left to cover.
+                await self._release(lease_key, event.update_id)
+            _duplicates.inc()
+            logger.info("Duplicate update dropped: %d", event.update_id)
+            return
+        if not leased:
+            # Not a duplicate yet: the caller has to keep the update and retry.
+            logger.info("Update %d is being processed elsewhere", event.update_id)
+            raise UpdateInProgress(event.update_id)
+
+        try:
+            result = await handler(event, data)
+        except Exception:
+            # A failed update is not processed: let a retry of it through.
+            await self._release(lease_key, event.update_id)
+            raise
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.setbit(key, offset, 1)
+                pipe.expire(key, self.ttl)
+                pipe.delete(lease_key)
+                await pipe.execute()
+        except RedisError as err:
+            logger.error("Failed to mark the update %d: %s", event.update_id, err)
+        return result
+
+    async def _release(self, lease_key: str, update_id: int) -> None:
+        try:
+            await self._redis.delete(lease_key)
+        except RedisError as err:
+            logger.error("Failed to release the update %d: %s", update_id, err)
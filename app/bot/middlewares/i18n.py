@@ -8,8 +8,7 @@ from typing import Any
 from aiogram import BaseMiddleware
 from aiogram.types import Update, User
 from aiogram.fsm.context import FSMContext
-from psycopg import AsyncConnection
-from app.infrastructure.database.db import get_user_lang
+from app.infrastructure.database.models import UserProfile
 from .database import Handler, Data
 
 
@@ -26,16 +25,17 @@ class TranslatorMiddlware(BaseMiddleware):
         user_context_data = await state.get_data()
 
         if (user_lang := user_context_data.get("user_lang")) is None:
-            conn: AsyncConnection | None = data.get("conn")
-            if conn is None:
-                logger.error("Database connection not found in middleware data")
-                raise RuntimeError
-            user_lang: str | None = await get_user_lang(conn=conn, user_id=user.id)
+            user_profile: UserProfile | None = data.get("user_profile")
+            user_lang = user_profile.language if user_profile else None
             user_lang = user_lang or user.language_code
 
         translations: dict = data.get("translations")
         i18n: dict = translations.get(user_lang)
+        if i18n is None or user_lang == "default":
+            user_lang = translations["default"]
+            i18n = translations[user_lang]
 
-        data["i18n"] = i18n or translations[translations["default"]]
+        data["i18n"] = i18n
+        data["locale"] = user_lang
 
         return await handler(event, data)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+
+import logging
+from time import perf_counter
+from typing import Any, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from app.infrastructure.metrics.registry import (
+    CounterValue,
+    HistogramValue,
+    registry,
+)
+from .database import Data, Handler
+
+
+logger = logging.getLogger(__name__)
+
+UPDATES = registry.counter("bot_updates_total", "Received updates", ("type",))
+UPDATE_SECONDS = registry.histogram(
+    "bot_update_seconds", "Time to process an update", ("type",)
+)
+HANDLED_UPDATES = registry.counter(
+    "bot_handled_updates_total", "Updates handled by a router", ("router", "type")
+)
+HANDLER_SECONDS = registry.histogram(
+    "bot_handler_seconds", "Handler latency", ("router", "handler")
+)
+HANDLER_ERRORS = registry.counter(
+    "bot_handler_errors_total", "Handlers that raised", ("router", "handler")
+)
+TELEGRAM_API_SECONDS = registry.histogram(
+    "bot_telegram_api_seconds", "Telegram Bot API call latency", ("method",)
+)
+TELEGRAM_API_ERRORS = registry.counter(
+    "bot_telegram_api_errors_total",
+    "Failed Telegram Bot API calls",
+    ("method", "error"),
+)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    def __init__(self) -> None:
+        self._bound: dict[str, tuple[CounterValue, HistogramValue]] = {}
+
+    async def __call__(self, handler: Handler, event: Update, data: Data) -> Any:
+        update_type = event.event_type
+        bound = self._bound.get(update_type)
+        if bound is None:
+            bound = self._bound[update_type] = (
+                UPDATES.labels(update_type),
+                UPDATE_SECONDS.labels(update_type),
+            )
+        bound[0].inc()
+        started = perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            bound[1].observe(perf_counter() - started)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    def __init__(self, event_type: str) -> None:
+        self.event_type = event_type
+        self._bound: dict[
+            Callable, tuple[CounterValue, HistogramValue, CounterValue]
+        ] = {}
+
+    async def __call__(
+        self, handler: Handler, event: TelegramObject, data: Data
+    ) -> Any:
+        callback = data["handler"].callback
+        bound = self._bound.get(callback)
+        if bound is None:
+            router = data["event_router"].name
+            name = getattr(callback, "__name__", repr(callback))
+            bound = self._bound[callback] = (
+                HANDLED_UPDATES.labels(router, self.event_type),
+                HANDLER_SECONDS.labels(router, name),
+                HANDLER_ERRORS.labels(router, name),
+            )
+        bound[0].inc()
+        started = perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            bound[2].inc()
+            raise
+        finally:
+            bound[1].observe(perf_counter() - started)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    def __init__(self) -> None:
+        self._bound: dict[type, HistogramValue] = {}
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Response:
+        method_type = type(method)
+        latency = self._bound.get(method_type)
+        if latency is None:
+            latency = self._bound[method_type] = TELEGRAM_API_SECONDS.labels(
+                method_type.__name__
+            )
+        started = perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as err:
+            TELEGRAM_API_ERRORS.labels(method_type.__name__, type(err).__name__).inc()
+            raise
+        finally:
+            latency.observe(perf_counter() - started)
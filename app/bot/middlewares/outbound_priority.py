@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+
+import logging
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from app.bot.enums.roles import UserRole
+from app.bot.outbound import OutboundPriority, outbound_priority
+from app.infrastructure.database.models import UserProfile
+from .database import Data, Handler
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundPriorityMiddleware(BaseMiddleware):
+    async def __call__(self, handler: Handler, event: Update, data: Data) -> Any:
+        user_profile: UserProfile | None = data.get("user_profile")
+        if user_profile is not None and user_profile.role == UserRole.ADMIN:
+            priority = OutboundPriority.HIGH
+        else:
+            priority = OutboundPriority.NORMAL
+        # Reset afterwards: shard workers reuse one task for many updates.
+        token = outbound_priority.set(priority)
+        try:
+            return await handler(event, data)
+        finally:
+            outbound_priority.reset(token)
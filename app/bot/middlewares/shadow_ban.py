@@ -6,8 +6,7 @@ from typing import Any
 
 from aiogram import BaseMiddleware
 from aiogram.types import Update, TelegramObject, User
-from app.infrastructure.database.db import get_user_banned_status_by_id
-from psycopg import AsyncConnection
+from app.infrastructure.database.banned import BannedUsers
 from .database import Data, Handler
 
 logger = logging.getLogger(__name__)
@@ -19,14 +18,11 @@ class ShadowBanMiddleware(BaseMiddleware):
         if user is None:
             return await handler(event, data)
 
-        conn: AsyncConnection | None = data.get("conn")
-        if conn is None:
-            logger.error("Database connection not found in middleware data")
+        banned_users: BannedUsers | None = data.get("banned_users")
+        if banned_users is None:
+            logger.error("Banned users not found in middleware data")
             raise RuntimeError
-        user_banned_status = await get_user_banned_status_by_id(
-            conn=conn, user_id=user.id
-        )
-        if user_banned_status:
+        if user.id in banned_users:
             logger.info("Shadow-banned user tried to interact: %d", user.id)
             if event.callback_query:
                 await event.callback_query.answer()
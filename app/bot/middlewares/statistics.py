@@ -6,8 +6,7 @@ from typing import Any
 
 from aiogram import BaseMiddleware
 from aiogram.types import Update, User
-from app.infrastructure.database.db import update_user_activity
-from psycopg import AsyncConnection
+from app.infrastructure.database.activity import ActivityBuffer
 from .database import Handler, Data
 
 
@@ -22,10 +21,10 @@ class ActivityCounterMiddleware(BaseMiddleware):
 
         result = await handler(event, data)
 
-        conn: AsyncConnection | None = data.get("conn")
-        if conn is None:
-            logger.error("No database connection found in middleware data")
+        activity_buffer: ActivityBuffer | None = data.get("activity_buffer")
+        if activity_buffer is None:
+            logger.error("No activity buffer found in middleware data")
             raise RuntimeError
-        await update_user_activity(conn=conn, user_id=user.id)
+        activity_buffer.add(user.id)
 
         return result
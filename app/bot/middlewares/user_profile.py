@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+
+import logging
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update, User
+from app.infrastructure.database.db import get_user_profile, update_users_username
+from app.infrastructure.database.connection import LazyConnection
+from .database import Data, Handler
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileMiddleware(BaseMiddleware):
+    async def __call__(self, handler: Handler, event: Update, data: Data) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None:
+            data["user_profile"] = None
+            return await handler(event, data)
+
+        conn: LazyConnection | None = data.get("conn")
+        if conn is None:
+            logger.error("Database connection not found in middleware data")
+            raise RuntimeError
+        user_profile = await get_user_profile(conn=conn, user_id=user.id)
+        data["user_profile"] = user_profile
+
+        if user_profile is not None and user_profile.username != user.username:
+            # Renames are rare: written with the update, which also drops the
+            # cached profile.
+            await update_users_username(conn=conn, rows=[(user.id, user.username)])
+
+        return await handler(event, data)
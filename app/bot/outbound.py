@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import OrderedDict
+from contextlib import suppress
+from contextvars import ContextVar
+from enum import IntEnum
+from time import monotonic
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+
+from app.infrastructure.metrics.registry import registry
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundPriority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+outbound_priority: ContextVar[OutboundPriority] = ContextVar(
+    "outbound_priority", default=OutboundPriority.NORMAL
+)
+
+OUTBOUND_WAITING = registry.gauge(
+    "bot_outbound_waiting",
+    "Bot API requests waiting for a rate limit token",
+    ("limit", "lane"),
+)
+OUTBOUND_RETRIES = registry.counter(
+    "bot_outbound_retries_total", "Bot API requests retried after a 429"
+)
+OUTBOUND_CHATS = registry.gauge(
+    "bot_outbound_tracked_chats", "Chats with a rate limit bucket"
+)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        # The token is taken right away, the caller waits until it is earned.
+        # Reservations queue up behind each other in arrival order.
+        now = monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def delay(self) -> float:
+        now = monotonic()
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        self._refill(monotonic())
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        group_rate: float = 20 / 60,
+        max_retries: int = 3,
+        max_tracked_chats: int = 10_000,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.max_tracked_chats = max_tracked_chats
+        # No global burst: requests are paced evenly within every second.
+        self._global = TokenBucket(global_rate, 1)
+        self._chats: OrderedDict[int | str, TokenBucket] = OrderedDict()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._pump: asyncio.Task | None = None
+        self._global_waiting = [
+            OUTBOUND_WAITING.labels("global", lane.name.lower())
+            for lane in OutboundPriority
+        ]
+        self._chat_waiting = [
+            OUTBOUND_WAITING.labels("chat", lane.name.lower())
+            for lane in OutboundPriority
+        ]
+        self._chats_gauge = OUTBOUND_CHATS.labels()
+        self._retries = OUTBOUND_RETRIES.labels()
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Response:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+        priority = outbound_priority.get()
+        for attempt in itertools.count():
+            await self._acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as err:
+                if attempt >= self.max_retries:
+                    raise
+                self._retries.inc()
+                self._chat_bucket(chat_id).block(err.retry_after)
+                logger.warning(
+                    "Bot API flood control for the chat %s, retrying `%s` in %ss",
+                    chat_id,
+                    type(method).__name__,
+                    err.retry_after,
+                )
+
+    async def close(self) -> None:
+        if self._pump is not None:
+            self._pump.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._pump
+            self._pump = None
+        for _, _, future in self._waiters:
+            future.cancel()
+        self._waiters.clear()
+
+    async def _acquire(self, chat_id: int | str, priority: int) -> None:
+        delay = self._chat_bucket(chat_id).reserve()
+        if delay:
+            waiting = self._chat_waiting[priority]
+            waiting.inc()
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                waiting.dec()
+
+        if not self._waiters and self._global.delay() == 0:
+            self._global.take()
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run_pump())
+        self._wakeup.set()
+        waiting = self._global_waiting[priority]
+        waiting.inc()
+        try:
+            await future
+        finally:
+            waiting.dec()
+
+    async def _run_pump(self) -> None:
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if delay := self._global.delay():
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._global.take()
+                future.set_result(None)
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is not None:
+            self._chats.move_to_end(chat_id)
+            return bucket
+        # The least recently used chat is the one most likely to be idle.
+        while len(self._chats) >= self.max_tracked_chats:
+            self._chats.popitem(last=False)
+        if isinstance(chat_id, int) and chat_id > 0:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+        else:
+            bucket = TokenBucket(self.group_rate, self.chat_burst)
+        self._chats[chat_id] = bucket
+        self._chats_gauge.set(len(self._chats))
+        return bucket
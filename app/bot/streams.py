@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+import signal
+from contextlib import suppress
+from functools import partial
+from time import time
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from app.infrastructure.metrics.registry import registry
+from .dispatcher import get_update_key
+from .middlewares.dedup import UpdateInProgress
+
+
+logger = logging.getLogger(__name__)
+
+STREAM_UPDATES = registry.counter(
+    "bot_stream_updates_total", "Updates passed through the update streams", ("result",)
+)
+STREAM_LAG_SECONDS = registry.histogram(
+    "bot_stream_lag_seconds", "Time from ingest to the start of processing"
+)
+_published = STREAM_UPDATES.labels("published")
+_acked = STREAM_UPDATES.labels("acked")
+_retried = STREAM_UPDATES.labels("retried")
+_claimed = STREAM_UPDATES.labels("claimed")
+_dead = STREAM_UPDATES.labels("dead")
+_lag_seconds = STREAM_LAG_SECONDS.labels()
+
+DEAD_LETTER_MAXLEN = 10_000
+
+
+def stream_key(prefix: str, partition: int) -> str:
+    return f"{prefix}:{partition}"
+
+
+def dead_letter_key(prefix: str) -> str:
+    return f"{prefix}:dead"
+
+
+def worker_partitions(partitions: int, workers: int, index: int) -> list[int]:
+    if not 0 <= index < workers:
+        logger.error("Worker index must be in [0, %d), got: %d", workers, index)
+        raise ValueError
+    return list(range(index, partitions, workers))
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _field(fields: dict | None, name: str) -> bytes | str | None:
+    if not fields:
+        return None
+    return fields.get(name.encode(), fields.get(name))
+
+
+class UpdateStreamProducer:
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        prefix: str,
+        partitions: int,
+        maxlen: int = 0,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 30.0,
+    ) -> None:
+        self.prefix = prefix
+        self.partitions = partitions
+        self.maxlen = maxlen
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._redis = redis
+
+    async def publish(self, update: Update) -> str:
+        key = get_update_key(update)
+        stream = stream_key(self.prefix, key % self.partitions)
+        payload = update.model_dump_json(exclude_unset=True, by_alias=True)
+        delay = self.retry_delay
+        # Polling moves the offset on once the update is handed over, so the
+        # update is only given up together with the process.
+        while True:
+            try:
+                entry_id = await self._redis.xadd(
+                    stream, {"update": payload, "key": key}, maxlen=self.maxlen or None
+                )
+            except RedisError as err:
+                logger.error(
+                    "Failed to publish the update %d, retrying in %.1fs: %s",
+                    update.update_id,
+                    delay,
+                    err,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            _published.inc()
+            return _text(entry_id)
+
+
+class IngestDispatcher(Dispatcher):
+    def __init__(
+        self,
+        *,
+        producer: UpdateStreamProducer,
+        allowed_updates: list[str],
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.producer = producer
+        self.allowed_updates = allowed_updates
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        # Handlers run in the workers, there is nothing to answer inline.
+        await self.producer.publish(update)
+        return None
+
+    def resolve_used_update_types(
+        self, skip_events: set[str] | None = None
+    ) -> list[str]:
+        return [
+            update_type
+            for update_type in self.allowed_updates
+            if not skip_events or update_type not in skip_events
+        ]
+
+
+class UpdateStreamWorker:
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        redis: Redis,
+        *,
+        prefix: str,
+        partitions: int,
+        group: str,
+        consumer: str,
+        workers: int = 1,
+        index: int = 0,
+        batch_size: int = 100,
+        block: float = 5.0,
+        max_in_flight: int = 100,
+        claim_idle: float = 60.0,
+        claim_interval: float = 30.0,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+    ) -> None:
+        self.prefix = prefix
+        self.group = group
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.block = block
+        self.claim_idle = claim_idle
+        self.claim_interval = claim_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # Every partition has a single reader, so the updates of a user are
+        # not processed by two workers at once, and `_tails` runs them in order.
+        self.streams = [
+            stream_key(prefix, partition)
+            for partition in worker_partitions(partitions, workers, index)
+        ]
+        self._dp = dp
+        self._bot = bot
+        self._redis = redis
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._in_flight: set[tuple[str, str]] = set()
+        self._tails: dict[bytes | str, asyncio.Task] = {}
+        self._handlers: set[asyncio.Task] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        if not self.streams:
+            logger.warning("Worker `%s` has no partitions to read", self.consumer)
+        for stream in self.streams:
+            try:
+                await self._redis.xgroup_create(
+                    stream, self.group, id="0", mkstream=True
+                )
+            except ResponseError as err:
+                if "BUSYGROUP" not in str(err):
+                    raise
+        self._tasks.append(asyncio.create_task(self._read()))
+        if self.claim_interval > 0:
+            self._tasks.append(asyncio.create_task(self._reclaim()))
+        logger.info(
+            "Worker `%s` reads %d update streams: %s",
+            self.consumer,
+            len(self.streams),
+            ", ".join(self.streams),
+        )
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        # Updates already taken are finished and acked, the rest stay in the stream.
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+        logger.info("Worker `%s` stopped", self.consumer)
+
+    async def run(self) -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            with suppress(NotImplementedError):
+                loop.add_signal_handler(signum, stop.set)
+        workflow_data = {
+            "dispatcher": self._dp,
+            "bots": [self._bot],
+            **self._dp.workflow_data,
+        }
+        await self._dp.emit_startup(bot=self._bot, **workflow_data)
+        try:
+            await self.start()
+            await stop.wait()
+        finally:
+            await self.close()
+            await self._dp.emit_shutdown(bot=self._bot, **workflow_data)
+            await self._bot.session.close()
+
+    async def _read(self) -> None:
+        # Updates taken before a restart, by this consumer or by the one it
+        # replaces, come before new ones. An update still running in the old
+        # process waits for its dedup lease.
+        for stream in self.streams:
+            try:
+                await self._claim_pending(stream, min_idle=0)
+            except RedisError as err:
+                logger.error("Failed to resume pending updates of %s: %s", stream, err)
+        streams = {stream: ">" for stream in self.streams}
+        while True:
+            try:
+                response = await self._redis.xreadgroup(
+                    self.group,
+                    self.consumer,
+                    streams,
+                    count=self.batch_size,
+                    block=int(self.block * 1000),
+                )
+            except RedisError as err:
+                logger.error("Failed to read the update streams: %s", err)
+                await asyncio.sleep(self.retry_delay)
+                continue
+            for stream, entries in response or ():
+                await self._dispatch(_text(stream), entries)
+
+    async def _reclaim(self) -> None:
+        while True:
+            await asyncio.sleep(self.claim_interval)
+            for stream in self.streams:
+                try:
+                    await self._claim_pending(
+                        stream, min_idle=int(self.claim_idle * 1000)
+                    )
+                except RedisError as err:
+                    logger.error("Failed to reclaim updates of %s: %s", stream, err)
+
+    async def _claim_pending(
+        self, stream: str, *, min_idle: int, consumer: str | None = None
+    ) -> None:
+        # Entries of a worker that died (or of a partition that moved here)
+        # are taken over once they have been idle for `min_idle` ms.
+        start = "-"
+        while True:
+            pending = await self._redis.xpending_range(
+                stream,
+                self.group,
+                min=start,
+                max="+",
+                count=self.batch_size,
+                consumername=consumer,
+                idle=min_idle or None,
+            )
+            if not pending:
+                return
+            start = "(" + _text(pending[-1]["message_id"])
+            delivered = {
+                _text(entry["message_id"]): entry["times_delivered"]
+                for entry in pending
+                if (stream, _text(entry["message_id"])) not in self._in_flight
+            }
+            if not delivered:
+                continue
+            entries = await self._redis.xclaim(
+                stream, self.group, self.consumer, min_idle, list(delivered)
+            )
+            if consumer is None and entries:
+                _claimed.inc(len(entries))
+                logger.warning(
+                    "Worker `%s` claimed %d pending updates of %s",
+                    self.consumer,
+                    len(entries),
+                    stream,
+                )
+            await self._dispatch(stream, entries, delivered)
+
+    async def _dispatch(
+        self,
+        stream: str,
+        entries: list[tuple[Any, dict]],
+        delivered: dict[str, int] | None = None,
+    ) -> None:
+        # Taken entries wait for a free slot while idle in the pending list,
+        # so they are marked first to keep the reclaim away from them.
+        taken = []
+        for entry_id, fields in entries:
+            entry_id = _text(entry_id)
+            if (stream, entry_id) not in self._in_flight:
+                self._in_flight.add((stream, entry_id))
+                taken.append((entry_id, fields))
+        for entry_id, fields in taken:
+            key = _field(fields, "key")
+            await self._semaphore.acquire()
+            # Chained to the previous update of the same user, retries included.
+            previous = self._tails.get(key) if key is not None else None
+            task = asyncio.create_task(
+                self._handle(
+                    stream,
+                    entry_id,
+                    _field(fields, "update"),
+                    (delivered or {}).get(entry_id, 0),
+                    previous,
+                )
+            )
+            self._handlers.add(task)
+            task.add_done_callback(self._handlers.discard)
+            if key is not None:
+                self._tails[key] = task
+                task.add_done_callback(partial(self._drop_tail, key))
+
+    def _drop_tail(self, key: bytes | str, task: asyncio.Task) -> None:
+        if self._tails.get(key) is task:
+            del self._tails[key]
+
+    async def _handle(
+        self,
+        stream: str,
+        entry_id: str,
+        payload: bytes | str | None,
+        delivered: int,
+        previous: asyncio.Task | None = None,
+    ) -> None:
+        try:
+            if previous is not None:
+                await asyncio.wait((previous,))
+            _lag_seconds.observe(
+                max(0.0, time() - int(entry_id.split("-", 1)[0]) / 1000)
+            )
+            if payload is None:
+                # Trimmed by MAXLEN before anyone got to it.
+                logger.warning(
+                    "Update %s of %s is gone from the stream", entry_id, stream
+                )
+            elif delivered > self.max_retries:
+                # Taken by workers that died every time: most likely it kills them.
+                await self._dead_letter(
+                    stream, entry_id, payload, f"delivered {delivered} times"
+                )
+            else:
+                await self._process(stream, entry_id, payload)
+            await self._ack(stream, entry_id)
+        finally:
+            self._in_flight.discard((stream, entry_id))
+            self._semaphore.release()
+
+    async def _process(self, stream: str, entry_id: str, payload: bytes | str) -> None:
+        try:
+            update = Update.model_validate_json(payload, context={"bot": self._bot})
+        except ValidationError as err:
+            await self._dead_letter(stream, entry_id, payload, repr(err))
+            return
+        attempt = 0
+        while True:
+            try:
+                response = await self._dp.feed_update(self._bot, update)
+                if isinstance(response, TelegramMethod):
+                    await self._dp.silent_call_request(bot=self._bot, result=response)
+                return
+            except UpdateInProgress:
+                # Run by a process that is stopping or dead: it is done, or
+                # taken over here, once the lease is released or expires.
+                await asyncio.sleep(self.retry_delay)
+            except Exception as err:
+                if attempt >= self.max_retries:
+                    logger.exception(
+                        "Update %d failed %d times", update.update_id, attempt + 1
+                    )
+                    await self._dead_letter(stream, entry_id, payload, repr(err))
+                    return
+                attempt += 1
+                _retried.inc()
+                logger.warning(
+                    "Update %d failed, retry %d of %d: %r",
+                    update.update_id,
+                    attempt,
+                    self.max_retries,
+                    err,
+                )
+                await asyncio.sleep(self.retry_delay * attempt)
+
+    async def _dead_letter(
+        self, stream: str, entry_id: str, payload: bytes | str, error: str
+    ) -> None:
+        _dead.inc()
+        logger.error(
+            "Update %s of %s moved to the dead letters: %s", entry_id, stream, error
+        )
+        try:
+            await self._redis.xadd(
+                dead_letter_key(self.prefix),
+                {"stream": stream, "id": entry_id, "update": payload, "error": error},
+                maxlen=DEAD_LETTER_MAXLEN,
+            )
+        except RedisError as err:
+            logger.error("Failed to store the dead letter %s: %s", entry_id, err)
+
+    async def _ack(self, stream: str, entry_id: str) -> None:
+        try:
+            await self._redis.xack(stream, self.group, entry_id)
+        except RedisError as err:
+            # Stays pending and is processed again once reclaimed.
+            logger.error("Failed to ack the update %s of %s: %s", entry_id, stream, err)
+            return
+        _acked.inc()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config.config import WebhookSettings
+
+
+logger = logging.getLogger(__name__)
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, settings: WebhookSettings) -> None:
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.secret_token,
+        handle_in_background=not settings.inline_replies,
+    ).register(app, path=settings.path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.host, port=settings.port)
+
+    try:
+        await site.start()
+        logger.info(
+            "Webhook server is listening on %s:%s%s",
+            settings.host,
+            settings.port,
+            settings.path,
+        )
+        await bot.set_webhook(
+            url=f"{settings.base_url.rstrip('/')}{settings.path}",
+            secret_token=settings.secret_token,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info("Webhook is set to %s%s", settings.base_url, settings.path)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+        logger.info("Webhook server stopped")
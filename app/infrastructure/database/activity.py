@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import date, datetime, timezone
+
+from psycopg_pool import AsyncConnectionPool
+from app.infrastructure.database.db import update_users_activity
+
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    def __init__(
+        self,
+        db_pool: AsyncConnectionPool,
+        *,
+        flush_interval: float = 5.0,
+        max_pending: int = 1000,
+        max_backlog: int = 100_000,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_backlog = max_backlog
+        self.dropped = 0
+        self._db_pool = db_pool
+        self._pending: dict[tuple[int, date], int] = {}
+        self._flush_requested = asyncio.Event()
+        self._closing = False
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, user_id: int, actions: int = 1) -> None:
+        key = (user_id, datetime.now(timezone.utc).date())
+        self._pending[key] = self._pending.get(key, 0) + actions
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                "Activity buffer started: flush_interval=%ss, max_pending=%d",
+                self.flush_interval,
+                self.max_pending,
+            )
+
+    async def close(self) -> None:
+        if self._task is not None:
+            # Not cancelled: a flush in progress must finish, not lose its batch.
+            self._closing = True
+            self._flush_requested.set()
+            await self._task
+            self._task = None
+            self._closing = False
+        await self.flush()
+        logger.info("Activity buffer closed")
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            rows = [
+                (user_id, activity_date, actions)
+                for (user_id, activity_date), actions in pending.items()
+            ]
+            try:
+                async with self._db_pool.connection() as conn:
+                    await update_users_activity(conn=conn, rows=rows)
+            except Exception as err:
+                logger.error("Failed to flush %d activity rows: %s", len(rows), err)
+                self._restore(pending)
+            except asyncio.CancelledError:
+                self._restore(pending)
+                raise
+
+    def _restore(self, pending: dict[tuple[int, date], int]) -> None:
+        # Counted rows only grow while the database is down: past the backlog,
+        # rows new to the buffer are dropped instead of kept in memory.
+        dropped = 0
+        for key, actions in pending.items():
+            if key in self._pending:
+                self._pending[key] += actions
+            elif len(self._pending) < self.max_backlog:
+                self._pending[key] = actions
+            else:
+                dropped += 1
+        if dropped:
+            self.dropped += dropped
+            logger.error(
+                "Activity backlog is full (%d rows), dropped %d rows",
+                self.max_backlog,
+                dropped,
+            )
+
+    async def _run(self) -> None:
+        while not self._closing:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self.flush_interval
+                )
+            self._flush_requested.clear()
+            if self._closing:
+                break
+            try:
+                await self.flush()
+            except Exception:
+                # The next interval tries again.
+                logger.exception("Activity flush failed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+from contextlib import suppress
+
+from psycopg import AsyncConnection, Error
+from psycopg_pool import AsyncConnectionPool
+from app.infrastructure.database.cache import UserCache, user_cache
+from app.infrastructure.database.db import (
+    BANNED_USERS_CHANNEL,
+    USERS_CHANGED_CHANNEL,
+    get_banned_user_ids,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class BannedUsers:
+    def __init__(
+        self,
+        conninfo: str,
+        db_pool: AsyncConnectionPool,
+        *,
+        resync_interval: float = 300.0,
+        reconnect_delay: float = 5.0,
+        cache: UserCache = user_cache,
+    ) -> None:
+        self.resync_interval = resync_interval
+        self.reconnect_delay = reconnect_delay
+        self._conninfo = conninfo
+        self._db_pool = db_pool
+        self._cache = cache
+        self._user_ids: set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._user_ids
+
+    def __len__(self) -> int:
+        return len(self._user_ids)
+
+    async def start(self) -> None:
+        await self.reload()
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def reload(self) -> None:
+        async with self._db_pool.connection() as conn:
+            user_ids = await get_banned_user_ids(conn=conn)
+        self._user_ids = set(user_ids)
+        logger.info("Banned users loaded: %d", len(self._user_ids))
+
+    def _invalidate(self, payload: str) -> None:
+        try:
+            user_id = int(payload)
+        except ValueError:
+            logger.error("Malformed `%s` payload: %s", USERS_CHANGED_CHANNEL, payload)
+            return
+        self._cache.invalidate(user_id)
+
+    def _apply(self, payload: str) -> None:
+        try:
+            raw_user_id, raw_banned = payload.split(":")
+            user_id, banned = int(raw_user_id), raw_banned == "1"
+        except ValueError:
+            logger.error("Malformed `%s` payload: %s", BANNED_USERS_CHANNEL, payload)
+            return
+        if banned:
+            self._user_ids.add(user_id)
+        else:
+            self._user_ids.discard(user_id)
+        logger.info("Banned status of the user %s changed to %s", user_id, banned)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                conn = await AsyncConnection.connect(self._conninfo, autocommit=True)
+                async with conn:
+                    await conn.execute(f"listen {BANNED_USERS_CHANNEL}")
+                    # The same connection keeps the user cache in step with
+                    # writes made by the other processes.
+                    await conn.execute(f"listen {USERS_CHANGED_CHANNEL}")
+                    # Changes made before LISTEN took effect are not delivered.
+                    await self.reload()
+                    self._cache.clear()
+                    while True:
+                        async for notify in conn.notifies(timeout=self.resync_interval):
+                            if notify.channel == USERS_CHANGED_CHANNEL:
+                                self._invalidate(notify.payload)
+                            else:
+                                self._apply(notify.payload)
+                        await self.reload()
+            except Error as err:
+                logger.error("Listening for banned users failed: %s", err)
+                await asyncio.sleep(self.reconnect_delay)
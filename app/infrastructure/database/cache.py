@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+
+import logging
+from collections import OrderedDict
+from functools import wraps
+from time import monotonic
+from typing import Any, Awaitable, Callable, TypeAlias
+
+
+logger = logging.getLogger(__name__)
+CacheKey: TypeAlias = tuple[str, int]
+Reader: TypeAlias = Callable[..., Awaitable[Any]]
+
+_MISSING = object()
+
+
+class UserCache:
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[CacheKey, tuple[float, Any]] = OrderedDict()
+        self._namespaces: set[str] = set()
+        # user_id -> (reads in flight, generation), bumped by invalidate: a read
+        # that started before it must not store what it loaded.
+        self._reads: dict[int, tuple[int, int]] = {}
+
+    def configure(self, *, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clear()
+        logger.info("User cache configured: maxsize=%d, ttl=%ss", maxsize, ttl)
+
+    def get(self, namespace: str, user_id: int) -> Any:
+        key = (namespace, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, namespace: str, user_id: int, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        key = (namespace, user_id)
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        for namespace in self._namespaces:
+            self._entries.pop((namespace, user_id), None)
+        if user_id in self._reads:
+            reads, generation = self._reads[user_id]
+            self._reads[user_id] = (reads, generation + 1)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        for user_id, (reads, generation) in self._reads.items():
+            self._reads[user_id] = (reads, generation + 1)
+
+    def _start_read(self, user_id: int) -> int:
+        reads, generation = self._reads.get(user_id, (0, 0))
+        self._reads[user_id] = (reads + 1, generation)
+        return generation
+
+    def _finish_read(self, user_id: int, generation: int) -> bool:
+        reads, current = self._reads.pop(user_id)
+        if reads > 1:
+            self._reads[user_id] = (reads - 1, current)
+        return current == generation
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def cached(self, namespace: str) -> Callable[[Reader], Reader]:
+        self._namespaces.add(namespace)
+
+        def decorator(func: Reader) -> Reader:
+            @wraps(func)
+            async def wrapper(*args: Any, user_id: int, **kwargs: Any) -> Any:
+                value = self.get(namespace, user_id)
+                if value is _MISSING:
+                    generation = self._start_read(user_id)
+                    try:
+                        value = await func(*args, user_id=user_id, **kwargs)
+                    finally:
+                        fresh = self._finish_read(user_id, generation)
+                    if fresh:
+                        self.set(namespace, user_id, value)
+                return value
+
+            return wrapper
+
+        return decorator
+
+
+user_cache = UserCache()
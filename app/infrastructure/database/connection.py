@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
 
+import asyncio
 import logging
-from psycopg import AsyncConnection, Error
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, TypeAlias
+from psycopg import AsyncConnection, AsyncCursor, Error
+from psycopg.errors import UndefinedTable
 from psycopg_pool import AsyncConnectionPool
 from urllib.parse import quote
 from config.config import Config
@@ -40,6 +44,32 @@ async def log_db_version(connection: AsyncConnection) -> None:
         logger.error("Failed to fetch DB version: %s", err)
 
 
+async def check_schema_version(db_pool: AsyncConnectionPool, expected: int) -> None:
+    try:
+        async with db_pool.connection() as connection:
+            cursor = await connection.execute(
+                "select coalesce(max(version), 0) from schema_migrations"
+            )
+            version = (await cursor.fetchone())[0]
+    except UndefinedTable:
+        version = 0
+    if version < expected:
+        logger.error(
+            "Database schema is at version %d, the bot needs %d. "
+            "Run `python -m migrations.migrate` first",
+            version,
+            expected,
+        )
+        raise RuntimeError
+    if version > expected:
+        # Additive migrations may ship ahead of the code that uses them.
+        logger.warning(
+            "Database schema is at version %d, newer than %d", version, expected
+        )
+    else:
+        logger.info("Database schema version: %d", version)
+
+
 async def get_pg_connection(config: Config) -> AsyncConnection:
     conninfo = build_pg_conninfo(config)
     connection: AsyncConnection | None = None
@@ -55,18 +85,22 @@ async def get_pg_connection(config: Config) -> AsyncConnection:
         raise
 
 
-async def get_pg_pool(
-    config: Config, min_size: int = 1, max_size: int = 3, timeout: float | None = 10.0
-) -> AsyncConnectionPool:
+async def get_pg_pool(config: Config) -> AsyncConnectionPool:
     conninfo = build_pg_conninfo(config)
+    pool = config.pool
+    prepared = config.db.prepared_statements
     db_pool: AsyncConnectionPool | None = None
 
     try:
         db_pool = AsyncConnectionPool(
             conninfo=conninfo,
-            min_size=min_size,
-            max_size=max_size,
-            timeout=timeout,
+            min_size=pool.min_size,
+            max_size=pool.max_size,
+            timeout=pool.timeout,
+            max_idle=pool.max_idle,
+            max_lifetime=pool.max_lifetime,
+            check=AsyncConnectionPool.check_connection if pool.check else None,
+            kwargs=None if prepared else {"prepare_threshold": None},
             open=False,
         )
         await db_pool.open()
@@ -80,3 +114,65 @@ async def get_pg_pool(
         if db_pool and not db_pool.closed:
             await db_pool.close()
         raise
+
+
+async def export_pool_stats(db_pool: AsyncConnectionPool, interval: float) -> None:
+    previous: dict[str, int] = {}
+    while True:
+        await asyncio.sleep(interval)
+        stats = db_pool.get_stats()
+        requests = stats.get("requests_num", 0) - previous.get("requests_num", 0)
+        queued = stats.get("requests_queued", 0) - previous.get("requests_queued", 0)
+        wait_ms = stats.get("requests_wait_ms", 0) - previous.get("requests_wait_ms", 0)
+        timeouts = stats.get("requests_errors", 0) - previous.get("requests_errors", 0)
+        previous = stats
+        logger.info(
+            (
+                "Postgres pool stats: size=%d, in_use=%d, waiting=%d, "
+                "requests=%d, queued=%d, wait_ms=%d, avg_wait_ms=%.1f, timeouts=%d"
+            ),
+            stats.get("pool_size", 0),
+            stats.get("pool_size", 0) - stats.get("pool_available", 0),
+            stats.get("requests_waiting", 0),
+            requests,
+            queued,
+            wait_ms,
+            wait_ms / queued if queued else 0.0,
+            timeouts,
+        )
+
+
+class LazyConnection:
+    # Outside `transaction()` every statement checks out its own autocommit
+    # connection: single-statement writes (add_user, revive_user, ...) are
+    # atomic on their own, writes that must go together use `transaction()`.
+    def __init__(self, db_pool: AsyncConnectionPool) -> None:
+        self._db_pool = db_pool
+        self._connection: AsyncConnection | None = None
+
+    @asynccontextmanager
+    async def cursor(self, *args: Any, **kwargs: Any) -> AsyncIterator[AsyncCursor]:
+        if self._connection is not None:
+            async with self._connection.cursor(*args, **kwargs) as cursor:
+                yield cursor
+            return
+        async with self._db_pool.connection() as connection:
+            async with connection.cursor(*args, **kwargs) as cursor:
+                yield cursor
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["LazyConnection"]:
+        if self._connection is not None:
+            async with self._connection.transaction():
+                yield self
+            return
+        async with self._db_pool.connection() as connection:
+            self._connection = connection
+            try:
+                async with connection.transaction():
+                    yield self
+            finally:
+                self._connection = None
+
+
+Connection: TypeAlias = AsyncConnection | LazyConnection
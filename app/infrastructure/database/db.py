@@ -2,17 +2,28 @@
 
 
 import logging
-from datetime import datetime, timezone
-from psycopg import AsyncConnection
+from datetime import date, datetime, timezone
 from app.bot.enums.roles import UserRole
-from typing import Any
+from app.infrastructure.database import queries
+from app.infrastructure.database.cache import user_cache
+from app.infrastructure.database.connection import Connection
+from app.infrastructure.database.models import Broadcast, UserProfile
+from app.infrastructure.database.queries import execute
+from psycopg import AsyncConnection
+from typing import Any, AsyncIterator
 
 
 logger = logging.getLogger(__name__)
 
+BANNED_USERS_CHANNEL = "banned_users"
+# Notified by a trigger on every insert or update of `users`.
+USERS_CHANGED_CHANNEL = "users_changed"
+# pg_try_advisory_lock(BROADCAST_LOCK_CLASS, broadcast_id)
+BROADCAST_LOCK_CLASS = 7_246_002
+
 
 async def add_user(
-    conn: AsyncConnection,
+    conn: Connection,
     *,
     user_id: int,
     username: str | None = None,
@@ -22,17 +33,6 @@ async def add_user(
     banned: bool = False,
 ) -> None:
     async with conn.cursor() as cursor:
-        query = """
-            insert into users(user_id, username, language, role, is_alive, banned)
-            values(
-                %(user_id)s,
-                %(username)s,
-                %(language)s,
-                %(role)s,
-                %(is_alive)s,
-                %(banned)s
-            ) on conflict do nothing;
-            """
         params = {
             "user_id": user_id,
             "username": username,
@@ -41,7 +41,7 @@ async def add_user(
             "is_alive": is_alive,
             "banned": banned,
         }
-        await cursor.execute(query=query, params=params)
+        await execute(cursor, queries.ADD_USER, params)
         logger.info(
             (
                 "User added. User_id=%s, created_at=%s, "
@@ -54,165 +54,246 @@ async def add_user(
             is_alive,
             banned,
         )
+    user_cache.invalidate(user_id)
 
 
-async def get_user(conn: AsyncConnection, user_id: int) -> tuple[Any, ...] | None:
+@user_cache.cached("user")
+async def get_user(conn: Connection, *, user_id: int) -> tuple[Any, ...] | None:
     async with conn.cursor() as cursor:
-        query = (
-            "select id, user_id, username, language, role, is_alive, banned, created_at "
-            "from users "
-            "where user_id = %s"
-        )
-        params = (user_id,)
-        data = await cursor.execute(query=query, params=params)
+        data = await execute(cursor, queries.GET_USER, (user_id,))
         row = await data.fetchone()
-    logger.info("User is %s", row)
+    if row is None:
+        logger.info("No user with `user_id`=%s found in the database", user_id)
+    else:
+        logger.info("User with `user_id`=%s loaded", user_id)
     return row if row else None
 
 
+@user_cache.cached("profile")
+async def get_user_profile(conn: Connection, *, user_id: int) -> UserProfile | None:
+    async with conn.cursor() as cursor:
+        await execute(cursor, queries.GET_USER_PROFILE, (user_id,))
+        row = await cursor.fetchone()
+    if row is None:
+        logger.info("No user with `user_id`=%s found in the database", user_id)
+        return None
+    logger.info("Profile of the user with `user_id`=%s loaded", user_id)
+    return UserProfile(
+        user_id=row[0],
+        username=row[1],
+        language=row[2],
+        role=UserRole(row[3]),
+        is_alive=row[4],
+        banned=row[5],
+    )
+
+
 async def update_user_alive_status(
-    conn: AsyncConnection, *, is_alive: bool, user_id: int
+    conn: Connection, *, is_alive: bool, user_id: int
 ) -> None:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="update users set is_alive = %s where user_id = %s",
-            params=(is_alive, user_id),
-        )
+        await execute(cursor, queries.UPDATE_USER_ALIVE_STATUS, (is_alive, user_id))
+    user_cache.invalidate(user_id)
     logger.info("Updated `is_alive` status to %s for user %s", is_alive, user_id)
 
 
-async def update_user_banned_status_by_id(
-    conn: AsyncConnection, *, banned: bool, user_id: int
-) -> None:
+async def update_users_banned_status(
+    conn: Connection,
+    *,
+    banned: bool,
+    user_ids: list[int] | None = None,
+    usernames: list[str] | None = None,
+) -> list[tuple[int, str | None, bool]]:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="update users set banned = %s where user_id = %s",
-            params=(banned, user_id),
+        await execute(
+            cursor,
+            queries.UPDATE_USERS_BANNED_STATUS,
+            {
+                "banned": banned,
+                "user_ids": user_ids or [],
+                "usernames": [username.lower() for username in usernames or ()],
+                "channel": BANNED_USERS_CHANNEL,
+            },
         )
-    logger.info("Updated `banned` status to %s for user %s", banned, user_id)
+        rows = await cursor.fetchall()
+    results = [(row[0], row[1], row[2]) for row in rows]
+    changed = 0
+    for user_id, _, updated in results:
+        if updated:
+            user_cache.invalidate(user_id)
+            changed += 1
+    logger.info(
+        "Updated `banned` status to %s for %d users, %d already had it",
+        banned,
+        changed,
+        len(results) - changed,
+    )
+    return results
 
 
-async def update_user_banned_status_by_username(
-    conn: AsyncConnection, *, banned: bool, username: str
-) -> None:
+async def update_user_lang(conn: Connection, *, language: str, user_id: int) -> None:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="update users set banned = %s where username = %s",
-            params=(banned, username),
-        )
-    logger.info("Updated `banned` status to %s for user %s", banned, username)
+        await execute(cursor, queries.UPDATE_USER_LANG, (language, user_id))
+    user_cache.invalidate(user_id)
+    logger.info("The language `%s` is set for the user %s", language, user_id)
 
 
-async def update_user_lang(
-    conn: AsyncConnection, *, language: str, user_id: int
+async def update_users_username(
+    conn: Connection, *, rows: list[tuple[int, str | None]]
 ) -> None:
+    user_ids, usernames = map(list, zip(*rows))
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="update users set language = %s where user_id = %s",
-            params=(language, user_id),
-        )
-    logger.info("The language `%s` is set for the user %s", language, user_id)
+        await execute(cursor, queries.UPDATE_USERS_USERNAME, (user_ids, usernames))
+        changed = await cursor.fetchall()
+    for row in changed:
+        user_cache.invalidate(row[0])
+    logger.info(
+        "Usernames refreshed: batch=%d, rows updated=%d", len(rows), len(changed)
+    )
 
 
-async def get_user_lang(conn: AsyncConnection, *, user_id: int) -> str | None:
+async def get_banned_user_ids(conn: Connection) -> list[int]:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="select language from users where user_id = %s", params=(user_id,)
-        )
-        row = await cursor.fetchone()
-    if row:
-        logger.info("The user with `user_id`=%s has the language `%s`", user_id, row[0])
-    else:
-        logger.info("No user with `user_id`=%s found in the database", user_id)
-    return row[0] if row else None
+        await execute(cursor, queries.GET_BANNED_USER_IDS)
+        rows = await cursor.fetchall()
+    logger.info("Fetched %d banned users", len(rows))
+    return [row[0] for row in rows]
 
 
-async def get_user_alive_status(conn: AsyncConnection, *, user_id: int) -> bool | None:
+async def update_users_activity(
+    conn: Connection, *, rows: list[tuple[int, date, int]]
+) -> None:
+    user_ids, activity_dates, actions = map(list, zip(*rows))
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="select is_alive from users where user_id = %s", params=(user_id,)
-        )
-        row = await cursor.fetchone()
-    if row:
-        logger.info(
-            "The user with `user_id`=%s has the is_alive status `%s`",
-            user_id,
-            row[0],
+        await execute(
+            cursor, queries.UPDATE_USERS_ACTIVITY, (user_ids, activity_dates, actions)
         )
-    else:
-        logger.info("No user with `user_id`=%s found in the database", user_id)
-    return row[0] if row else None
+    logger.info(
+        "Users activity updated. Tables=`activity`, `activity_totals`, "
+        "`activity_rollups`, rows=%d",
+        len(rows),
+    )
 
 
-async def get_user_banned_status_by_id(
-    conn: AsyncConnection, *, user_id: int
-) -> bool | None:
+async def get_statistics(
+    conn: Connection, *, period: str = "all", limit: int = 5
+) -> list[Any] | None:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="select banned from users where user_id = %s", params=(user_id,)
-        )
-        row = await cursor.fetchone()
-    if row:
-        logger.info(
-            "The user with `user_id`=%s has the banned status `%s`", user_id, row[0]
-        )
-    else:
-        logger.info("No user with `user_id`=%s found in the database", user_id)
-    return row[0] if row else None
+        if period == "all":
+            await execute(cursor, queries.GET_STATISTICS_ALL, (limit,))
+        elif period == "day":
+            await execute(cursor, queries.GET_STATISTICS_DAY, (limit,))
+        else:
+            await execute(
+                cursor,
+                queries.GET_STATISTICS_PERIOD,
+                {"period": period, "limit": limit},
+            )
+        rows = await cursor.fetchall()
+    logger.info("Users activity fetched for period=`%s`", period)
+    return [*rows] if rows else None
 
 
-async def get_user_banned_status_by_username(
-    conn: AsyncConnection, *, username: str
-) -> bool | None:
+async def create_broadcast(
+    conn: Connection,
+    *,
+    admin_id: int,
+    locale: str,
+    from_chat_id: int | None = None,
+    message_id: int | None = None,
+    text: str | None = None,
+) -> Broadcast:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="select banned from users where username = %s", params=(username,)
+        await execute(
+            cursor,
+            queries.CREATE_BROADCAST,
+            (admin_id, locale, from_chat_id, message_id, text),
         )
         row = await cursor.fetchone()
-    if row:
-        logger.info(
-            "The user with `username`=%s has the banned status `%s`", username, row[0]
-        )
-    else:
-        logger.info("No user with `username`=%s found in the database", username)
-    return row[0] if row else None
+    logger.info("Broadcast %s created by the admin %s", row[0], admin_id)
+    return Broadcast(
+        id=row[0],
+        admin_id=admin_id,
+        locale=locale,
+        from_chat_id=from_chat_id,
+        message_id=message_id,
+        text=text,
+    )
 
 
-async def get_user_role(conn: AsyncConnection, *, user_id: int) -> str | None:
+async def get_running_broadcasts(conn: Connection) -> list[Broadcast]:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="select role from users where user_id = %s", params=(user_id,)
+        await execute(cursor, queries.GET_RUNNING_BROADCASTS)
+        rows = await cursor.fetchall()
+    logger.info("Fetched %d running broadcasts", len(rows))
+    return [Broadcast(*row) for row in rows]
+
+
+async def lock_broadcast(conn: AsyncConnection, *, broadcast: Broadcast) -> bool:
+    # A session lock: released when the connection closes, or the process dies.
+    async with conn.cursor() as cursor:
+        await execute(
+            cursor, queries.LOCK_BROADCAST, (BROADCAST_LOCK_CLASS, broadcast.id)
         )
+        if not (await cursor.fetchone())[0]:
+            return False
+        # Another process may have moved it on before letting the lock go.
+        await execute(cursor, queries.GET_BROADCAST_PROGRESS, (broadcast.id,))
         row = await cursor.fetchone()
-    if row:
-        logger.info("The user with `user_id`=%s has the role `%s`", user_id, row[0])
-    else:
-        logger.info("No user with `user_id`=%s found in the database", user_id)
-    return row[0] if row else None
+    if row is None:
+        return False
+    broadcast.last_user_id, broadcast.sent, broadcast.blocked, broadcast.failed = row
+    return True
 
 
-async def update_user_activity(conn: AsyncConnection, *, user_id: int) -> None:
+async def update_broadcast_progress(conn: Connection, *, broadcast: Broadcast) -> None:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query=(
-                "insert into activity(user_id) values(%s) on "
-                "conflict (user_id, activity_date) "
-                "do update set actions = activity.actions + 1"
+        await execute(
+            cursor,
+            queries.UPDATE_BROADCAST_PROGRESS,
+            (
+                broadcast.last_user_id,
+                broadcast.sent,
+                broadcast.blocked,
+                broadcast.failed,
+                broadcast.id,
             ),
-            params=(user_id,),
         )
-    logger.info("User activity updated. Table=`activity`, user_id=%d", user_id)
 
 
-async def get_statistics(conn: AsyncConnection) -> list[Any] | None:
+async def finish_broadcast(conn: Connection, *, broadcast_id: int) -> None:
     async with conn.cursor() as cursor:
-        await cursor.execute(
-            query=(
-                "select user_id, sum(actions) as total_actions "
-                "from activity group by user_id "
-                "order by total_actions desc limit 5"
-            )
-        )
+        await execute(cursor, queries.FINISH_BROADCAST, (broadcast_id,))
+    logger.info("Broadcast %s finished", broadcast_id)
+
+
+async def revive_user(conn: Connection, *, user_id: int) -> bool:
+    # Unconditional: the cached `is_alive` of another process may be stale.
+    async with conn.cursor() as cursor:
+        await execute(cursor, queries.REVIVE_USER, (user_id,))
+        revived = await cursor.fetchone() is not None
+    if revived:
+        user_cache.invalidate(user_id)
+        logger.info("Updated `is_alive` status to True for user %s", user_id)
+    return revived
+
+
+async def mark_users_not_alive(conn: Connection, *, user_ids: list[int]) -> int:
+    async with conn.cursor() as cursor:
+        await execute(cursor, queries.MARK_USERS_NOT_ALIVE, (user_ids,))
         rows = await cursor.fetchall()
-    logger.info("Users activity fetched from table=`activity`")
-    return [*rows] if rows else None
+    for row in rows:
+        user_cache.invalidate(row[0])
+    logger.info("Updated `is_alive` status to False for %d users", len(rows))
+    return len(rows)
+
+
+async def stream_alive_users(
+    conn: AsyncConnection, *, after: int = 0, batch_size: int = 1000
+) -> AsyncIterator[list[int]]:
+    # A server-side cursor keeps only one batch of ids in memory.
+    async with conn.cursor(name="alive_users", withhold=True) as cursor:
+        cursor.itersize = batch_size
+        await execute(cursor, queries.STREAM_ALIVE_USERS, (after,))
+        while rows := await cursor.fetchmany(batch_size):
+            yield [row[0] for row in rows]
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+
+from dataclasses import dataclass
+from app.bot.enums.roles import UserRole
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile:
+    user_id: int
+    username: str | None
+    language: str
+    role: UserRole
+    is_alive: bool
+    banned: bool
+
+
+@dataclass(slots=True)
+class Broadcast:
+    id: int
+    admin_id: int
+    locale: str
+    from_chat_id: int | None
+    message_id: int | None
+    text: str | None
+    last_user_id: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+import re
+from contextlib import suppress
+from datetime import date, datetime, timezone
+
+from psycopg import AsyncConnection, Error, sql
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_ARCHIVE_SCHEMA = "activity_archive"
+RETENTION_MODES = ("detach", "archive", "drop")
+ROLLUP_PERIODS = ("week", "month")
+_PARTITION_NAME = re.compile(r"activity_p(\d{4})_(\d{2})")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"activity_p{month:%Y_%m}"
+
+
+async def create_activity_partitions(
+    conn: AsyncConnection, *, first: date, last: date, parent: str = "activity"
+) -> list[str]:
+    created = []
+    month = month_start(first)
+    async with conn.cursor() as cursor:
+        while month <= last:
+            name = partition_name(month)
+            await cursor.execute(
+                "select to_regclass(%s) is not null", (f"public.{name}",)
+            )
+            row = await cursor.fetchone()
+            if not row[0]:
+                await cursor.execute(
+                    sql.SQL(
+                        "create table {} partition of {} "
+                        "for values from ({}) to ({})"
+                    ).format(
+                        sql.Identifier(name),
+                        sql.Identifier(parent),
+                        sql.Literal(month),
+                        sql.Literal(add_months(month, 1)),
+                    )
+                )
+                created.append(name)
+            month = add_months(month, 1)
+    if created:
+        logger.info("Activity partitions created: %s", ", ".join(created))
+    return created
+
+
+async def get_activity_partitions(
+    conn: AsyncConnection,
+) -> list[tuple[str, date, bool]]:
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            "select c.relname, i.inhdetachpending from pg_inherits i "
+            "join pg_class c on c.oid = i.inhrelid "
+            "where i.inhparent = 'activity'::regclass order by c.relname"
+        )
+        rows = await cursor.fetchall()
+    partitions = []
+    for name, detach_pending in rows:
+        match = _PARTITION_NAME.fullmatch(name)
+        if match is None:
+            logger.warning("Unexpected activity partition `%s` is skipped", name)
+            continue
+        partitions.append((name, date(int(match[1]), int(match[2]), 1), detach_pending))
+    return partitions
+
+
+async def retire_activity_partition(
+    conn: AsyncConnection, *, name: str, mode: str, detach_pending: bool = False
+) -> None:
+    table = sql.Identifier(name)
+    # Needs autocommit: CONCURRENTLY cannot run inside a transaction block.
+    # An interrupted concurrent detach has to be finished with FINALIZE.
+    await conn.execute(
+        sql.SQL("alter table activity detach partition {} {}").format(
+            table, sql.SQL("finalize" if detach_pending else "concurrently")
+        )
+    )
+    if mode == "drop":
+        await conn.execute(sql.SQL("drop table {}").format(table))
+    elif mode == "archive":
+        schema = sql.Identifier(ACTIVITY_ARCHIVE_SCHEMA)
+        await conn.execute(sql.SQL("create schema if not exists {}").format(schema))
+        await conn.execute(
+            sql.SQL("alter table {} set schema {}").format(table, schema)
+        )
+    logger.info("Activity partition `%s` retired: mode=%s", name, mode)
+
+
+async def prune_activity_rollups(
+    conn: AsyncConnection, *, before: date, batch_size: int = 10_000
+) -> int:
+    # Batches keep the row locks and the WAL of one delete small; each one is
+    # committed on its own (autocommit).
+    pruned = 0
+    for period in ROLLUP_PERIODS:
+        while True:
+            cursor = await conn.execute(
+                "delete from activity_rollups "
+                "where (period, period_start, user_id) in ("
+                "select period, period_start, user_id from activity_rollups "
+                "where period = %s and period_start < %s limit %s)",
+                (period, before, batch_size),
+            )
+            pruned += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+    if pruned:
+        logger.info("Activity rollups before %s pruned: %d rows", before, pruned)
+    return pruned
+
+
+class ActivityPartitions:
+    def __init__(
+        self,
+        conninfo: str,
+        *,
+        months_ahead: int = 3,
+        retention_months: int = 0,
+        retention_mode: str = "archive",
+        interval: float = 6 * 3600,
+        lock_timeout: float = 5.0,
+        prune_batch_size: int = 10_000,
+    ) -> None:
+        if retention_mode not in RETENTION_MODES:
+            logger.error(
+                "Retention mode must be one of %s, got: %s",
+                RETENTION_MODES,
+                retention_mode,
+            )
+            raise ValueError
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.retention_mode = retention_mode
+        self.interval = interval
+        self.lock_timeout = lock_timeout
+        self.prune_batch_size = prune_batch_size
+        self._conninfo = conninfo
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        try:
+            await self.maintain()
+        except Error as err:
+            logger.error("Activity partition maintenance failed: %s", err)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def maintain(self) -> None:
+        current = month_start(datetime.now(timezone.utc).date())
+        conn = await AsyncConnection.connect(self._conninfo, autocommit=True)
+        async with conn:
+            # Give up instead of queueing writers behind a DDL lock; retried later.
+            await conn.execute(
+                sql.SQL("set lock_timeout = {}").format(
+                    sql.Literal(f"{int(self.lock_timeout * 1000)}ms")
+                )
+            )
+            await create_activity_partitions(
+                conn, first=current, last=add_months(current, self.months_ahead)
+            )
+            if self.retention_months <= 0:
+                return
+            cutoff = add_months(current, -self.retention_months)
+            for name, month, detach_pending in await get_activity_partitions(conn):
+                if month < cutoff:
+                    await retire_activity_partition(
+                        conn,
+                        name=name,
+                        mode=self.retention_mode,
+                        detach_pending=detach_pending,
+                    )
+            # The rollups are kept for as long as the activity they sum up.
+            await prune_activity_rollups(
+                conn, before=cutoff, batch_size=self.prune_batch_size
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.maintain()
+            except Error as err:
+                logger.error("Activity partition maintenance failed: %s", err)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+
+import logging
+from time import perf_counter
+from typing import Any, Mapping, Sequence, TypeAlias
+
+from psycopg import AsyncCursor, Error
+
+from app.infrastructure.metrics.registry import registry
+
+
+logger = logging.getLogger(__name__)
+Params: TypeAlias = Sequence[Any] | Mapping[str, Any] | None
+
+DB_QUERY_SECONDS = registry.histogram(
+    "bot_db_query_seconds", "Latency of catalog queries", ("query",)
+)
+DB_QUERY_ERRORS = registry.counter(
+    "bot_db_query_errors_total", "Failed catalog queries", ("query",)
+)
+
+
+class Query:
+    __slots__ = ("name", "sql", "latency", "errors")
+
+    def __init__(self, name: str, query: str) -> None:
+        self.name = name
+        self.sql = query
+        self.latency = DB_QUERY_SECONDS.labels(name)
+        self.errors = DB_QUERY_ERRORS.labels(name)
+
+
+ADD_USER = Query(
+    "add_user",
+    """
+    with inserted as (
+        insert into users(user_id, username, language, role, is_alive, banned)
+        values(
+            %(user_id)s,
+            %(username)s,
+            %(language)s,
+            %(role)s,
+            %(is_alive)s,
+            %(banned)s
+        ) on conflict do nothing
+        returning user_id, username
+    )
+    update users u set username = null, username_updated_at = now()
+    from inserted i
+    where lower(u.username) = lower(i.username) and u.user_id <> i.user_id
+    """,
+)
+GET_USER = Query(
+    "get_user",
+    "select id, user_id, username, language, role, is_alive, banned, created_at "
+    "from users where user_id = %s",
+)
+GET_USER_PROFILE = Query(
+    "get_user_profile",
+    "select user_id, username, language, role, is_alive, banned "
+    "from users where user_id = %s",
+)
+UPDATE_USER_ALIVE_STATUS = Query(
+    "update_user_alive_status",
+    "update users set is_alive = %s where user_id = %s",
+)
+UPDATE_USERS_BANNED_STATUS = Query(
+    "update_users_banned_status",
+    """
+    with updated as (
+        update users set banned = %(banned)s
+        where (
+            user_id = any(%(user_ids)s::bigint[])
+            or lower(username) = any(%(usernames)s::text[])
+        ) and banned <> %(banned)s
+        returning user_id, username, banned
+    )
+    select u.user_id, u.username, true
+    from updated u,
+        lateral (select pg_notify(%(channel)s, u.user_id || ':' || u.banned::int)) n
+    union all
+    select user_id, username, false
+    from users
+    where (
+        user_id = any(%(user_ids)s::bigint[])
+        or lower(username) = any(%(usernames)s::text[])
+    ) and banned = %(banned)s
+    """,
+)
+UPDATE_USER_LANG = Query(
+    "update_user_lang",
+    "update users set language = %s where user_id = %s",
+)
+UPDATE_USERS_USERNAME = Query(
+    "update_users_username",
+    """
+    with batch as (
+        select t.user_id, t.username
+        from unnest(%s::bigint[], %s::varchar[]) as t(user_id, username)
+    ), changed as (
+        select b.user_id, b.username
+        from batch b join users u on u.user_id = b.user_id
+        where u.username is distinct from b.username
+    ), released as (
+        update users u set username = null, username_updated_at = now()
+        from changed c
+        where lower(u.username) = lower(c.username)
+            and not exists (select 1 from changed x where x.user_id = u.user_id)
+        returning u.user_id
+    ), renamed as (
+        update users u set username = c.username, username_updated_at = now()
+        from changed c
+        where u.user_id = c.user_id
+        returning u.user_id
+    )
+    select user_id from released
+    union all
+    select user_id from renamed
+    """,
+)
+GET_BANNED_USER_IDS = Query(
+    "get_banned_user_ids",
+    "select user_id from users where banned",
+)
+UPDATE_USERS_ACTIVITY = Query(
+    "update_users_activity",
+    """
+    with batch as (
+        select t.user_id, t.activity_date, t.actions
+        from unnest(%s::bigint[], %s::date[], %s::int[])
+            as t(user_id, activity_date, actions)
+        where exists (select 1 from users u where u.user_id = t.user_id)
+    ), daily as (
+        insert into activity(user_id, activity_date, actions)
+        select user_id, activity_date, actions from batch
+        on conflict (user_id, activity_date)
+        do update set actions = activity.actions + excluded.actions
+    ), totals as (
+        insert into activity_totals(user_id, actions)
+        select user_id, sum(actions) from batch group by user_id
+        on conflict (user_id)
+        do update set actions = activity_totals.actions + excluded.actions
+    )
+    insert into activity_rollups(period, period_start, user_id, actions)
+    select
+        p.period,
+        date_trunc(p.period, b.activity_date)::date,
+        b.user_id,
+        sum(b.actions)
+    from batch b
+    cross join (values ('week'), ('month')) as p(period)
+    group by 1, 2, 3
+    on conflict (period, period_start, user_id)
+    do update set actions = activity_rollups.actions + excluded.actions
+    """,
+)
+GET_STATISTICS_ALL = Query(
+    "get_statistics_all",
+    "select user_id, actions from activity_totals order by actions desc limit %s",
+)
+# A day is one row per user in `activity`, no rollup needed.
+GET_STATISTICS_DAY = Query(
+    "get_statistics_day",
+    "select user_id, actions from activity "
+    "where activity_date = (now() at time zone 'utc')::date "
+    "order by actions desc limit %s",
+)
+GET_STATISTICS_PERIOD = Query(
+    "get_statistics_period",
+    "select user_id, actions from activity_rollups "
+    "where period = %(period)s and period_start = "
+    "date_trunc(%(period)s, (now() at time zone 'utc')::date)::date "
+    "order by actions desc limit %(limit)s",
+)
+CREATE_BROADCAST = Query(
+    "create_broadcast",
+    "insert into broadcasts(admin_id, locale, from_chat_id, message_id, text) "
+    "values(%s, %s, %s, %s, %s) returning id",
+)
+GET_RUNNING_BROADCASTS = Query(
+    "get_running_broadcasts",
+    "select id, admin_id, locale, from_chat_id, message_id, text, last_user_id, "
+    "sent, blocked, failed from broadcasts where status = 'running' order by id",
+)
+UPDATE_BROADCAST_PROGRESS = Query(
+    "update_broadcast_progress",
+    "update broadcasts set last_user_id = %s, sent = %s, blocked = %s, failed = %s, "
+    "updated_at = now() where id = %s",
+)
+FINISH_BROADCAST = Query(
+    "finish_broadcast",
+    "update broadcasts set status = 'done', updated_at = now() where id = %s",
+)
+REVIVE_USER = Query(
+    "revive_user",
+    "update users set is_alive = true where user_id = %s and not is_alive "
+    "returning user_id",
+)
+MARK_USERS_NOT_ALIVE = Query(
+    "mark_users_not_alive",
+    "update users set is_alive = false "
+    "where user_id = any(%s::bigint[]) and is_alive returning user_id",
+)
+# Streamed through a named cursor.
+STREAM_ALIVE_USERS = Query(
+    "stream_alive_users",
+    "select user_id from users where is_alive and not banned and user_id > %s "
+    "order by user_id",
+)
+LOCK_BROADCAST = Query("lock_broadcast", "select pg_try_advisory_lock(%s, %s)")
+GET_BROADCAST_PROGRESS = Query(
+    "get_broadcast_progress",
+    "select last_user_id, sent, blocked, failed from broadcasts "
+    "where id = %s and status = 'running'",
+)
+
+
+async def execute(
+    cursor: AsyncCursor, query: Query, params: Params = None
+) -> AsyncCursor:
+    started = perf_counter()
+    try:
+        return await cursor.execute(query.sql, params)
+    except Error:
+        query.errors.inc()
+        raise
+    finally:
+        query.latency.observe(perf_counter() - started)
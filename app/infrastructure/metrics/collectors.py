@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+
+from psycopg_pool import AsyncConnectionPool
+
+from app.infrastructure.database.activity import ActivityBuffer
+from app.infrastructure.database.cache import UserCache
+from .registry import registry
+
+
+POOL_SIZE = registry.gauge("bot_db_pool_size", "Connections in the pool")
+POOL_IN_USE = registry.gauge("bot_db_pool_in_use", "Connections handed out")
+POOL_WAITING = registry.gauge(
+    "bot_db_pool_waiting", "Requests waiting for a connection"
+)
+# The pool and the cache keep running totals, exported as counters so that
+# rate() handles restarts.
+POOL_REQUESTS = registry.counter(
+    "bot_db_pool_requests_total", "Connection requests since start"
+)
+POOL_QUEUED = registry.counter(
+    "bot_db_pool_queued_requests_total", "Connection requests that had to wait"
+)
+POOL_WAIT_SECONDS = registry.counter(
+    "bot_db_pool_wait_seconds_total",
+    "Time spent waiting for a connection since start",
+)
+POOL_TIMEOUTS = registry.counter(
+    "bot_db_pool_timeouts_total", "Connection requests that timed out since start"
+)
+CACHE_ENTRIES = registry.gauge("bot_user_cache_entries", "Entries in the user cache")
+CACHE_LOOKUPS = registry.counter(
+    "bot_user_cache_lookups_total", "User cache lookups since start", ("result",)
+)
+CACHE_EVICTIONS = registry.counter(
+    "bot_user_cache_evictions_total", "User cache evictions since start"
+)
+ACTIVITY_PENDING = registry.gauge(
+    "bot_activity_pending_rows", "Activity rows waiting to be flushed"
+)
+ACTIVITY_DROPPED = registry.counter(
+    "bot_activity_dropped_rows_total",
+    "Activity rows dropped past the backlog since start",
+)
+
+
+def collect_pool_stats(db_pool: AsyncConnectionPool) -> None:
+    stats = db_pool.get_stats()
+    POOL_SIZE.labels().set(stats.get("pool_size", 0))
+    POOL_IN_USE.labels().set(stats.get("pool_size", 0) - stats.get("pool_available", 0))
+    POOL_WAITING.labels().set(stats.get("requests_waiting", 0))
+    POOL_REQUESTS.labels().set(stats.get("requests_num", 0))
+    POOL_QUEUED.labels().set(stats.get("requests_queued", 0))
+    POOL_WAIT_SECONDS.labels().set(stats.get("requests_wait_ms", 0) / 1000)
+    POOL_TIMEOUTS.labels().set(stats.get("requests_errors", 0))
+
+
+def collect_cache_stats(cache: UserCache) -> None:
+    stats = cache.stats()
+    CACHE_ENTRIES.labels().set(stats["size"])
+    CACHE_LOOKUPS.labels("hit").set(stats["hits"])
+    CACHE_LOOKUPS.labels("miss").set(stats["misses"])
+    CACHE_EVICTIONS.labels().set(stats["evictions"])
+
+
+def collect_activity_stats(activity_buffer: ActivityBuffer) -> None:
+    ACTIVITY_PENDING.labels().set(activity_buffer.pending)
+    ACTIVITY_DROPPED.labels().set(activity_buffer.dropped)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Generic, Iterator, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Child = TypeVar("Child")
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        # For collectors mirroring a total kept elsewhere.
+        self.value = value
+
+
+class GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric(ABC, Generic[Child]):
+    kind = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], Child] = {}
+
+    def labels(self, *values: str) -> Child:
+        # Bind once and keep the returned child, the hot path then only
+        # touches its slots.
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                logger.error(
+                    "Metric `%s` expects labels %s, got %s",
+                    self.name,
+                    self.labelnames,
+                    values,
+                )
+                raise ValueError
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self) -> Child: ...
+
+    def _samples(self) -> Iterator[tuple[str, str, Any]]:
+        for values, child in self._children.items():
+            yield "", self._format_labels(values), child.value
+
+    def _format_labels(self, values: tuple[str, ...], **extra: str) -> str:
+        pairs = [*zip(self.labelnames, values), *extra.items()]
+        if not pairs:
+            return ""
+        labels = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return f"{{{labels}}}"
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric[CounterValue]):
+    kind = "counter"
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+
+class Gauge(Metric[GaugeValue]):
+    kind = "gauge"
+
+    def _new_child(self) -> GaugeValue:
+        return GaugeValue()
+
+
+class Histogram(Metric[HistogramValue]):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def _samples(self) -> Iterator[tuple[str, str, Any]]:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip((*child.bounds, float("inf")), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield "_bucket", self._format_labels(values, le=le), cumulative
+            yield "_sum", self._format_labels(values), child.sum
+            yield "_count", self._format_labels(values), child.count
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def counter(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as err:
+                logger.error("Metrics collector `%r` failed: %s", collector, err)
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+    def _register(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            logger.error("Metric `%s` is already registered", metric.name)
+            raise ValueError
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = Registry()
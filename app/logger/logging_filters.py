@@ -1,11 +1,24 @@
 import logging
+from random import random
 
 
 class ErrorLogFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
-        return record.levelname == "ERROR"
+        return record.levelno >= logging.WARNING
 
 
 class InfoLogFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
-        return record.levelname == "INFO"
+        return record.levelno < logging.WARNING
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random() < rate
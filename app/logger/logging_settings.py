@@ -1,42 +1,129 @@
-from .logging_filters import ErrorLogFilter, InfoLogFilter
-
-logging_config = {
-    "version": 1,
-    "disable_existing_loggers": True,
-    "formatters": {
-        "error_formatter": {
-            "format": (
-                "%(levelname)s - [%(asctime)s] - %(filename)s:"
-                "%(lineno)d - %(name)s:%(funcName)s - %(message)s"
-            ),
-            "style": "%",
-        },
-        "info_formatter": {
-            "format": "%(levelname)s - [%(asctime)s] - %(name)s - %(message)s",
-            "style": "%",
-        },
-    },
-    "filters": {
-        "error_filter": {"()": ErrorLogFilter},
-        "info_filter": {"()": InfoLogFilter},
-    },
-    "handlers": {
-        "error_handler": {
-            "class": "logging.FileHandler",
-            "formatter": "error_formatter",
-            "filters": ["error_filter"],
-            "filename": "./error.log",
-            "mode": "w",
-        },
-        "info_handler": {
-            "class": "logging.FileHandler",
-            "formatter": "info_formatter",
-            "filters": ["info_filter"],
-            "filename": "./info.log",
-            "mode": "w",
-        },
-    },
-    "loggers": {
-        "root": {"level": "INFO", "handlers": ["error_handler", "info_handler"]}
-    },
-}
+import atexit
+import logging
+import os
+from dataclasses import dataclass
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+from queue import SimpleQueue
+
+from environs import Env
+
+from .logging_filters import ErrorLogFilter, InfoLogFilter, SamplingFilter
+from .logging_formatters import JsonFormatter
+
+ERROR_FORMAT = (
+    "%(levelname)s - [%(asctime)s] - %(filename)s:"
+    "%(lineno)d - %(name)s:%(funcName)s - %(message)s"
+)
+INFO_FORMAT = "%(levelname)s - [%(asctime)s] - %(name)s - %(message)s"
+
+_listener: QueueListener | None = None
+
+
+@dataclass
+class LoggingSettings:
+    level: str
+    directory: str
+    format: str
+    rotation: str
+    max_bytes: int
+    backup_count: int
+    when: str
+    sampling: dict[str, float]
+
+
+def load_logging_settings() -> LoggingSettings:
+    env = Env()
+    env.read_env()
+    settings = LoggingSettings(
+        level=env("LOG_LEVEL", default="INFO").upper(),
+        directory=env("LOG_DIR", default="."),
+        format=env("LOG_FORMAT", default="text"),
+        rotation=env("LOG_ROTATION", default="size"),
+        max_bytes=env.int("LOG_MAX_BYTES", default=10 * 1024 * 1024),
+        backup_count=env.int("LOG_BACKUP_COUNT", default=5),
+        when=env("LOG_ROTATE_WHEN", default="midnight"),
+        sampling=env.dict("LOG_SAMPLING", subcast_values=float, default={}),
+    )
+    if settings.format not in ("text", "json"):
+        raise ValueError(f"LOG_FORMAT must be `text` or `json`, got: {settings.format}")
+    if settings.rotation not in ("size", "time"):
+        raise ValueError(
+            f"LOG_ROTATION must be `size` or `time`, got: {settings.rotation}"
+        )
+    return settings
+
+
+def _build_file_handler(
+    settings: LoggingSettings,
+    filename: str,
+    formatter: logging.Formatter,
+    log_filter: logging.Filter,
+) -> logging.Handler:
+    path = os.path.join(settings.directory, filename)
+    if settings.rotation == "time":
+        handler: logging.Handler = TimedRotatingFileHandler(
+            path,
+            when=settings.when,
+            backupCount=settings.backup_count,
+            encoding="utf-8",
+            utc=True,
+        )
+    else:
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.max_bytes,
+            backupCount=settings.backup_count,
+            encoding="utf-8",
+        )
+    handler.setFormatter(formatter)
+    handler.addFilter(log_filter)
+    return handler
+
+
+def setup_logging() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    settings = load_logging_settings()
+    os.makedirs(settings.directory, exist_ok=True)
+
+    if settings.format == "json":
+        error_formatter = info_formatter = JsonFormatter()
+    else:
+        error_formatter = logging.Formatter(ERROR_FORMAT)
+        info_formatter = logging.Formatter(INFO_FORMAT)
+    handlers = [
+        _build_file_handler(settings, "error.log", error_formatter, ErrorLogFilter()),
+        _build_file_handler(settings, "info.log", info_formatter, InfoLogFilter()),
+    ]
+
+    # The event loop only enqueues records, file I/O happens on the listener thread.
+    log_queue: SimpleQueue = SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.sampling))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(settings.level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
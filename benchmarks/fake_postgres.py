@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+
+import logging
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Any, AsyncIterator, Callable
+
+from app.infrastructure.database import queries
+from app.infrastructure.database.queries import Params
+
+
+logger = logging.getLogger(__name__)
+
+Row = tuple[Any, ...]
+
+
+class FakeCursor:
+    def __init__(self, connection: "FakeConnection") -> None:
+        self.connection = connection
+        self.rowcount = -1
+        self._rows: list[Row] = []
+
+    async def __aenter__(self) -> "FakeCursor":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._rows = []
+
+    async def execute(
+        self, query: str, params: Params = None, **kwargs: Any
+    ) -> "FakeCursor":
+        self._rows = self.connection.server.execute(query, params)
+        self.rowcount = len(self._rows)
+        return self
+
+    async def fetchone(self) -> Row | None:
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchall(self) -> list[Row]:
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, server: "FakePostgres") -> None:
+        self.server = server
+
+    def cursor(self, *args: Any, **kwargs: Any) -> FakeCursor:
+        return FakeCursor(self)
+
+    async def execute(self, query: str, params: Params = None) -> FakeCursor:
+        return await self.cursor().execute(query, params)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["FakeConnection"]:
+        # Every statement is applied at once, there is nothing to roll back.
+        yield self
+
+
+class FakePostgres:
+    # Just enough of the users and activity tables for the catalog queries the
+    # middleware chain runs, in place of the pool.
+
+    def __init__(self) -> None:
+        self.users: dict[int, dict[str, Any]] = {}
+        self.activity: dict[tuple[int, date], int] = {}
+        self._handlers: dict[str, Callable[[Any], list[Row]]] = {
+            queries.ADD_USER.sql: self._add_user,
+            queries.GET_USER_PROFILE.sql: self._get_user_profile,
+            queries.REVIVE_USER.sql: self._revive_user,
+            queries.UPDATE_USER_ALIVE_STATUS.sql: self._update_user_alive_status,
+            queries.UPDATE_USER_LANG.sql: self._update_user_lang,
+            queries.UPDATE_USERS_USERNAME.sql: self._update_users_username,
+            queries.UPDATE_USERS_ACTIVITY.sql: self._update_users_activity,
+            queries.GET_BANNED_USER_IDS.sql: self._get_banned_user_ids,
+        }
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[FakeConnection]:
+        yield FakeConnection(self)
+
+    async def close(self) -> None:
+        pass
+
+    def execute(self, query: str, params: Params) -> list[Row]:
+        handler = self._handlers.get(query)
+        if handler is None:
+            logger.error("Query not supported by the fake Postgres: %s", query)
+            raise NotImplementedError
+        return handler(params)
+
+    def _release_username(self, user_id: int, username: str | None) -> list[Row]:
+        if username is None:
+            return []
+        released = []
+        for other in self.users.values():
+            name = other["username"]
+            if (
+                other["user_id"] != user_id
+                and name
+                and name.lower() == username.lower()
+            ):
+                other["username"] = None
+                released.append((other["user_id"],))
+        return released
+
+    def _add_user(self, params: dict[str, Any]) -> list[Row]:
+        if params["user_id"] in self.users:
+            return []
+        self.users[params["user_id"]] = dict(params)
+        self._release_username(params["user_id"], params["username"])
+        return []
+
+    def _get_user_profile(self, params: tuple[int]) -> list[Row]:
+        user = self.users.get(params[0])
+        if user is None:
+            return []
+        return [
+            tuple(
+                user[column]
+                for column in (
+                    "user_id",
+                    "username",
+                    "language",
+                    "role",
+                    "is_alive",
+                    "banned",
+                )
+            )
+        ]
+
+    def _revive_user(self, params: tuple[int]) -> list[Row]:
+        user = self.users.get(params[0])
+        if user is None or user["is_alive"]:
+            return []
+        user["is_alive"] = True
+        return [(user["user_id"],)]
+
+    def _update_user_alive_status(self, params: tuple[bool, int]) -> list[Row]:
+        is_alive, user_id = params
+        if user_id in self.users:
+            self.users[user_id]["is_alive"] = is_alive
+        return []
+
+    def _update_user_lang(self, params: tuple[str, int]) -> list[Row]:
+        language, user_id = params
+        if user_id in self.users:
+            self.users[user_id]["language"] = language
+        return []
+
+    def _update_users_username(self, params: tuple[list, list]) -> list[Row]:
+        changed = []
+        for user_id, username in zip(*params):
+            user = self.users.get(user_id)
+            if user is None or user["username"] == username:
+                continue
+            changed += self._release_username(user_id, username)
+            user["username"] = username
+            changed.append((user_id,))
+        return changed
+
+    def _update_users_activity(self, params: tuple[list, list, list]) -> list[Row]:
+        for user_id, activity_date, actions in zip(*params):
+            key = (user_id, activity_date)
+            self.activity[key] = self.activity.get(key, 0) + actions
+        return []
+
+    def _get_banned_user_ids(self, params: None) -> list[Row]:
+        return [(user_id,) for user_id, user in self.users.items() if user["banned"]]
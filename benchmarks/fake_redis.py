@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from time import monotonic, time
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+EntryId = tuple[int, int]
+
+
+class CommandError(Exception):
+    pass
+
+
+@dataclass
+class PendingEntry:
+    consumer: str
+    delivered_at: float
+    delivered: int = 1
+
+
+@dataclass
+class Group:
+    last_id: EntryId
+    pending: dict[EntryId, PendingEntry] = field(default_factory=dict)
+
+
+@dataclass
+class Stream:
+    entries: dict[EntryId, list[bytes]] = field(default_factory=dict)
+    ids: list[EntryId] = field(default_factory=list)
+    last_id: EntryId = (0, 0)
+    groups: dict[bytes, Group] = field(default_factory=dict)
+
+
+def parse_id(raw: bytes, *, seq: int = 0) -> EntryId:
+    ms, _, rest = raw.partition(b"-")
+    try:
+        return int(ms), int(rest) if rest else seq
+    except ValueError:
+        raise CommandError("ERR Invalid stream ID specified as stream command argument")
+
+
+def format_id(entry_id: EntryId) -> bytes:
+    return f"{entry_id[0]}-{entry_id[1]}".encode()
+
+
+def encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, CommandError):
+        return b"-" + str(value).encode() + b"\r\n"
+    if isinstance(value, bool) or isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+" + value.encode() + b"\r\n"
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+
+
+class FakeRedisServer:
+    # Just enough of Redis streams and consumer groups for the update streams,
+    # and of strings and bitmaps for the update dedup.
+
+    def __init__(self) -> None:
+        self.streams: dict[bytes, Stream] = {}
+        self.values: dict[bytes, bytearray] = {}
+        self.expires: dict[bytes, float] = {}
+        self._added = asyncio.Condition()
+        self._server: asyncio.base_events.Server | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                try:
+                    reply = await self.execute(command)
+                except CommandError as err:
+                    reply = err
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    async def execute(self, command: list[bytes]) -> Any:
+        name = command[0].decode().lower()
+        handler = getattr(self, f"_cmd_{name}", None)
+        if handler is None:
+            raise CommandError(f"ERR unknown command '{name}'")
+        return await handler(*command[1:])
+
+    async def _cmd_ping(self, *args: bytes) -> Any:
+        return args[0] if args else "PONG"
+
+    async def _cmd_client(self, *args: bytes) -> Any:
+        return "OK"
+
+    async def _cmd_select(self, *args: bytes) -> Any:
+        return "OK"
+
+    async def _cmd_auth(self, *args: bytes) -> Any:
+        return "OK"
+
+    async def _cmd_del(self, *keys: bytes) -> Any:
+        return sum(
+            (self.streams.pop(key, None) or self._value(key, pop=True)) is not None
+            for key in keys
+        )
+
+    def _value(self, key: bytes, *, pop: bool = False) -> bytearray | None:
+        if self.expires.get(key, float("inf")) <= monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        if pop:
+            self.expires.pop(key, None)
+            return self.values.pop(key, None)
+        return self.values.get(key)
+
+    async def _cmd_set(self, key: bytes, value: bytes, *args: bytes) -> Any:
+        args = [arg.upper() for arg in args]
+        if b"NX" in args and self._value(key) is not None:
+            return None
+        self.values[key] = bytearray(value)
+        self.expires.pop(key, None)
+        if b"EX" in args:
+            self.expires[key] = monotonic() + int(args[args.index(b"EX") + 1])
+        return "OK"
+
+    async def _cmd_expire(self, key: bytes, seconds: bytes) -> Any:
+        if self._value(key) is None:
+            return 0
+        self.expires[key] = monotonic() + int(seconds)
+        return 1
+
+    async def _cmd_getbit(self, key: bytes, offset: bytes) -> Any:
+        byte, bit = divmod(int(offset), 8)
+        value = self._value(key) or b""
+        return (value[byte] >> (7 - bit)) & 1 if byte < len(value) else 0
+
+    async def _cmd_setbit(self, key: bytes, offset: bytes, flag: bytes) -> Any:
+        old = await self._cmd_getbit(key, offset)
+        byte, bit = divmod(int(offset), 8)
+        value = self._value(key)
+        if value is None:
+            value = self.values[key] = bytearray()
+        if byte >= len(value):
+            value.extend(bytes(byte + 1 - len(value)))
+        if int(flag):
+            value[byte] |= 1 << (7 - bit)
+        else:
+            value[byte] &= ~(1 << (7 - bit)) & 0xFF
+        return old
+
+    async def _cmd_xlen(self, key: bytes) -> Any:
+        stream = self.streams.get(key)
+        return len(stream.entries) if stream else 0
+
+    async def _cmd_xadd(self, key: bytes, *args: bytes) -> Any:
+        args = list(args)
+        maxlen = None
+        if args[0].upper() == b"MAXLEN":
+            args.pop(0)
+            if args[0] in (b"~", b"="):
+                args.pop(0)
+            maxlen = int(args.pop(0))
+        stream = self.streams.setdefault(key, Stream())
+        raw_id, values = args[0], args[1:]
+        if raw_id == b"*":
+            now = int(time() * 1000)
+            if now > stream.last_id[0]:
+                entry_id = (now, 0)
+            else:
+                entry_id = (stream.last_id[0], stream.last_id[1] + 1)
+        else:
+            entry_id = parse_id(raw_id)
+            if entry_id <= stream.last_id:
+                raise CommandError(
+                    "ERR The ID specified in XADD is equal or smaller than "
+                    "the target stream top item"
+                )
+        stream.entries[entry_id] = values
+        stream.ids.append(entry_id)
+        stream.last_id = entry_id
+        if maxlen is not None and len(stream.ids) > maxlen:
+            for trimmed in stream.ids[:-maxlen]:
+                del stream.entries[trimmed]
+            del stream.ids[:-maxlen]
+        async with self._added:
+            self._added.notify_all()
+        return format_id(entry_id)
+
+    async def _cmd_xrange(self, key: bytes, start: bytes, end: bytes, *args) -> Any:
+        stream = self.streams.get(key)
+        if stream is None:
+            return []
+        count = int(args[1]) if args and args[0].upper() == b"COUNT" else None
+        low = (0, 0) if start == b"-" else parse_id(start)
+        high = (2**64, 0) if end == b"+" else parse_id(end, seq=2**64)
+        entries = [
+            [format_id(entry_id), values]
+            for entry_id, values in stream.entries.items()
+            if low <= entry_id <= high
+        ]
+        return entries[:count] if count is not None else entries
+
+    async def _cmd_xgroup(self, subcommand: bytes, key: bytes, *args: bytes) -> Any:
+        if subcommand.upper() != b"CREATE":
+            raise CommandError("ERR unsupported XGROUP subcommand")
+        name, raw_id = args[0], args[1]
+        stream = self.streams.get(key)
+        if stream is None:
+            if b"MKSTREAM" not in (arg.upper() for arg in args[2:]):
+                raise CommandError(
+                    "ERR The XGROUP subcommand requires the key to exist"
+                )
+            stream = self.streams[key] = Stream()
+        if name in stream.groups:
+            raise CommandError("BUSYGROUP Consumer Group name already exists")
+        last_id = stream.last_id if raw_id == b"$" else parse_id(raw_id)
+        stream.groups[name] = Group(last_id=last_id)
+        return "OK"
+
+    def _group(self, key: bytes, name: bytes) -> tuple[Stream, Group]:
+        stream = self.streams.get(key)
+        if stream is None or name not in stream.groups:
+            raise CommandError(
+                f"NOGROUP No such key '{key.decode()}' or consumer group "
+                f"'{name.decode()}'"
+            )
+        return stream, stream.groups[name]
+
+    async def _cmd_xreadgroup(self, *args: bytes) -> Any:
+        args = list(args)
+        count, block = None, None
+        _, group_name, consumer = args[:3]
+        args = args[3:]
+        while args[0].upper() != b"STREAMS":
+            option = args.pop(0).upper()
+            if option == b"COUNT":
+                count = int(args.pop(0))
+            elif option == b"BLOCK":
+                block = int(args.pop(0))
+        args.pop(0)
+        keys, ids = args[: len(args) // 2], args[len(args) // 2 :]
+        if any(raw_id != b">" for raw_id in ids):
+            raise CommandError("ERR only `>` is supported by the stand-in")
+        deadline = None if not block else monotonic() + block / 1000
+        while True:
+            reply = []
+            for key in keys:
+                stream, group = self._group(key, group_name)
+                start = bisect_right(stream.ids, group.last_id)
+                end = None if count is None else start + count
+                entries = []
+                for entry_id in stream.ids[start:end]:
+                    entries.append([format_id(entry_id), stream.entries[entry_id]])
+                    group.pending[entry_id] = PendingEntry(
+                        consumer.decode(), monotonic()
+                    )
+                    group.last_id = entry_id
+                if entries:
+                    reply.append([key, entries])
+            if reply or block is None:
+                return reply or None
+            timeout = None if deadline is None else deadline - monotonic()
+            if timeout is not None and timeout <= 0:
+                return None
+            async with self._added:
+                try:
+                    await asyncio.wait_for(self._added.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+
+    async def _cmd_xack(self, key: bytes, group_name: bytes, *ids: bytes) -> Any:
+        _, group = self._group(key, group_name)
+        return sum(
+            group.pending.pop(parse_id(raw_id), None) is not None for raw_id in ids
+        )
+
+    async def _cmd_xpending(self, key: bytes, group_name: bytes, *args: bytes) -> Any:
+        _, group = self._group(key, group_name)
+        args = list(args)
+        min_idle = 0
+        if args and args[0].upper() == b"IDLE":
+            args.pop(0)
+            min_idle = int(args.pop(0))
+        start, end, count = args[0], args[1], int(args[2])
+        consumer = args[3].decode() if len(args) > 3 else None
+        if start == b"-":
+            low, inclusive = (0, 0), True
+        elif start.startswith(b"("):
+            low, inclusive = parse_id(start[1:]), False
+        else:
+            low, inclusive = parse_id(start), True
+        high = (2**64, 0) if end == b"+" else parse_id(end, seq=2**64)
+        now = monotonic()
+        reply = []
+        for entry_id in sorted(group.pending):
+            entry = group.pending[entry_id]
+            idle = int((now - entry.delivered_at) * 1000)
+            if entry_id < low or (entry_id == low and not inclusive):
+                continue
+            if entry_id > high or len(reply) >= count:
+                break
+            if idle < min_idle or (consumer and entry.consumer != consumer):
+                continue
+            reply.append(
+                [format_id(entry_id), entry.consumer.encode(), idle, entry.delivered]
+            )
+        return reply
+
+    async def _cmd_xclaim(
+        self, key: bytes, group_name: bytes, consumer: bytes, min_idle: bytes, *ids
+    ) -> Any:
+        stream, group = self._group(key, group_name)
+        now = monotonic()
+        reply = []
+        for raw_id in ids:
+            entry_id = parse_id(raw_id)
+            entry = group.pending.get(entry_id)
+            if entry is None or (now - entry.delivered_at) * 1000 < int(min_idle):
+                continue
+            if entry_id not in stream.entries:
+                del group.pending[entry_id]
+                continue
+            entry.consumer = consumer.decode()
+            entry.delivered_at = now
+            entry.delivered += 1
+            reply.append([format_id(entry_id), stream.entries[entry_id]])
+        return reply
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import wraps
+from statistics import quantiles
+from time import perf_counter
+from typing import Any, AsyncGenerator, get_args
+
+from app.logger.logging_settings import setup_logging
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import (
+    CallbackQuery,
+    Chat,
+    ChatMemberBanned,
+    ChatMemberMember,
+    ChatMemberUpdated,
+    Message,
+    Update,
+    User,
+)
+from redis.asyncio import Redis
+
+from app.bot.bot import build_dispatcher
+from app.bot.i18n.translator import get_translations
+from app.bot.keyboards.keyboards import LangSettingsKeyboards
+from app.bot.keyboards.menu_button import MainMenu
+from app.bot.middlewares.dedup import DEDUP_PREFIX
+from app.bot.middlewares.database import Data, Handler
+from app.infrastructure.database.activity import ActivityBuffer
+from app.infrastructure.database.banned import BannedUsers
+from app.infrastructure.database.cache import user_cache
+from app.infrastructure.database.connection import build_pg_conninfo, get_pg_pool
+from benchmarks.fake_postgres import FakePostgres
+from config.config import load_config
+
+
+logger = logging.getLogger(__name__)
+
+BOT_TOKEN = "42:benchmark"
+FIRST_USER_ID = 9_000_000_000
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+UPDATE_MIX = {
+    "text": 50,
+    "command": 20,
+    "lang_callback": 20,
+    "kick": 10,
+}
+
+Timings = dict[str, list[float]]
+
+
+class StubSession(BaseSession):
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: dict[str, int] = defaultdict(int)
+        self._message_id = 0
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod, timeout: int | None = None
+    ) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        returning = method.__returning__
+        if returning is Message or Message in get_args(returning):
+            self._message_id += 1
+            chat_id = getattr(method, "chat_id", None) or 0
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=chat_id, type="private"),
+                text=getattr(method, "text", None),
+            )
+        return True
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class TimedMiddleware(BaseMiddleware):
+    def __init__(self, middleware: Any, timings: Timings) -> None:
+        self.middleware = middleware
+        self.name = type(middleware).__name__
+        self.timings = timings
+
+    async def __call__(self, handler: Handler, event: Any, data: Data) -> Any:
+        inner = 0.0
+
+        async def timed_handler(event: Any, data: Data) -> Any:
+            nonlocal inner
+            started = perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                inner += perf_counter() - started
+
+        started = perf_counter()
+        try:
+            return await self.middleware(timed_handler, event, data)
+        finally:
+            # Only the middleware's own time, the rest of the chain is excluded.
+            self.timings[self.name].append(perf_counter() - started - inner)
+
+
+def instrument(dp: Dispatcher, middleware_timings: Timings, handler_timings: Timings):
+    for manager in (dp.update.outer_middleware, dp.update.middleware):
+        manager._middlewares[:] = [
+            TimedMiddleware(middleware, middleware_timings)
+            for middleware in manager._middlewares
+        ]
+
+    def timed(callback: Any, name: str) -> Any:
+        @wraps(callback)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                handler_timings[name].append(perf_counter() - started)
+
+        return wrapper
+
+    for router in dp.chain_tail:
+        for event_type, observer in router.observers.items():
+            if event_type == "update":
+                continue
+            for handler in observer.handlers:
+                if handler.awaitable:
+                    callback = handler.callback
+                    module = callback.__module__.rsplit(".", 1)[-1]
+                    handler.callback = timed(callback, f"{module}.{callback.__name__}")
+
+
+def make_update(
+    update_id: int,
+    kind: str,
+    user_id: int,
+    locales: list[str],
+    text: str | None = None,
+) -> Update:
+    now = datetime.now(timezone.utc)
+    user = User(id=user_id, is_bot=False, first_name="Bench", language_code="en")
+    chat = Chat(id=user_id, type="private")
+    if kind == "text":
+        text = text or random.choice(("hello", "how are you?", "ping"))
+    elif kind == "command":
+        text = text or random.choice(("/start", "/help", "/lang"))
+    if kind in ("text", "command"):
+        message = Message(
+            message_id=update_id, date=now, chat=chat, from_user=user, text=text
+        )
+        return Update(update_id=update_id, message=message)
+    if kind == "lang_callback":
+        message = Message(message_id=update_id, date=now, chat=chat, text="/lang")
+        return Update(
+            update_id=update_id,
+            callback_query=CallbackQuery(
+                id=str(update_id),
+                from_user=user,
+                chat_instance=str(user_id),
+                message=message,
+                data=random.choice(locales),
+            ),
+        )
+    bot_user = User(id=42, is_bot=True, first_name="Bot")
+    return Update(
+        update_id=update_id,
+        my_chat_member=ChatMemberUpdated(
+            chat=chat,
+            from_user=user,
+            date=now,
+            old_chat_member=ChatMemberMember(user=bot_user),
+            new_chat_member=ChatMemberBanned(user=bot_user, until_date=0),
+        ),
+    )
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        samples = samples * 2 or [0.0, 0.0]
+    percentiles = quantiles(samples, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "p50_ms": 1000 * percentiles[49],
+        "p95_ms": 1000 * percentiles[94],
+        "p99_ms": 1000 * percentiles[98],
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def feed(
+    dp: Dispatcher, bot: Bot, updates: list[tuple[str, Update]], concurrency: int
+) -> tuple[float, Timings]:
+    latencies: Timings = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(kind: str, update: Update) -> None:
+        async with semaphore:
+            started = perf_counter()
+            await dp.feed_update(bot, update)
+            latencies[kind].append(perf_counter() - started)
+
+    started = perf_counter()
+    await asyncio.gather(*(process(kind, update) for kind, update in updates))
+    return perf_counter() - started, latencies
+
+
+async def cleanup(db_pool: Any, users: int) -> None:
+    user_ids = list(range(FIRST_USER_ID, FIRST_USER_ID + users))
+    async with db_pool.connection() as conn:
+        for table in ("activity_rollups", "activity_totals", "activity", "users"):
+            await conn.execute(
+                f"delete from {table} where user_id = any(%s)", (user_ids,)
+            )
+
+
+async def main(args: argparse.Namespace) -> None:
+    config = load_config()
+    # The run writes and deletes synthetic users: the target database has to be
+    # named explicitly, so a production .env is never used by accident.
+    if args.database is not None and args.database != config.db.db_name:
+        logger.error(
+            "--database %r does not match POSTGRES_DB %r, refusing to run",
+            args.database,
+            config.db.db_name,
+        )
+        raise SystemExit(2)
+    random.seed(args.seed)
+    if args.fsm_storage == "redis":
+        storage = RedisStorage(
+            redis=Redis(
+                host=config.redis.host,
+                port=config.redis.port,
+                db=config.redis.db,
+                username=config.redis.username,
+                password=config.redis.password,
+            )
+        )
+    else:
+        storage = MemoryStorage()
+    session = StubSession(latency=args.api_latency / 1000)
+    bot = Bot(token=BOT_TOKEN, session=session)
+    dp = build_dispatcher(config=config, storage=storage)
+    if isinstance(storage, RedisStorage):
+        # Update ids start from zero on every run.
+        async for key in storage.redis.scan_iter(f"{DEDUP_PREFIX}:{bot.id}:*"):
+            await storage.redis.delete(key)
+
+    if args.database is None:
+        db_pool = FakePostgres()
+    else:
+        db_pool = await get_pg_pool(config=config)
+    user_cache.configure(maxsize=config.cache.size, ttl=config.cache.ttl)
+    activity_buffer = ActivityBuffer(
+        db_pool,
+        flush_interval=config.activity.flush_interval,
+        max_pending=config.activity.flush_size,
+    )
+    banned_users = BannedUsers(build_pg_conninfo(config), db_pool)
+    # Without Postgres there is nothing to listen to: the set is only loaded.
+    start_banned_users = (
+        banned_users.reload if args.database is None else banned_users.start
+    )
+    translations = get_translations()
+    locales = list(translations.keys())
+    # The language keyboard never offers the `default` alias.
+    choices = [locale for locale in locales if locale != "default"]
+    dp.workflow_data.update(
+        db_pool=db_pool,
+        activity_buffer=activity_buffer,
+        banned_users=banned_users,
+        translations=translations,
+        locales=locales,
+        main_menu=MainMenu(translations, redis=getattr(storage, "redis", None)),
+        lang_keyboards=LangSettingsKeyboards(translations),
+        admin_ids=config.bot.admin_ids,
+    )
+
+    middleware_timings: Timings = defaultdict(list)
+    handler_timings: Timings = defaultdict(list)
+    try:
+        if args.database is not None:
+            await cleanup(db_pool, args.users)
+        await activity_buffer.start()
+        await start_banned_users()
+        await dp.emit_startup(bot=bot, **dp.workflow_data)
+
+        user_ids = range(FIRST_USER_ID, FIRST_USER_ID + args.users)
+        signup = [
+            ("command", make_update(n, "command", user_id, choices, "/start"))
+            for n, user_id in enumerate(user_ids)
+        ]
+        await feed(dp, bot, signup, args.concurrency)
+
+        instrument(dp, middleware_timings, handler_timings)
+        kinds = random.choices(
+            list(UPDATE_MIX), weights=list(UPDATE_MIX.values()), k=args.updates
+        )
+        updates = [
+            (kind, make_update(n, kind, random.choice(user_ids), choices))
+            for n, kind in enumerate(kinds, start=len(signup))
+        ]
+        elapsed, latencies = await feed(dp, bot, updates, args.concurrency)
+        await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+    finally:
+        await banned_users.close()
+        await activity_buffer.close()
+        if args.database is not None and not args.keep_users:
+            await cleanup(db_pool, args.users)
+        await db_pool.close()
+        await dp.storage.close()
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "args": vars(args),
+        "updates_per_second": args.updates / elapsed,
+        "elapsed_seconds": elapsed,
+        "updates": {kind: summarize(samples) for kind, samples in latencies.items()},
+        "middlewares": {
+            name: summarize(samples) for name, samples in middleware_timings.items()
+        },
+        "handlers": {
+            name: summarize(samples) for name, samples in handler_timings.items()
+        },
+        "bot_api_calls": dict(session.calls),
+        "user_cache": user_cache.stats(),
+    }
+    report(results, load_results(args.compare) if args.compare else None)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(
+        RESULTS_DIR,
+        f"middleware_chain-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.json",
+    )
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nResults saved to {path}")
+
+
+def load_results(path: str) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def report(results: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    throughput = f"{results['updates_per_second']:.1f} updates/s"
+    if baseline:
+        change = results["updates_per_second"] / baseline["updates_per_second"] - 1
+        throughput += f" ({100 * change:+.1f}% vs {baseline.get('revision')})"
+    print(f"Throughput: {throughput}")
+    for section in ("updates", "middlewares", "handlers"):
+        print(
+            f"\n{section:<32}{'count':>8}{'p50, ms':>10}{'p95, ms':>10}"
+            f"{'p99, ms':>10}{'p99 change':>12}"
+        )
+        for name, stats in sorted(results[section].items()):
+            line = (
+                f"{name:<32}{stats['count']:>8}{stats['p50_ms']:>10.3f}"
+                f"{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+            )
+            previous = (baseline or {}).get(section, {}).get(name)
+            if previous and previous["p99_ms"]:
+                change = 100 * (stats["p99_ms"] / previous["p99_ms"] - 1)
+                line += f"{change:>+11.1f}%"
+            print(line)
+    print(f"\nBot API calls: {results['bot_api_calls']}")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(
+        description="Feed synthetic updates through the bot's real dispatcher"
+    )
+    parser.add_argument(
+        "--database",
+        help=(
+            "name of the throwaway database from .env (POSTGRES_DB) to run against; "
+            "an in-memory stand-in is used without it"
+        ),
+    )
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--api-latency",
+        type=float,
+        default=0.0,
+        help="simulated Bot API round trip, ms",
+    )
+    parser.add_argument("--fsm-storage", choices=("redis", "memory"), default="redis")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="previous results file to compare with")
+    parser.add_argument(
+        "--keep-users", action="store_true", help="do not delete the synthetic users"
+    )
+    asyncio.run(main(parser.parse_args()))
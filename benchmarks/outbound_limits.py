@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+
+import argparse
+import asyncio
+import json
+import sys
+from collections import defaultdict, deque
+from math import ceil
+from statistics import median
+from time import monotonic, time
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from app.bot.outbound import (
+    OutboundPriority,
+    OutboundScheduler,
+    TokenBucket,
+    outbound_priority,
+)
+
+
+# Admin replies go to their own chats, so only the global limit is shared.
+FIRST_ADMIN_CHAT_ID = 1_000_000
+
+
+class FakeBotApi:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        # Telegram's own limits plus one token of slack for network jitter.
+        self._global = TokenBucket(args.global_limit, 2)
+        self._chats: dict[int, TokenBucket] = {}
+        self._inject = set(range(2, 2 + args.inject_429))
+        self._message_id = 0
+        self.accepted: list[tuple[float, int]] = []
+        self.rejected = 0
+        self.injected = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        chat_id = int(form["chat_id"])
+        if chat_id in self._inject:
+            self._inject.discard(chat_id)
+            self.injected += 1
+            return self._retry_after(1)
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = TokenBucket(
+                self.args.chat_limit, self.args.chat_burst + 1
+            )
+        for bucket in (self._global, chat):
+            if delay := bucket.delay():
+                self.rejected += 1
+                return self._retry_after(ceil(delay))
+        self._global.take()
+        chat.take()
+        self.accepted.append((monotonic(), chat_id))
+        self._message_id += 1
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": self._message_id,
+                    "date": int(time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": form.get("text"),
+                },
+            }
+        )
+
+    @staticmethod
+    def _retry_after(seconds: int) -> web.Response:
+        return web.json_response(
+            {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {seconds}",
+                "parameters": {"retry_after": seconds},
+            }
+        )
+
+    def max_per_window(self, window: float = 1.0) -> tuple[int, int]:
+        overall: deque[float] = deque()
+        per_chat: dict[int, deque[float]] = defaultdict(deque)
+        max_overall = max_chat = 0
+        for at, chat_id in self.accepted:
+            for sent in (overall, per_chat[chat_id]):
+                sent.append(at)
+                while sent[0] <= at - window:
+                    sent.popleft()
+            max_overall = max(max_overall, len(overall))
+            max_chat = max(max_chat, len(per_chat[chat_id]))
+        return max_overall, max_chat
+
+
+async def send(bot: Bot, chat_id: int, text: str, priority: OutboundPriority) -> float:
+    outbound_priority.set(priority)
+    started = monotonic()
+    await bot.send_message(chat_id=chat_id, text=text)
+    return monotonic() - started
+
+
+async def main(args: argparse.Namespace) -> int:
+    api = FakeBotApi(args)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host="127.0.0.1", port=args.port).start()
+    port = runner.addresses[0][1]
+
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}")
+    )
+    scheduler = OutboundScheduler(
+        global_rate=args.global_rate,
+        chat_rate=args.chat_rate,
+        chat_burst=args.chat_burst,
+        max_retries=args.max_retries,
+    )
+    session.middleware(scheduler)
+    bot = Bot(token="42:fake", session=session)
+
+    started = monotonic()
+    echo = [
+        asyncio.create_task(send(bot, chat_id, f"echo {n}", OutboundPriority.NORMAL))
+        for n in range(args.messages)
+        for chat_id in range(2, 2 + args.chats)
+    ]
+    await asyncio.sleep(args.admin_delay)
+    admin = [
+        asyncio.create_task(
+            send(bot, FIRST_ADMIN_CHAT_ID + n, f"admin {n}", OutboundPriority.HIGH)
+        )
+        for n in range(args.admin_messages)
+    ]
+    echo_latencies = await asyncio.gather(*echo)
+    admin_latencies = await asyncio.gather(*admin)
+    elapsed = monotonic() - started
+
+    await scheduler.close()
+    await bot.session.close()
+    await runner.cleanup()
+
+    max_overall, max_chat = api.max_per_window()
+    results = {
+        "sent": len(api.accepted),
+        "elapsed_seconds": round(elapsed, 2),
+        "rate_limit_violations": api.rejected,
+        "injected_429": api.injected,
+        "max_per_second_overall": max_overall,
+        "max_per_second_per_chat": max_chat,
+        "echo_latency_p50_s": round(median(echo_latencies), 3),
+        "echo_latency_max_s": round(max(echo_latencies), 3),
+        "admin_latency_p50_s": round(median(admin_latencies), 3),
+        "admin_latency_max_s": round(max(admin_latencies), 3),
+    }
+    print(json.dumps(results, indent=2))
+    # A one second window holds a full bucket plus what refills during it.
+    if (
+        api.rejected
+        or max_overall > args.global_limit + 1
+        or max_chat > args.chat_burst + ceil(args.chat_limit)
+    ):
+        print("FAILED: Bot API limits exceeded", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Burst the outbound scheduler against a fake Bot API"
+    )
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=6, help="per chat")
+    parser.add_argument("--admin-messages", type=int, default=10)
+    parser.add_argument("--admin-delay", type=float, default=1.0)
+    parser.add_argument("--inject-429", type=int, default=3, help="chats")
+    parser.add_argument("--global-rate", type=float, default=30.0)
+    parser.add_argument("--chat-rate", type=float, default=1.0)
+    parser.add_argument("--chat-burst", type=int, default=3)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--global-limit", type=float, default=30.0)
+    parser.add_argument("--chat-limit", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free one")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+
+import argparse
+import random
+import tracemalloc
+from time import perf_counter
+from typing import Any, Callable
+
+from app.bot.enums.roles import UserRole
+from app.bot.i18n.translator import get_translations
+from app.bot.keyboards.keyboards import LangSettingsKeyboards, get_lang_settings_kb
+from app.bot.keyboards.menu_button import (
+    MainMenu,
+    get_main_menu_commands,
+    get_menu_fingerprint,
+)
+
+
+Render = Callable[[str, str | None, UserRole], Any]
+
+
+def measure(render: Render, updates: list[tuple], iterations: int) -> dict[str, float]:
+    started = perf_counter()
+    for _ in range(iterations):
+        for update in updates:
+            render(*update)
+    elapsed = perf_counter() - started
+    count = iterations * len(updates)
+
+    # Objects kept alive by the renders (what the handler passes to aiogram).
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for update in updates:
+        kept.append(render(*update))
+    after = tracemalloc.take_snapshot()
+    # Transient peak of a single render, including garbage freed right away.
+    peaks = []
+    for update in updates:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        render(*update)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return {
+        "us_per_update": 1e6 * elapsed / count,
+        "blocks_per_update": blocks / len(updates),
+        "bytes_per_update": size / len(updates),
+        "peak_bytes_per_update": sum(peaks) / len(peaks),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    translations = get_translations()
+    locales = [locale for locale in translations if locale != "default"]
+    lang_keyboards = LangSettingsKeyboards(translations)
+    main_menu = MainMenu(translations)
+
+    rng = random.Random(args.seed)
+    updates = [
+        (
+            rng.choice(locales),
+            rng.choice((*locales, None)),
+            rng.choice(tuple(UserRole)),
+        )
+        for _ in range(args.updates)
+    ]
+
+    def build_keyboard(locale: str, checked: str | None, role: UserRole) -> Any:
+        return get_lang_settings_kb(
+            i18n=translations[locale], locales=locales, checked=checked
+        )
+
+    def cached_keyboard(locale: str, checked: str | None, role: UserRole) -> Any:
+        return lang_keyboards.get(locale, checked)
+
+    def build_menu(locale: str, checked: str | None, role: UserRole) -> Any:
+        commands = get_main_menu_commands(i18n=translations[locale], role=role)
+        return commands, get_menu_fingerprint(commands)
+
+    def cached_menu(locale: str, checked: str | None, role: UserRole) -> Any:
+        return main_menu.get(locale, role)
+
+    cases = (
+        ("lang keyboard", build_keyboard, cached_keyboard),
+        ("main menu", build_menu, cached_menu),
+    )
+    print(
+        f"{'render':<16}{'mode':<8}{'us/update':>12}{'blocks/update':>15}"
+        f"{'bytes/update':>14}{'peak bytes':>12}"
+    )
+    for name, build, cached in cases:
+        for mode, render in (("build", build), ("cached", cached)):
+            result = measure(render, updates, args.iterations)
+            print(
+                f"{name:<16}{mode:<8}{result['us_per_update']:>12.2f}"
+                f"{result['blocks_per_update']:>15.1f}"
+                f"{result['bytes_per_update']:>14.0f}"
+                f"{result['peak_bytes_per_update']:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare building keyboards and menus per update with the cache"
+    )
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from time import monotonic
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Chat, Message, Update, User
+from redis.asyncio import Redis
+
+from app.bot.dispatcher import ShardedDispatcher
+from app.bot.middlewares.dedup import UpdateDedupMiddleware
+from app.bot.streams import (
+    UpdateStreamProducer,
+    UpdateStreamWorker,
+    dead_letter_key,
+)
+from benchmarks.fake_redis import FakeRedisServer
+
+
+BOT_TOKEN = "42:fleet"
+PREFIX = "fleet:updates"
+GROUP = "workers"
+DONE_KEY = "fleet:done"
+FIRST_USER_ID = 1_000
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Update:
+    user = User(id=user_id, is_bot=False, first_name=f"user{user_id}")
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=user_id, type="private"),
+            from_user=user,
+            text=text,
+        ),
+    )
+
+
+async def record(
+    message: Message,
+    event_update: Update,
+    results: Redis,
+    failed_once: set[int],
+    delay: float,
+    consumer: str,
+) -> None:
+    await asyncio.sleep(delay)
+    if message.text == "poison":
+        raise RuntimeError("poison update")
+    if message.text == "flaky" and event_update.update_id not in failed_once:
+        failed_once.add(event_update.update_id)
+        raise RuntimeError("flaky update")
+    await results.xadd(
+        DONE_KEY,
+        {
+            "update_id": event_update.update_id,
+            "user_id": message.from_user.id,
+            "consumer": consumer,
+        },
+    )
+
+
+async def run_worker(args: argparse.Namespace) -> None:
+    redis = Redis(port=args.redis_port)
+    router = Router()
+    router.message()(record)
+    # UPDATE_SHARDS=0 by default: the worker alone has to keep the order.
+    if args.shards:
+        dp = ShardedDispatcher(shards=args.shards, disable_fsm=True)
+    else:
+        dp = Dispatcher(disable_fsm=True)
+    # The killed worker leaves leases behind: its updates must still be
+    # processed once they are reclaimed.
+    dp.update.outer_middleware(UpdateDedupMiddleware(redis, lease=args.claim_idle))
+    dp.include_router(router)
+    dp.workflow_data.update(
+        results=redis,
+        failed_once=set(),
+        delay=args.handler_delay / 1000,
+        consumer=args.consumer,
+    )
+    worker = UpdateStreamWorker(
+        dp,
+        Bot(token=BOT_TOKEN),
+        redis,
+        prefix=PREFIX,
+        partitions=args.partitions,
+        group=GROUP,
+        consumer=args.consumer,
+        workers=args.workers,
+        index=args.worker,
+        batch_size=50,
+        block=0.5,
+        max_in_flight=args.max_in_flight,
+        claim_idle=args.claim_idle,
+        claim_interval=args.claim_idle / 2,
+        max_retries=args.max_retries,
+        retry_delay=0.05,
+    )
+    try:
+        await worker.run()
+    finally:
+        await redis.aclose()
+
+
+async def spawn_worker(
+    args: argparse.Namespace, port: int, index: int, consumer: str
+) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.stream_fleet",
+        "--worker",
+        str(index),
+        "--consumer",
+        consumer,
+        "--redis-port",
+        str(port),
+        "--workers",
+        str(args.workers),
+        "--partitions",
+        str(args.partitions),
+        "--handler-delay",
+        str(args.handler_delay),
+        "--max-in-flight",
+        str(args.max_in_flight),
+        "--claim-idle",
+        str(args.claim_idle),
+        "--max-retries",
+        str(args.max_retries),
+        "--shards",
+        str(args.shards),
+    )
+
+
+async def main(args: argparse.Namespace) -> int:
+    server = FakeRedisServer()
+    port = await server.start()
+    redis = Redis(port=port)
+    producer = UpdateStreamProducer(redis, prefix=PREFIX, partitions=args.partitions)
+
+    workers = {
+        index: await spawn_worker(args, port, index, f"worker-{index}")
+        for index in range(args.workers)
+    }
+    expected: dict[int, int] = {}
+    poison = 0
+    started = monotonic()
+    for update_id in range(1, args.updates + 1):
+        user_id = FIRST_USER_ID + update_id % args.users
+        if update_id % args.poison_every == 0:
+            text, poison = "poison", poison + 1
+        elif update_id % args.flaky_every == 0:
+            text = "flaky"
+        else:
+            text = str(update_id)
+        if text != "poison":
+            expected[update_id] = user_id
+        await producer.publish(make_update(update_id, user_id, text))
+        if update_id == args.updates // 2:
+            # A worker dies with updates in flight; its replacement comes up
+            # under another name and has to reclaim them.
+            workers[0].send_signal(signal.SIGKILL)
+            await workers[0].wait()
+            workers[0] = await spawn_worker(args, port, 0, "worker-0-replacement")
+        if update_id % args.users == 0:
+            await asyncio.sleep(0)
+
+    processed: list[tuple[int, int]] = []
+    dead = 0
+    while monotonic() - started < args.timeout:
+        done = await redis.xrange(DONE_KEY)
+        processed = [
+            (int(fields[b"update_id"]), int(fields[b"user_id"])) for _, fields in done
+        ]
+        dead = await redis.xlen(dead_letter_key(PREFIX))
+        if expected.keys() <= {update_id for update_id, _ in processed} and (
+            dead >= poison
+        ):
+            break
+        await asyncio.sleep(0.2)
+    elapsed = monotonic() - started
+
+    for process in workers.values():
+        process.send_signal(signal.SIGTERM)
+    exit_codes = [await process.wait() for process in workers.values()]
+    await redis.aclose()
+    await server.close()
+
+    counts = Counter(update_id for update_id, _ in processed)
+    last_seen: dict[int, int] = {}
+    order_violations = 0
+    for update_id, user_id in processed:
+        if counts[update_id] > 1:
+            continue
+        if update_id < last_seen.get(user_id, 0):
+            order_violations += 1
+        last_seen[user_id] = update_id
+    missing = len(expected.keys() - counts.keys())
+    results = {
+        "published": args.updates,
+        "processed": len(counts),
+        "missing": missing,
+        "duplicates": sum(count - 1 for count in counts.values()),
+        "dead_letters": dead,
+        "expected_dead_letters": poison,
+        "order_violations": order_violations,
+        "worker_exit_codes": exit_codes,
+        "elapsed_seconds": round(elapsed, 2),
+    }
+    print(json.dumps(results, indent=2))
+    if missing or dead != poison or order_violations or any(exit_codes):
+        print(
+            "FAILED: updates were lost or reordered, or workers did not stop cleanly",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run an ingest and a worker fleet over a stand-in Redis"
+    )
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--handler-delay", type=float, default=5.0, help="ms")
+    parser.add_argument("--max-in-flight", type=int, default=20)
+    parser.add_argument("--claim-idle", type=float, default=1.0, help="seconds")
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--shards", type=int, default=0)
+    parser.add_argument("--poison-every", type=int, default=250)
+    parser.add_argument("--flaky-every", type=int, default=40)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--consumer", help=argparse.SUPPRESS)
+    parser.add_argument("--redis-port", type=int, help=argparse.SUPPRESS)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.worker is not None:
+        asyncio.run(run_worker(args))
+    else:
+        sys.exit(asyncio.run(main(args)))
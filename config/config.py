@@ -1,12 +1,9 @@
 import logging
-import logging.config
 import os
 from environs import Env
 from environs.exceptions import EnvError
 from dataclasses import dataclass
-from app.logger.logging_settings import logging_config
 
-logging.config.dictConfig(logging_config)
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +11,55 @@ logger = logging.getLogger(__name__)
 class BotSettings:
     token: str
     admin_ids: list[int]
+    mode: str
+    process: str
+
+
+@dataclass
+class WebhookSettings:
+    base_url: str
+    path: str
+    host: str
+    port: int
+    secret_token: str
+    inline_replies: bool
+
+
+@dataclass
+class I18nSettings:
+    path: str
+    default_locale: str
+    reload_interval: float
+
+
+@dataclass
+class DispatchSettings:
+    shards: int
+    max_in_flight: int
+    stats_interval: float
+
+
+@dataclass
+class DedupSettings:
+    enabled: bool
+    ttl: float
+    lease: float
+
+
+@dataclass
+class StreamSettings:
+    prefix: str
+    partitions: int
+    workers: int
+    worker_index: int
+    consumer: str
+    group: str
+    maxlen: int
+    batch_size: int
+    block: float
+    claim_idle: float
+    claim_interval: float
+    max_retries: int
 
 
 @dataclass
@@ -23,6 +69,18 @@ class DatabaseSettings:
     port: int
     user: str
     password: str
+    prepared_statements: bool
+
+
+@dataclass
+class PoolSettings:
+    min_size: int
+    max_size: int
+    timeout: float
+    max_idle: float
+    max_lifetime: float
+    check: bool
+    stats_interval: float
 
 
 @dataclass
@@ -34,11 +92,68 @@ class RedisSettings:
     username: str
 
 
+@dataclass
+class CacheSettings:
+    size: int
+    ttl: float
+
+
+@dataclass
+class BanSettings:
+    resync_interval: float
+
+
+@dataclass
+class OutboundSettings:
+    enabled: bool
+    global_rate: float
+    chat_rate: float
+    chat_burst: int
+    group_rate: float
+    max_retries: int
+
+
+@dataclass
+class BroadcastSettings:
+    workers: int
+    batch_size: int
+
+
+@dataclass
+class MetricsSettings:
+    enabled: bool
+    host: str
+    port: int
+
+
+@dataclass
+class ActivitySettings:
+    flush_interval: float
+    flush_size: int
+    max_backlog: int
+    partitions_ahead: int
+    retention_months: int
+    retention_mode: str
+    maintenance_interval: float
+
+
 @dataclass
 class Config:
     bot: BotSettings
+    webhook: WebhookSettings
+    i18n: I18nSettings
+    dispatch: DispatchSettings
+    dedup: DedupSettings
+    stream: StreamSettings
     db: DatabaseSettings
+    pool: PoolSettings
     redis: RedisSettings
+    cache: CacheSettings
+    activity: ActivitySettings
+    ban: BanSettings
+    metrics: MetricsSettings
+    outbound: OutboundSettings
+    broadcast: BroadcastSettings
 
 
 def load_config(path: str | None = None) -> Config:
@@ -60,13 +175,86 @@ def load_config(path: str | None = None) -> Config:
         except ValueError:
             logger.error("ADMIN_IDS must be integers, got: %s", raw_ids)
             raise
-        bot = BotSettings(token=token, admin_ids=admin_ids)
+        mode: str = env("BOT_MODE", default="polling")
+        if mode not in ("polling", "webhook"):
+            logger.error("BOT_MODE must be `polling` or `webhook`, got: %s", mode)
+            raise ValueError
+        process: str = env("BOT_PROCESS", default="all")
+        if process not in ("all", "ingest", "worker"):
+            logger.error(
+                "BOT_PROCESS must be `all`, `ingest` or `worker`, got: %s", process
+            )
+            raise ValueError
+        bot = BotSettings(token=token, admin_ids=admin_ids, mode=mode, process=process)
+        webhook = WebhookSettings(
+            base_url=env("WEBHOOK_BASE_URL", default=""),
+            path=env("WEBHOOK_PATH", default="/webhook"),
+            host=env("WEBHOOK_HOST", default="127.0.0.1"),
+            port=env.int("WEBHOOK_PORT", default=8080),
+            secret_token=env("WEBHOOK_SECRET_TOKEN", default=""),
+            inline_replies=env.bool("WEBHOOK_INLINE_REPLIES", default=True),
+        )
+        if mode == "webhook" and not (webhook.base_url and webhook.secret_token):
+            logger.error(
+                "WEBHOOK_BASE_URL and WEBHOOK_SECRET_TOKEN are required in webhook mode"
+            )
+            raise ValueError
+        i18n = I18nSettings(
+            path=env("LOCALES_PATH", default="locales"),
+            default_locale=env("DEFAULT_LOCALE", default="ru"),
+            reload_interval=env.float("LOCALES_RELOAD_INTERVAL", default=5.0),
+        )
+        dispatch = DispatchSettings(
+            shards=env.int("UPDATE_SHARDS", default=0),
+            max_in_flight=env.int("UPDATE_MAX_IN_FLIGHT", default=100),
+            stats_interval=env.float("UPDATE_STATS_INTERVAL", default=60.0),
+        )
+        dedup = DedupSettings(
+            enabled=env.bool("UPDATE_DEDUP_ENABLED", default=True),
+            ttl=env.float("UPDATE_DEDUP_TTL", default=86400.0),
+            lease=env.float("UPDATE_DEDUP_LEASE", default=60.0),
+        )
+        worker_index: int = env.int("STREAM_WORKER_INDEX", default=0)
+        stream = StreamSettings(
+            prefix=env("STREAM_PREFIX", default="bot:updates"),
+            partitions=env.int("STREAM_PARTITIONS", default=16),
+            workers=env.int("STREAM_WORKERS", default=1),
+            worker_index=worker_index,
+            consumer=env("STREAM_CONSUMER", default="") or f"worker-{worker_index}",
+            group=env("STREAM_GROUP", default="workers"),
+            maxlen=env.int("STREAM_MAXLEN", default=100_000),
+            batch_size=env.int("STREAM_BATCH_SIZE", default=100),
+            block=env.float("STREAM_BLOCK", default=5.0),
+            claim_idle=env.float("STREAM_CLAIM_IDLE", default=60.0),
+            claim_interval=env.float("STREAM_CLAIM_INTERVAL", default=30.0),
+            max_retries=env.int("STREAM_MAX_RETRIES", default=3),
+        )
+        if not 0 <= stream.worker_index < stream.workers <= stream.partitions:
+            logger.error(
+                "STREAM_WORKER_INDEX must be below STREAM_WORKERS and "
+                "STREAM_WORKERS must not exceed STREAM_PARTITIONS"
+            )
+            raise ValueError
+        if process != "all" and dedup.enabled and dedup.lease < stream.claim_idle:
+            # A reclaimed update must not start while its first run may go on.
+            logger.error("UPDATE_DEDUP_LEASE must not be below STREAM_CLAIM_IDLE")
+            raise ValueError
         db = DatabaseSettings(
             db_name=env("POSTGRES_DB"),
             host=env("POSTGRES_HOST"),
             port=env("POSTGRES_PORT"),
             user=env("POSTGRES_USER"),
             password=env("POSTGRES_PASSWORD"),
+            prepared_statements=env.bool("POSTGRES_PREPARED_STATEMENTS", default=True),
+        )
+        pool = PoolSettings(
+            min_size=env.int("POSTGRES_POOL_MIN_SIZE", default=1),
+            max_size=env.int("POSTGRES_POOL_MAX_SIZE", default=3),
+            timeout=env.float("POSTGRES_POOL_TIMEOUT", default=10.0),
+            max_idle=env.float("POSTGRES_POOL_MAX_IDLE", default=600.0),
+            max_lifetime=env.float("POSTGRES_POOL_MAX_LIFETIME", default=3600.0),
+            check=env.bool("POSTGRES_POOL_CHECK", default=False),
+            stats_interval=env.float("POSTGRES_POOL_STATS_INTERVAL", default=60.0),
         )
         redis = RedisSettings(
             host=env("REDIS_HOST"),
@@ -75,10 +263,67 @@ def load_config(path: str | None = None) -> Config:
             password=env("REDIS_PASSWORD", default=""),
             username=env("REDIS_USERNAME", default=""),
         )
+        cache = CacheSettings(
+            size=env.int("USER_CACHE_SIZE", default=10_000),
+            ttl=env.float("USER_CACHE_TTL", default=300.0),
+        )
+        ban = BanSettings(
+            resync_interval=env.float("BAN_RESYNC_INTERVAL", default=300.0),
+        )
+        activity = ActivitySettings(
+            flush_interval=env.float("ACTIVITY_FLUSH_INTERVAL", default=5.0),
+            flush_size=env.int("ACTIVITY_FLUSH_SIZE", default=1000),
+            max_backlog=env.int("ACTIVITY_MAX_BACKLOG", default=100_000),
+            partitions_ahead=env.int("ACTIVITY_PARTITIONS_AHEAD", default=3),
+            retention_months=env.int("ACTIVITY_RETENTION_MONTHS", default=0),
+            retention_mode=env("ACTIVITY_RETENTION_MODE", default="archive"),
+            maintenance_interval=env.float(
+                "ACTIVITY_MAINTENANCE_INTERVAL", default=6 * 3600.0
+            ),
+        )
+        if activity.retention_mode not in ("detach", "archive", "drop"):
+            logger.error(
+                "ACTIVITY_RETENTION_MODE must be `detach`, `archive` or `drop`, got: %s",
+                activity.retention_mode,
+            )
+            raise ValueError
+        metrics = MetricsSettings(
+            enabled=env.bool("METRICS_ENABLED", default=True),
+            host=env("METRICS_HOST", default="127.0.0.1"),
+            port=env.int("METRICS_PORT", default=9100),
+        )
+        outbound = OutboundSettings(
+            enabled=env.bool("OUTBOUND_ENABLED", default=True),
+            global_rate=env.float("OUTBOUND_GLOBAL_RATE", default=30.0),
+            chat_rate=env.float("OUTBOUND_CHAT_RATE", default=1.0),
+            chat_burst=env.int("OUTBOUND_CHAT_BURST", default=3),
+            group_rate=env.float("OUTBOUND_GROUP_RATE", default=20 / 60),
+            max_retries=env.int("OUTBOUND_MAX_RETRIES", default=3),
+        )
+        broadcast = BroadcastSettings(
+            workers=env.int("BROADCAST_WORKERS", default=16),
+            batch_size=env.int("BROADCAST_BATCH_SIZE", default=500),
+        )
     except EnvError as err:
         logger.error(err)
         raise
 
     logger.info("Configuration loaded successfully")
 
-    return Config(bot=bot, db=db, redis=redis)
+    return Config(
+        bot=bot,
+        webhook=webhook,
+        i18n=i18n,
+        dispatch=dispatch,
+        dedup=dedup,
+        stream=stream,
+        db=db,
+        pool=pool,
+        redis=redis,
+        cache=cache,
+        activity=activity,
+        ban=ban,
+        metrics=metrics,
+        outbound=outbound,
+        broadcast=broadcast,
+    )
@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 
 
-import logging.config
-from app.logger.logging_settings import logging_config
+from app.logger.logging_settings import setup_logging
 
 
-logging.config.dictConfig(logging_config)
+setup_logging()
 
 
 import asyncio
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from psycopg import Error
+
+from app.infrastructure.database.connection import get_pg_connection
+from app.logger.logging_settings import setup_logging
+from config.config import load_config
+from .runner import migrate
+from .versions import MIGRATIONS
+
+
+logger = logging.getLogger(__name__)
+
+
+async def main(args: argparse.Namespace) -> int:
+    config = load_config()
+    try:
+        connection = await get_pg_connection(config=config)
+        async with connection:
+            version = await migrate(
+                connection,
+                MIGRATIONS,
+                target=args.target,
+                lock_timeout=args.lock_timeout,
+            )
+    except Error as err:
+        logger.error("Migration failed: %s", err)
+        return 1
+    logger.info("Database schema is at version %d", version)
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=5.0,
+        help="seconds a DDL statement may wait for a table lock",
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from psycopg import AsyncConnection, sql
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_LOCK_ID = 7_246_001
+
+
+class Step(ABC):
+    @abstractmethod
+    async def apply(self, conn: AsyncConnection) -> None: ...
+
+
+@dataclass(frozen=True)
+class Sql(Step):
+    query: str
+
+    async def apply(self, conn: AsyncConnection) -> None:
+        async with conn.transaction():
+            await conn.execute(self.query)
+
+
+@dataclass(frozen=True)
+class Call(Step):
+    func: Callable[[AsyncConnection], Awaitable[None]]
+
+    async def apply(self, conn: AsyncConnection) -> None:
+        async with conn.transaction():
+            await self.func(conn)
+
+
+@dataclass(frozen=True)
+class ConcurrentIndex(Step):
+    name: str
+    table: str
+    definition: str
+    unique: bool = False
+
+    async def apply(self, conn: AsyncConnection) -> None:
+        # Runs outside a transaction and does not block writes to the table.
+        index = sql.Identifier(self.name)
+        cursor = await conn.execute(
+            "select not i.indisvalid from pg_index i "
+            "where i.indexrelid = to_regclass(%s)",
+            (f"public.{self.name}",),
+        )
+        row = await cursor.fetchone()
+        if row and row[0]:
+            logger.warning(
+                "Dropping the invalid index `%s` left by a failed build", self.name
+            )
+            await conn.execute(
+                sql.SQL("drop index concurrently if exists {}").format(index)
+            )
+        # The build waits for older transactions, which lock_timeout would abort.
+        cursor = await conn.execute("show lock_timeout")
+        lock_timeout = (await cursor.fetchone())[0]
+        await conn.execute("set lock_timeout = 0")
+        try:
+            await conn.execute(
+                sql.SQL(
+                    "create {} index concurrently if not exists {} on {} {}"
+                ).format(
+                    sql.SQL("unique" if self.unique else ""),
+                    index,
+                    sql.Identifier(self.table),
+                    sql.SQL(self.definition),
+                )
+            )
+        finally:
+            await conn.execute(
+                sql.SQL("set lock_timeout = {}").format(sql.Literal(lock_timeout))
+            )
+
+
+@dataclass(frozen=True)
+class Backfill(Step):
+    # `query` gets %(after)s and %(batch_size)s and returns the last key it
+    # processed, or NULL once nothing is left. `when`, if set, returns whether
+    # there is anything to backfill at all.
+    name: str
+    query: str
+    batch_size: int = 1000
+    pause: float = 0.05
+    start: Any = 0
+    when: str | None = None
+
+    async def apply(self, conn: AsyncConnection) -> None:
+        if self.when is not None:
+            cursor = await conn.execute(self.when)
+            if not (await cursor.fetchone())[0]:
+                logger.info("Backfill `%s` skipped: nothing to do", self.name)
+                return
+        after, batches = self.start, 0
+        while True:
+            async with conn.transaction():
+                cursor = await conn.execute(
+                    self.query, {"after": after, "batch_size": self.batch_size}
+                )
+                row = await cursor.fetchone()
+            if row is None or row[0] is None:
+                break
+            after = row[0]
+            batches += 1
+            if batches % 100 == 0:
+                logger.info(
+                    "Backfill `%s`: %d batches, at %s", self.name, batches, after
+                )
+            await asyncio.sleep(self.pause)
+        logger.info("Backfill `%s` finished: %d batches", self.name, batches)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    steps: tuple[Step, ...] = field(default_factory=tuple)
+
+
+async def get_schema_version(conn: AsyncConnection) -> int:
+    cursor = await conn.execute(
+        "select coalesce(max(version), 0) from schema_migrations"
+    )
+    row = await cursor.fetchone()
+    return row[0]
+
+
+async def migrate(
+    conn: AsyncConnection,
+    migrations: tuple[Migration, ...],
+    *,
+    target: int | None = None,
+    lock_timeout: float = 5.0,
+) -> int:
+    # Needs an autocommit connection: concurrent index builds cannot run in
+    # a transaction block, every other step opens its own transaction.
+    await conn.execute(
+        sql.SQL("set lock_timeout = {}").format(
+            sql.Literal(f"{int(lock_timeout * 1000)}ms")
+        )
+    )
+    await conn.execute("select pg_advisory_lock(%s)", (MIGRATIONS_LOCK_ID,))
+    try:
+        await conn.execute(
+            """
+            create table if not exists schema_migrations(
+                version int primary key,
+                name varchar(100) not null,
+                applied_at timestamptz not null default now()
+                )
+            """
+        )
+        current = await get_schema_version(conn)
+        logger.info("Schema version: %d", current)
+        for migration in migrations:
+            if migration.version <= current:
+                continue
+            if target is not None and migration.version > target:
+                break
+            logger.info(
+                "Applying migration %04d `%s` ...", migration.version, migration.name
+            )
+            started = perf_counter()
+            # Steps are idempotent, a failed migration is simply run again.
+            for step in migration.steps:
+                await step.apply(conn)
+            await conn.execute(
+                "insert into schema_migrations(version, name) values(%s, %s)",
+                (migration.version, migration.name),
+            )
+            current = migration.version
+            logger.info(
+                "Migration %04d `%s` applied in %.1fs",
+                migration.version,
+                migration.name,
+                perf_counter() - started,
+            )
+        return current
+    finally:
+        await conn.execute("select pg_advisory_unlock(%s)", (MIGRATIONS_LOCK_ID,))
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+
+
+import logging
+from datetime import datetime, timezone
+
+from psycopg import AsyncConnection
+
+from app.infrastructure.database.partitions import (
+    add_months,
+    create_activity_partitions,
+    month_start,
+)
+from .runner import Backfill, Call, ConcurrentIndex, Migration, Sql
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_PARTITIONS_AHEAD = 3
+
+
+ACTIVITY_COLUMNS = """
+    user_id bigint not null references users(user_id),
+    activity_date date not null default current_date,
+    created_at timestamptz not null default now(),
+    actions int not null default 1,
+    primary key (user_id, activity_date)
+"""
+# Users whose activity changed while the aggregates were being backfilled,
+# recomputed by `catch_up_activity_aggregates` once the old bot is stopped.
+TRACK_AGGREGATES = """
+    create table if not exists activity_aggregates_dirty(
+        user_id bigint primary key
+        );
+    create or replace function activity_aggregates_dirty() returns trigger
+    language plpgsql as $$
+    begin
+        insert into activity_aggregates_dirty(user_id) values (new.user_id)
+        on conflict do nothing;
+        return null;
+    end
+    $$;
+    create or replace trigger activity_aggregates_dirty
+    after insert or update on activity
+    for each row when (new.user_id is not null)
+    execute function activity_aggregates_dirty();
+"""
+# Every process drops its cached profile of the user, see BannedUsers.
+NOTIFY_USERS_CHANGED = """
+    create or replace function notify_users_changed() returns trigger
+    language plpgsql as $$
+    begin
+        perform pg_notify('users_changed', new.user_id::text);
+        return null;
+    end
+    $$;
+    create or replace trigger users_changed
+    after insert or update on users
+    for each row execute function notify_users_changed();
+"""
+# Exact sums: a re-run or the catch-up overwrites whatever was there.
+AGGREGATE_USERS = """
+    , totals as (
+        insert into activity_totals(user_id, actions)
+        select a.user_id, sum(a.actions)
+        from activity a
+        join batch b on b.user_id = a.user_id
+        group by a.user_id
+        on conflict (user_id) do update set actions = excluded.actions
+    ), rollups as (
+        insert into activity_rollups(period, period_start, user_id, actions)
+        select
+            p.period,
+            date_trunc(p.period, a.activity_date)::date,
+            a.user_id,
+            sum(a.actions)
+        from activity a
+        join batch b on b.user_id = a.user_id
+        cross join (values ('week'), ('month')) as p(period)
+        group by 1, 2, 3
+        on conflict (period, period_start, user_id)
+        do update set actions = excluded.actions
+    )
+"""
+
+
+async def create_activity_table(conn: AsyncConnection) -> None:
+    cursor = await conn.execute(
+        "select relkind = 'r' from pg_class where oid = to_regclass('public.activity')"
+    )
+    row = await cursor.fetchone()
+    if not (row and row[0]):
+        return
+    # The old table keeps taking writes: the partitioned one is built next to
+    # it, filled by a backfill and swapped in by `swap_activity_table`.
+    await conn.execute(
+        f"create table if not exists activity_partitioned({ACTIVITY_COLUMNS}) "
+        "partition by range (activity_date)"
+    )
+    # Daily top users; built while the table is empty, so no CONCURRENTLY.
+    await conn.execute(
+        "create index if not exists idx_activity_day_top "
+        "on activity_partitioned (activity_date, actions desc)"
+    )
+    today = datetime.now(timezone.utc).date()
+    cursor = await conn.execute("select min(activity_date) from activity")
+    row = await cursor.fetchone()
+    await create_activity_partitions(
+        conn,
+        first=min(row[0] or today, today),
+        last=add_months(month_start(today), ACTIVITY_PARTITIONS_AHEAD),
+        parent="activity_partitioned",
+    )
+    # Rows written from now on are mirrored, the backfill copies the rest.
+    await conn.execute(
+        """
+        create or replace function activity_mirror() returns trigger
+        language plpgsql as $$
+        begin
+            insert into activity_partitioned(
+                user_id, activity_date, created_at, actions
+            )
+            values (new.user_id, new.activity_date, new.created_at, new.actions)
+            on conflict (user_id, activity_date) do update
+            set created_at = excluded.created_at, actions = excluded.actions;
+            return null;
+        end
+        $$;
+        create or replace trigger activity_mirror
+        after insert or update on activity
+        for each row when (new.user_id is not null)
+        execute function activity_mirror();
+        """
+    )
+
+
+async def swap_activity_table(conn: AsyncConnection) -> None:
+    cursor = await conn.execute(
+        "select to_regclass('public.activity_partitioned') is not null, "
+        "to_regclass('public.activity_aggregates_dirty') is not null"
+    )
+    pending, tracked = await cursor.fetchone()
+    if not pending:
+        return
+    # Writes wait only for the renames: both tables already hold the same rows.
+    await conn.execute(
+        """
+        lock table activity in access exclusive mode;
+        drop trigger activity_mirror on activity;
+        drop function activity_mirror();
+        alter table activity rename to activity_unpartitioned;
+        alter index if exists activity_pkey rename to activity_unpartitioned_pkey;
+        alter table activity_partitioned rename to activity;
+        alter index activity_partitioned_pkey rename to activity_pkey;
+        """
+    )
+    if tracked:
+        # The aggregates catch-up has not run yet: keep tracking on the new table.
+        await conn.execute(TRACK_AGGREGATES)
+    logger.info("Table `activity` converted to monthly partitions")
+
+
+async def catch_up_activity_aggregates(conn: AsyncConnection) -> None:
+    cursor = await conn.execute(
+        "select to_regclass('public.activity_aggregates_dirty') is not null"
+    )
+    if not (await cursor.fetchone())[0]:
+        return
+    # Blocks activity writes until the commit, so the sums are exact. Only the
+    # users touched since the backfill started are recomputed.
+    await conn.execute("lock table activity in share mode")
+    cursor = await conn.execute(
+        "with batch as (select user_id from activity_aggregates_dirty)"
+        + AGGREGATE_USERS
+        + "select count(*) from batch"
+    )
+    users = (await cursor.fetchone())[0]
+    await conn.execute(
+        """
+        drop trigger activity_aggregates_dirty on activity;
+        drop function activity_aggregates_dirty();
+        drop table activity_aggregates_dirty;
+        """
+    )
+    logger.info("Activity aggregates caught up for %d users", users)
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        1,
+        "baseline",
+        (
+            Sql(
+                """
+                create table if not exists users(
+                    id serial primary key,
+                    user_id bigint not null unique,
+                    username varchar(50),
+                    created_at timestamptz not null default now(),
+                    language varchar(10) not null,
+                    role varchar(30) not null,
+                    is_alive boolean not null,
+                    banned boolean not null
+                    );
+                create table if not exists activity(
+                    id serial primary key,
+                    user_id bigint references users(user_id),
+                    created_at timestamptz not null default now(),
+                    activity_date date not null default current_date,
+                    actions int not null default 1
+                    );
+                create unique index if not exists idx_activity_user_day on activity(user_id, activity_date);
+                """
+            ),
+        ),
+    ),
+    Migration(
+        2,
+        "activity_aggregates",
+        (
+            Sql(
+                """
+                create table if not exists activity_totals(
+                    user_id bigint primary key references users(user_id),
+                    actions bigint not null default 0
+                    );
+                create table if not exists activity_rollups(
+                    period varchar(10) not null,
+                    period_start date not null,
+                    user_id bigint not null references users(user_id),
+                    actions bigint not null default 0,
+                    primary key (period, period_start, user_id)
+                    );
+                """
+                + TRACK_AGGREGATES
+            ),
+            ConcurrentIndex(
+                "idx_activity_totals_actions", "activity_totals", "(actions desc)"
+            ),
+            ConcurrentIndex(
+                "idx_activity_rollups_top",
+                "activity_rollups",
+                "(period, period_start, actions desc)",
+            ),
+            # Runs next to the old bot, which only writes `activity`: what it
+            # adds meanwhile is recomputed by `activity_aggregates_catch_up`.
+            Backfill(
+                "activity_aggregates",
+                """
+                with batch as (
+                    select user_id from users
+                    where user_id > %(after)s
+                    order by user_id
+                    limit %(batch_size)s
+                )
+                """
+                + AGGREGATE_USERS
+                + "select max(user_id) from batch",
+                batch_size=500,
+            ),
+        ),
+    ),
+    Migration(
+        3,
+        "banned_users_index",
+        (ConcurrentIndex("idx_users_banned", "users", "(user_id) where banned"),),
+    ),
+    Migration(
+        4,
+        "broadcasts",
+        (
+            Sql(
+                """
+                create table if not exists broadcasts(
+                    id serial primary key,
+                    admin_id bigint not null,
+                    locale varchar(10) not null,
+                    from_chat_id bigint,
+                    message_id bigint,
+                    text text,
+                    status varchar(16) not null default 'running',
+                    last_user_id bigint not null default 0,
+                    sent int not null default 0,
+                    blocked int not null default 0,
+                    failed int not null default 0,
+                    created_at timestamptz not null default now(),
+                    updated_at timestamptz not null default now()
+                    );
+                """
+            ),
+            ConcurrentIndex(
+                "idx_users_alive", "users", "(user_id) where is_alive and not banned"
+            ),
+            ConcurrentIndex(
+                "idx_broadcasts_running", "broadcasts", "(id) where status = 'running'"
+            ),
+        ),
+    ),
+    Migration(
+        5,
+        "usernames",
+        (
+            Sql(
+                "alter table users add column if not exists "
+                "username_updated_at timestamptz not null default now()"
+            ),
+            ConcurrentIndex("idx_users_username_lower", "users", "(lower(username))"),
+        ),
+    ),
+    Migration(
+        6,
+        "activity_partitions",
+        (
+            Call(create_activity_table),
+            Backfill(
+                "activity_partitions",
+                """
+                with batch as (
+                    select user_id from users
+                    where user_id > %(after)s
+                    order by user_id
+                    limit %(batch_size)s
+                ), copied as (
+                    insert into activity_partitioned(
+                        user_id, activity_date, created_at, actions
+                    )
+                    select a.user_id, a.activity_date, a.created_at, a.actions
+                    from activity a
+                    join batch b on b.user_id = a.user_id
+                    on conflict do nothing
+                )
+                select max(user_id) from batch
+                """,
+                when="select to_regclass('public.activity_partitioned') is not null",
+            ),
+            Call(swap_activity_table),
+            # Out of the way of the swap: dropped once nothing reads it.
+            Sql("drop table if exists activity_unpartitioned"),
+        ),
+    ),
+    # Run after the old bot is stopped, see README.
+    Migration(
+        7,
+        "activity_aggregates_catch_up",
+        (Call(catch_up_activity_aggregates),),
+    ),
+    Migration(8, "users_changed", (Sql(NOTIFY_USERS_CHANGED),)),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
@@ -0,0 +1,5 @@
+#!/usr/bin/env python3
+
+
+# The database modules are imported through the bot package, as in main.py.
+import app.bot  # noqa: F401
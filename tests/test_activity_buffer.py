@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from psycopg import OperationalError
+
+from app.infrastructure.database import activity
+from app.infrastructure.database.activity import ActivityBuffer
+
+
+class FakePool:
+    @asynccontextmanager
+    async def connection(self):
+        yield None
+
+
+def make_buffer(monkeypatch, writer, **kwargs) -> ActivityBuffer:
+    monkeypatch.setattr(activity, "update_users_activity", writer)
+    return ActivityBuffer(FakePool(), **kwargs)
+
+
+def test_failed_flush_restores_the_batch(monkeypatch) -> None:
+    async def fail(conn, rows):
+        raise OperationalError("connection refused")
+
+    buffer = make_buffer(monkeypatch, fail)
+    buffer.add(1, 2)
+    buffer.add(2)
+    asyncio.run(buffer.flush())
+    buffer.add(1)
+    assert sorted(
+        (user_id, actions) for (user_id, _), actions in buffer._pending.items()
+    ) == [(1, 3), (2, 1)]
+
+
+def test_restore_stops_at_the_backlog(monkeypatch) -> None:
+    async def fail(conn, rows):
+        raise OperationalError("connection refused")
+
+    buffer = make_buffer(monkeypatch, fail, max_backlog=3)
+    for user_id in range(5):
+        buffer.add(user_id)
+    asyncio.run(buffer.flush())
+    assert buffer.pending == 3
+    assert buffer.dropped == 2
+
+
+def test_background_flush_survives_unexpected_errors(monkeypatch) -> None:
+    written = []
+
+    async def flaky(conn, rows):
+        if not written:
+            written.append(None)
+            raise RuntimeError("unexpected")
+        written.extend(rows)
+
+    async def run() -> None:
+        buffer = make_buffer(monkeypatch, flaky, flush_interval=0.01)
+        await buffer.start()
+        buffer.add(7)
+        await asyncio.sleep(0.1)
+        assert buffer._task is not None and not buffer._task.done()
+        await buffer.close()
+
+    asyncio.run(run())
+    assert [row[::2] for row in written[1:]] == [(7, 1)]
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+
+import pytest
+from aiogram.dispatcher.middlewares.user_context import EventContext
+from aiogram.fsm.storage.base import DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from aiogram.fsm.strategy import FSMStrategy
+from aiogram.types import Chat, User
+
+from app.bot.fsm import BufferedFSMContextMiddleware
+
+
+class FailingStorage(MemoryStorage):
+    async def set_state(self, key, state=None) -> None:
+        raise ConnectionError("storage is down")
+
+
+def make_data() -> dict:
+    return {
+        "bot": type("FakeBot", (), {"id": 1})(),
+        "event_context": EventContext(
+            chat=Chat(id=5, type="private"),
+            user=User(id=5, is_bot=False, first_name="User"),
+        ),
+    }
+
+
+def make_middleware(storage: MemoryStorage) -> BufferedFSMContextMiddleware:
+    return BufferedFSMContextMiddleware(
+        storage=storage,
+        events_isolation=SimpleEventIsolation(),
+        strategy=FSMStrategy.USER_IN_CHAT,
+    )
+
+
+def test_handler_error_is_not_replaced_by_a_flush_error() -> None:
+    async def handler(event, data):
+        await data["state"].set_state("waiting")
+        raise ValueError("handler failed")
+
+    middleware = make_middleware(FailingStorage())
+    with pytest.raises(ValueError):
+        asyncio.run(middleware(handler, None, make_data()))
+
+
+def test_changes_are_saved_when_the_handler_fails() -> None:
+    async def handler(event, data):
+        await data["state"].set_state("waiting")
+        raise ValueError("handler failed")
+
+    storage = MemoryStorage()
+    middleware = make_middleware(storage)
+    with pytest.raises(ValueError):
+        asyncio.run(middleware(handler, None, make_data()))
+    assert [*storage.storage.values()][0].state == "waiting"
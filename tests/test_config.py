@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+
+import pytest
+
+from config.config import load_config
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path) -> str:
+    with open(".env.example", encoding="utf-8") as file:
+        for line in file:
+            name, sep, value = line.strip().partition("=")
+            if sep and not name.startswith("#"):
+                monkeypatch.setenv(name, value)
+    monkeypatch.setenv("BOT_TOKEN", "42:TEST")
+    monkeypatch.setenv("UPDATE_DEDUP_LEASE", "10")
+    monkeypatch.setenv("STREAM_CLAIM_IDLE", "60")
+    path = tmp_path / ".env"
+    path.write_text("")
+    return str(path)
+
+
+def test_short_lease_is_allowed_in_a_single_process(env) -> None:
+    assert load_config(env).dedup.lease == 10
+
+
+@pytest.mark.parametrize("process", ["ingest", "worker"])
+def test_lease_must_cover_the_claim_in_the_stream_modes(
+    env, monkeypatch, process
+) -> None:
+    monkeypatch.setenv("BOT_PROCESS", process)
+    with pytest.raises(ValueError):
+        load_config(env)
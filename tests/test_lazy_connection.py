@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.infrastructure.database.connection import LazyConnection
+
+
+class FakeConnection:
+    def __init__(self, log: list) -> None:
+        self.log = log
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.log.append(("begin", self))
+        try:
+            yield
+        except Exception:
+            self.log.append(("rollback", self))
+            raise
+        self.log.append(("commit", self))
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.log: list = []
+        self.checkouts = 0
+
+    @asynccontextmanager
+    async def connection(self):
+        self.checkouts += 1
+        yield FakeConnection(self.log)
+
+
+def test_statements_check_out_a_connection_each() -> None:
+    async def run(pool: FakePool) -> None:
+        conn = LazyConnection(pool)
+        async with conn.cursor() as first:
+            pass
+        async with conn.cursor() as second:
+            pass
+        assert first is not second
+
+    pool = FakePool()
+    asyncio.run(run(pool))
+    assert pool.checkouts == 2
+
+
+def test_transaction_keeps_one_connection() -> None:
+    async def run(pool: FakePool) -> None:
+        conn = LazyConnection(pool)
+        async with conn.transaction():
+            async with conn.cursor() as first:
+                pass
+            async with conn.cursor() as second:
+                pass
+        assert first is second
+        assert pool.log == [("begin", first), ("commit", first)]
+
+    pool = FakePool()
+    asyncio.run(run(pool))
+    assert pool.checkouts == 1
+
+
+def test_failed_transaction_is_rolled_back_and_released() -> None:
+    async def run(pool: FakePool) -> None:
+        conn = LazyConnection(pool)
+        with pytest.raises(RuntimeError):
+            async with conn.transaction():
+                raise RuntimeError("failed")
+        assert [event for event, _ in pool.log] == ["begin", "rollback"]
+        async with conn.cursor():
+            pass
+
+    pool = FakePool()
+    asyncio.run(run(pool))
+    assert pool.checkouts == 2
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+
+import json
+import os
+
+import pytest
+
+from app.bot.i18n.catalog import LocaleCatalog
+
+
+def write(path, locale: str, messages: dict, mtime: float) -> None:
+    file = path / locale / "messages.json"
+    file.parent.mkdir(exist_ok=True)
+    file.write_text(json.dumps(messages), encoding="utf-8")
+    os.utime(file, (mtime, mtime))
+
+
+def test_locales_are_loaded_on_first_use(tmp_path) -> None:
+    write(tmp_path, "en", {"/start": "Hi"}, 1)
+    write(tmp_path, "ru", {"/start": "Привет"}, 1)
+    catalog = LocaleCatalog(tmp_path, "en")
+    assert [*catalog] == ["default", "en", "ru"]
+    assert [*catalog._catalogs] == ["en"]
+    assert catalog["ru"]["/start"] == "Привет"
+    assert catalog["default"] == "en"
+    assert catalog.get("de") is None
+
+
+def test_changed_and_new_locales_are_reloaded(tmp_path) -> None:
+    write(tmp_path, "en", {"/start": "Hi"}, 1)
+    catalog = LocaleCatalog(tmp_path, "en")
+    old = catalog["en"]
+    write(tmp_path, "en", {"/start": "Hello"}, 2)
+    write(tmp_path, "ru", {"/start": "Привет"}, 2)
+    assert catalog.reload() == ["en"]
+    assert catalog["en"]["/start"] == "Hello"
+    # Readers holding the old catalog keep a consistent one.
+    assert old["/start"] == "Hi"
+    assert "ru" in catalog and catalog.locales == ("en", "ru")
+
+
+def test_broken_locale_is_skipped_until_fixed(tmp_path) -> None:
+    write(tmp_path, "en", {"/start": "Hi"}, 1)
+    write(tmp_path, "ru", ["not", "a", "catalog"], 1)
+    catalog = LocaleCatalog(tmp_path, "en")
+    assert catalog.get("ru") is None
+    assert "ru" not in catalog
+    write(tmp_path, "ru", {"/start": "Привет"}, 2)
+    assert catalog.reload() == ["ru"]
+    assert catalog["ru"]["/start"] == "Привет"
+
+
+def test_default_locale_is_required(tmp_path) -> None:
+    write(tmp_path, "ru", {"/start": "Привет"}, 1)
+    with pytest.raises(ValueError):
+        LocaleCatalog(tmp_path, "en")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+
+from redis.exceptions import ConnectionError
+
+from app.bot.enums.roles import UserRole
+from app.bot.i18n.catalog import LocaleCatalog
+from app.bot.keyboards.menu_button import MainMenu
+
+
+class DownRedis:
+    async def get(self, key):
+        raise ConnectionError("redis is down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis is down")
+
+
+class FakeBot:
+    id = 1
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def set_my_commands(self, commands, scope):
+        self.sent.append(scope.chat_id)
+
+
+def test_menu_is_sent_while_redis_is_down() -> None:
+    menu = MainMenu(LocaleCatalog("locales", "en"), redis=DownRedis())
+    bot = FakeBot()
+
+    async def run() -> list[bool]:
+        return [
+            await menu.update(bot, chat_id=5, locale="en", role=UserRole.USER)
+            for _ in range(2)
+        ]
+
+    assert asyncio.run(run()) == [True, True]
+    assert bot.sent == [5, 5]
+
+
+def test_menu_is_sent_once_per_fingerprint() -> None:
+    menu = MainMenu(LocaleCatalog("locales", "en"))
+    bot = FakeBot()
+
+    async def run() -> None:
+        assert await menu.update(bot, chat_id=5, locale="en", role=UserRole.USER)
+        assert not await menu.update(bot, chat_id=5, locale="en", role=UserRole.USER)
+        assert await menu.update(bot, chat_id=5, locale="en", role=UserRole.ADMIN)
+
+    asyncio.run(run())
+    assert bot.sent == [5, 5]
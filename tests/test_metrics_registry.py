@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+
+import pytest
+
+from app.infrastructure.metrics.registry import Registry
+
+
+def test_metrics_are_rendered_in_text_format() -> None:
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("method",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.labels("get").inc()
+    requests.labels("get").inc()
+    latency.labels().observe(0.5)
+    text = registry.render()
+    assert 'requests_total{method="get"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "latency_seconds_count 1" in text
+
+
+def test_collectors_run_on_render_and_failures_are_skipped() -> None:
+    registry = Registry()
+    size = registry.gauge("queue_size", "Queue size")
+    registry.add_collector(lambda: 1 / 0)
+    registry.add_collector(lambda: size.labels().set(3))
+    assert "queue_size 3" in registry.render()
+
+
+def test_metric_names_are_unique() -> None:
+    registry = Registry()
+    registry.counter("requests_total", "Requests")
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+from time import monotonic
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from app.bot.outbound import OutboundPriority, OutboundScheduler, outbound_priority
+
+
+def send(chat_id: int) -> SendMessage:
+    return SendMessage(chat_id=chat_id, text="text")
+
+
+def test_higher_priority_is_sent_first() -> None:
+    sent = []
+
+    async def make_request(bot, method):
+        sent.append(method.chat_id)
+
+    async def request(scheduler, chat_id, priority) -> None:
+        outbound_priority.set(priority)
+        await scheduler(make_request, None, send(chat_id))
+
+    async def run() -> None:
+        scheduler = OutboundScheduler(global_rate=20)
+        # Takes the only token, the rest has to queue.
+        await scheduler(make_request, None, send(1))
+        await asyncio.gather(
+            request(scheduler, 2, OutboundPriority.LOW),
+            request(scheduler, 3, OutboundPriority.NORMAL),
+            request(scheduler, 4, OutboundPriority.HIGH),
+        )
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert sent == [1, 4, 3, 2]
+
+
+def test_chat_limit_does_not_hold_other_chats() -> None:
+    sent = {}
+
+    async def make_request(bot, method):
+        sent.setdefault(method.chat_id, []).append(monotonic())
+
+    async def run() -> None:
+        scheduler = OutboundScheduler(global_rate=1000, chat_rate=5, chat_burst=1)
+        await asyncio.gather(
+            scheduler(make_request, None, send(1)),
+            scheduler(make_request, None, send(1)),
+            scheduler(make_request, None, send(2)),
+        )
+        await scheduler.close()
+
+    started = monotonic()
+    asyncio.run(run())
+    assert sent[1][1] - sent[1][0] >= 0.15
+    assert sent[2][0] - started < 0.1
+
+
+def test_retry_after_blocks_the_chat_and_retries() -> None:
+    attempts = []
+
+    async def make_request(bot, method):
+        attempts.append(monotonic())
+        if len(attempts) == 1:
+            raise TelegramRetryAfter(method, "Flood control exceeded", 1)
+        return "sent"
+
+    async def run() -> str:
+        scheduler = OutboundScheduler(global_rate=1000, chat_rate=100)
+        try:
+            return await scheduler(make_request, None, send(1))
+        finally:
+            await scheduler.close()
+
+    assert asyncio.run(run()) == "sent"
+    assert attempts[1] - attempts[0] >= 0.95
+
+
+def test_retry_after_is_raised_past_max_retries() -> None:
+    async def make_request(bot, method):
+        raise TelegramRetryAfter(method, "Flood control exceeded", 1)
+
+    async def run() -> None:
+        scheduler = OutboundScheduler(max_retries=0)
+        try:
+            await scheduler(make_request, None, send(1))
+        finally:
+            await scheduler.close()
+
+    with pytest.raises(TelegramRetryAfter):
+        asyncio.run(run())
+
+
+def test_least_recently_used_chat_bucket_is_evicted() -> None:
+    scheduler = OutboundScheduler(max_tracked_chats=2)
+    first = scheduler._chat_bucket(1)
+    scheduler._chat_bucket(2)
+    assert scheduler._chat_bucket(1) is first
+    scheduler._chat_bucket(3)
+    assert [*scheduler._chats] == [1, 3]
+
+
+def test_groups_get_the_group_rate() -> None:
+    scheduler = OutboundScheduler(chat_rate=1, group_rate=0.5)
+    assert scheduler._chat_bucket(1).rate == 1
+    assert scheduler._chat_bucket(-100).rate == 0.5
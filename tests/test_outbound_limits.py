@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+
+from benchmarks.outbound_limits import build_parser, main
+
+
+def test_scheduler_keeps_bot_api_limits() -> None:
+    args = build_parser().parse_args(["--chats", "20", "--messages", "4"])
+    assert asyncio.run(main(args)) == 0
+
+
+def test_tight_chat_limit_is_reported() -> None:
+    # The fake API allows less than the scheduler sends: the run must fail.
+    args = build_parser().parse_args(
+        ["--chats", "5", "--messages", "8", "--inject-429", "0", "--chat-limit", "0.5"]
+    )
+    assert asyncio.run(main(args)) == 1
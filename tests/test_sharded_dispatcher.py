@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from aiogram import Bot
+from aiogram.types import Chat, Message, Update, User
+
+from app.bot.dispatcher import ShardedDispatcher, get_update_key
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="User"),
+            text=text,
+        ),
+    )
+
+
+def test_updates_are_keyed_by_user() -> None:
+    assert get_update_key(make_update(1, 10, "text")) == 10
+    assert get_update_key(Update(update_id=5)) == 5
+
+
+def test_user_order_is_kept_across_shards() -> None:
+    finished = []
+
+    async def handler(message: Message) -> str:
+        if message.text == "slow":
+            await asyncio.sleep(0.1)
+        finished.append(message.message_id)
+        return message.text
+
+    async def run() -> list[str]:
+        dp = ShardedDispatcher(shards=2)
+        dp.message.register(handler)
+        bot = Bot("42:TEST")
+        try:
+            return await asyncio.gather(
+                dp.feed_update(bot, make_update(1, 10, "slow")),
+                dp.feed_update(bot, make_update(2, 10, "fast")),
+                dp.feed_update(bot, make_update(3, 11, "fast")),
+            )
+        finally:
+            await dp.emit_shutdown()
+            await bot.session.close()
+
+    assert asyncio.run(run()) == ["slow", "fast", "fast"]
+    # User 11 is on the other shard and is not held up by user 10.
+    assert finished == [3, 1, 2]
+
+
+def test_handler_error_reaches_the_caller() -> None:
+    async def handler(message: Message) -> None:
+        raise RuntimeError("failed")
+
+    async def run() -> None:
+        dp = ShardedDispatcher(shards=1)
+        dp.message.register(handler)
+        bot = Bot("42:TEST")
+        try:
+            await dp.feed_update(bot, make_update(1, 10, "text"))
+        finally:
+            await dp.emit_shutdown()
+            await bot.session.close()
+
+    with pytest.raises(RuntimeError, match="failed"):
+        asyncio.run(run())
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+
+from benchmarks.stream_fleet import build_parser, main
+
+
+def test_fleet_loses_and_reorders_nothing() -> None:
+    # A worker is killed halfway through, failing and poison updates included.
+    args = build_parser().parse_args(["--updates", "1000", "--users", "50"])
+    assert asyncio.run(main(args)) == 0
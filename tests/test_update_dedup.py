@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+
+import pytest
+from aiogram.types import Update
+from redis.asyncio import Redis
+
+from app.bot.middlewares.dedup import UpdateDedupMiddleware, UpdateInProgress
+from benchmarks.fake_redis import FakeRedisServer
+
+
+class FakeBot:
+    id = 42
+
+
+def run_with_redis(test) -> None:
+    async def run() -> None:
+        server = FakeRedisServer()
+        redis = Redis(port=await server.start())
+        try:
+            await test(redis)
+        finally:
+            await redis.aclose()
+            await server.close()
+
+    asyncio.run(run())
+
+
+def test_processed_update_is_dropped() -> None:
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.update_id)
+        return "done"
+
+    async def test(redis: Redis) -> None:
+        dedup = UpdateDedupMiddleware(redis)
+        data = {"bot": FakeBot()}
+        assert await dedup(handler, Update(update_id=7), data) == "done"
+        # The lease is released.
+        assert await redis.set("dedup:42:lease:7", 1, nx=True)
+        await redis.delete("dedup:42:lease:7")
+        assert await dedup(handler, Update(update_id=7), data) is None
+        assert await redis.set("dedup:42:lease:7", 1, nx=True)
+        assert await dedup(handler, Update(update_id=8), data) == "done"
+
+    run_with_redis(test)
+    assert handled == [7, 8]
+
+
+def test_failed_update_can_be_retried() -> None:
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.update_id)
+        if len(handled) == 1:
+            raise RuntimeError("failed")
+
+    async def test(redis: Redis) -> None:
+        dedup = UpdateDedupMiddleware(redis)
+        data = {"bot": FakeBot()}
+        with pytest.raises(RuntimeError):
+            await dedup(handler, Update(update_id=7), data)
+        await dedup(handler, Update(update_id=7), data)
+
+    run_with_redis(test)
+    assert handled == [7, 7]
+
+
+def test_leased_update_is_in_progress() -> None:
+    async def handler(event, data):
+        raise AssertionError("processed twice")
+
+    async def test(redis: Redis) -> None:
+        # Another process is running the update.
+        await redis.set("dedup:42:lease:7", 1, ex=60)
+        dedup = UpdateDedupMiddleware(redis)
+        with pytest.raises(UpdateInProgress):
+            await dedup(handler, Update(update_id=7), {"bot": FakeBot()})
+
+    run_with_redis(test)
+
+
+def test_update_is_processed_while_redis_is_down() -> None:
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event.update_id)
+
+    async def run() -> None:
+        server = FakeRedisServer()
+        port = await server.start()
+        await server.close()
+        redis = Redis(port=port)
+        await UpdateDedupMiddleware(redis)(
+            handler, Update(update_id=7), {"bot": FakeBot()}
+        )
+        await redis.aclose()
+
+    asyncio.run(run())
+    assert handled == [7]
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from aiogram import Bot
+from aiogram.types import Chat, Message, Update, User
+from redis.asyncio import Redis
+
+from app.bot.streams import (
+    UpdateStreamProducer,
+    UpdateStreamWorker,
+    dead_letter_key,
+    stream_key,
+)
+from benchmarks.fake_redis import FakeRedisServer
+
+
+PREFIX = "updates"
+GROUP = "workers"
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="User"),
+            text=text,
+        ),
+    )
+
+
+class FakeDispatcher:
+    def __init__(self, handle) -> None:
+        self.handle = handle
+
+    async def feed_update(self, bot: Bot, update: Update) -> None:
+        await self.handle(update)
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not await condition():
+            await asyncio.sleep(0.01)
+
+
+@asynccontextmanager
+async def run_worker(handle, updates, done, **kwargs):
+    server = FakeRedisServer()
+    redis = Redis(port=await server.start())
+    producer = UpdateStreamProducer(redis, prefix=PREFIX, partitions=1)
+    worker = UpdateStreamWorker(
+        FakeDispatcher(handle),
+        Bot("42:TEST"),
+        redis,
+        prefix=PREFIX,
+        partitions=1,
+        group=GROUP,
+        consumer="worker",
+        block=0.05,
+        claim_interval=0,
+        retry_delay=0.01,
+        **kwargs,
+    )
+    try:
+        await worker.start()
+        for update in updates:
+            if isinstance(update, Update):
+                await producer.publish(update)
+            else:
+                await redis.xadd(stream_key(PREFIX, 0), update)
+        await wait_for(lambda: done(redis))
+        await worker.close()
+        yield redis
+    finally:
+        await redis.aclose()
+        await server.close()
+
+
+def test_failing_update_is_dead_lettered_and_acked() -> None:
+    attempts = []
+
+    async def handle(update: Update) -> None:
+        attempts.append(update.update_id)
+        raise RuntimeError("poison")
+
+    async def dead_letters(redis: Redis) -> bool:
+        return await redis.xlen(dead_letter_key(PREFIX)) == 1
+
+    async def run() -> None:
+        async with run_worker(
+            handle, [make_update(1, 10, "poison")], dead_letters, max_retries=1
+        ) as redis:
+            [(_, fields)] = await redis.xrange(dead_letter_key(PREFIX))
+            [(entry_id, _)] = await redis.xrange(stream_key(PREFIX, 0))
+            assert fields[b"stream"] == stream_key(PREFIX, 0).encode()
+            assert fields[b"id"] == entry_id
+            assert fields[b"error"] == b"RuntimeError('poison')"
+            assert Update.model_validate_json(fields[b"update"]).update_id == 1
+            pending = await redis.xpending_range(
+                stream_key(PREFIX, 0), GROUP, min="-", max="+", count=10
+            )
+            assert pending == []
+
+    asyncio.run(run())
+    assert attempts == [1, 1]
+
+
+def test_malformed_update_is_dead_lettered() -> None:
+    async def handle(update: Update) -> None:
+        raise AssertionError("not an update")
+
+    async def dead_letters(redis: Redis) -> bool:
+        return await redis.xlen(dead_letter_key(PREFIX)) == 1
+
+    async def run() -> None:
+        async with run_worker(
+            handle, [{"update": "{", "key": 10}], dead_letters, max_retries=1
+        ) as redis:
+            [(_, fields)] = await redis.xrange(dead_letter_key(PREFIX))
+            assert fields[b"update"] == b"{"
+            assert b"validation error for Update" in fields[b"error"]
+
+    asyncio.run(run())
+
+
+def test_updates_of_a_user_run_in_order() -> None:
+    finished = []
+
+    async def handle(update: Update) -> None:
+        if update.message.text == "slow":
+            await asyncio.sleep(0.2)
+        finished.append(update.update_id)
+
+    async def all_done(redis: Redis) -> bool:
+        return len(finished) == 3
+
+    updates = [
+        make_update(1, 10, "slow"),
+        make_update(2, 10, "fast"),
+        make_update(3, 20, "fast"),
+    ]
+
+    async def run() -> None:
+        async with run_worker(handle, updates, all_done):
+            pass
+
+    asyncio.run(run())
+    # The other user is not held up by the slow update.
+    assert finished == [3, 1, 2]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+
+from app.infrastructure.database import cache
+from app.infrastructure.database.cache import UserCache
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    user_cache = UserCache(maxsize=2)
+    user_cache.set("profile", 1, "a")
+    user_cache.set("profile", 2, "b")
+    assert user_cache.get("profile", 1) == "a"
+    user_cache.set("profile", 3, "c")
+    assert user_cache.get("profile", 2) is cache._MISSING
+    assert user_cache.get("profile", 1) == "a"
+    assert user_cache.evictions == 1
+
+
+def test_expired_entry_is_a_miss(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(cache, "monotonic", lambda: now[0])
+    user_cache = UserCache(ttl=10)
+    user_cache.set("profile", 1, "a")
+    now[0] += 11
+    assert user_cache.get("profile", 1) is cache._MISSING
+    assert user_cache.stats()["size"] == 0
+
+
+def test_invalidate_drops_every_namespace() -> None:
+    user_cache = UserCache()
+    user_cache.cached("profile")
+    user_cache.cached("user")
+    user_cache.set("profile", 1, "a")
+    user_cache.set("user", 1, "b")
+    user_cache.set("profile", 2, "c")
+    user_cache.invalidate(1)
+    assert user_cache.get("profile", 1) is cache._MISSING
+    assert user_cache.get("user", 1) is cache._MISSING
+    assert user_cache.get("profile", 2) == "c"
+
+
+def test_read_racing_an_invalidate_is_not_stored() -> None:
+    user_cache = UserCache()
+    calls = []
+
+    @user_cache.cached("profile")
+    async def read(*, user_id: int, loaded: asyncio.Event) -> str:
+        calls.append(user_id)
+        await loaded.wait()
+        return "stale"
+
+    async def run() -> None:
+        loaded = asyncio.Event()
+        task = asyncio.create_task(read(user_id=1, loaded=loaded))
+        await asyncio.sleep(0)
+        user_cache.invalidate(1)
+        loaded.set()
+        assert await task == "stale"
+
+    asyncio.run(run())
+    assert user_cache.get("profile", 1) is cache._MISSING
+    assert user_cache._reads == {}